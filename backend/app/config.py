@@ -30,14 +30,132 @@ class Settings(BaseSettings):
     qdrant_host: str = "qdrant"
     qdrant_port: int = 6333
     qdrant_collection: str = "pdf_chunks"
+    # gRPC is faster for large query/upsert payloads; REST stays the default
+    qdrant_grpc_port: int = 6334
+    qdrant_prefer_grpc: bool = False
+    qdrant_timeout_s: int = 5
+    # Transient failures (connection, timeout, 5xx) are retried with
+    # exponential backoff starting at qdrant_retry_backoff_s, but not once
+    # qdrant_retry_budget_s has passed since the first attempt: a call that
+    # timed out is not retried, so a failure reaches the breaker after one
+    # timeout instead of qdrant_retry_attempts of them
+    qdrant_retry_attempts: int = 3
+    qdrant_retry_backoff_s: float = 0.1
+    qdrant_retry_budget_s: float = 1.0
+
+    # Vector store: "qdrant" (server) or "local" (in-process, files under
+    # local_vector_dir; for the desktop build and CI). The local store
+    # switches to HNSW (needs hnswlib) from local_vector_ann_threshold
+    # points per collection (0 = always exact).
+    vector_backend: str = "qdrant"
+    local_vector_dir: str = "./data/vectors"
+    local_vector_ann_threshold: int = 50000
+    local_vector_max_segments: int = 32
+
+    # Vector store circuit breaker: open after this many consecutive
+    # failures, probe again after vector_breaker_reset_s. While open, search
+    # runs lexical + triples only (no embedding) and flags results degraded.
+    vector_breaker_failures: int = 5
+    vector_breaker_reset_s: float = 30.0
+
+    # Semantic retrieval: children returned per distinct parent
+    semantic_group_size: int = 1
+
+    # Candidates per retrieval channel before fusion and rerank (semantic
+    # counts distinct parents). Deeper = better recall, slower rerank.
+    search_semantic_k: int = 30
+    search_lexical_k: int = 50
+    search_triple_k: int = 30
+
+    # Rerank confidence = weighted semantic + lexical + OIE evidence.
+    # Multi-sentence queries drop hits below both guard thresholds (hits
+    # with OIE evidence are kept). See benchmarks/search_benchmark.py.
+    rerank_semantic_weight: float = 0.55
+    rerank_lexical_weight: float = 0.35
+    rerank_oie_weight: float = 0.10
+    rerank_guard_min_semantic: float = 0.4
+    rerank_guard_min_lexical: float = 0.5
+
+    # Coarse-to-fine routing (0 = off). When the search scope has more than
+    # semantic_route_docs documents, chunk search is restricted to the top
+    # documents, and then to the top pages inside them. Lower = faster,
+    # higher = better recall.
+    semantic_route_docs: int = 0
+    semantic_route_pages: int = 0
+
+    # Lexical retrieval: "postgres" (ts_rank_cd), "qdrant" (sparse BM25
+    # vectors queried in the same request as the dense search) or "bm25"
+    # (in-process segment index under bm25_index_dir, built by the worker;
+    # the directory must be shared by the API and worker containers;
+    # existing documents: python -m app.worker.bm25_backfill).
+    # "qdrant" falls back to Postgres when the collection has no sparse
+    # vectors, and per search when the Qdrant request fails.
+    lexical_backend: str = "postgres"
+    sparse_avg_doc_tokens: int = 120
+    bm25_index_dir: str = "./data/bm25"
+    bm25_max_segments: int = 16
 
     # App
     app_name: str = "PDF Search Engine"
     debug: bool = True
 
+    # Prometheus: the API serves /metrics; Celery workers serve it on this
+    # port (0 = off). Needs prometheus_client.
+    worker_metrics_port: int = 0
+
+    # Tracing: "off", "jsonl" or "otlp_json" (OpenTelemetry collector
+    # otlpjsonfile receiver). Spans from API and workers go to tracing_file;
+    # tracing_sample_rate applies to traces started here, not continued ones.
+    tracing_exporter: str = "off"
+    tracing_file: str = "./data/traces/spans.jsonl"
+    tracing_sample_rate: float = 1.0
+    tracing_service_name: str = "pdf-search"
+
+    # Ingestion profiling (opt-in): comma-separated Celery task names
+    # (process_pdf, embed_pdf) and/or document ids whose task runs are
+    # sampled every ingest_profile_interval_ms; collapsed stacks (flame
+    # graph input) are written to ingest_profile_dir.
+    ingest_profile_targets: str = ""
+    ingest_profile_interval_ms: int = 5
+    ingest_profile_dir: str = "./data/profiles"
+
+    # Comma-separated emails allowed on /api/admin endpoints
+    admin_emails: str = ""
+
+    # Search deadline (0 = none). Retrieval channels get
+    # search_channel_share of it; rerank stops early at the deadline.
+    search_deadline_ms: int = 5000
+    search_channel_share: float = 0.6
+
+    # Search admission control (per API process). At most
+    # search_max_concurrent searches run at once; up to search_max_queue
+    # wait (served round-robin per user) for at most search_queue_timeout_ms.
+    # Beyond that, or past search_max_per_user per user, searches get 429.
+    search_max_concurrent: int = 4
+    search_max_queue: int = 32
+    search_max_per_user: int = 8
+    search_queue_timeout_ms: int = 2000
+
+    # Search result cache (cursor pagination)
+    search_cache_ttl_seconds: int = 600
+    search_cache_max_entries: int = 512
+
     # Upload limits
     max_upload_size: int = 500 * 1024 * 1024
 
+    # Upload streaming (MinIO multipart)
+    upload_part_size: int = 16 * 1024 * 1024  # MinIO minimum is 5 MiB
+    upload_parallel_parts: int = 4
+    upload_concurrency: int = 4  # files streamed at once per worker process
+    # Identical uploads reuse a PENDING/PROCESSING owner only while the worker
+    # touched it this recently; older ones are presumed stuck and re-ingested
+    dedup_owner_stale_seconds: int = 3 * 3600
+
+    # Ingestion I/O: "memory" (bytes buffer), "tmpfs" (RAM-backed file) or "disk"
+    ingest_io_mode: str = "memory"
+    ingest_memory_max_bytes: int = 256 * 1024 * 1024  # larger files go to disk
+    ingest_tmpfs_dir: str = "/dev/shm"
+
     model_config = {
         "env_file": ".env",
         "case_sensitive": False,
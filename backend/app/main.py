@@ -1,18 +1,25 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import asyncio
 
 from app.config import settings
-from app.database import create_tables
+from app.database import create_tables, engine
 from app.schemas import ApiResponse
 from app.routers import auth_router, search_history_router
 from app.routers.upload_router import router as upload_router
 from app.routers.search import router as search_router
+from app.routers.health import router as health_router
+from app.routers.admin import router as admin_router
+from app.services.qdrant.breaker import vector_breaker
+from app.services.metrics import CONTENT_TYPE, metrics_available, register_pool_metrics, render_latest
+from app.services.tracing import TracingMiddleware, instrument_engine
 
 app_ready = False
 
+register_pool_metrics(engine.pool)
+instrument_engine(engine.sync_engine)
 
 
 @asynccontextmanager
@@ -37,6 +44,9 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Added first so CORS wraps it and X-Trace-Id is exposed on traced responses
+app.add_middleware(TracingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -48,6 +58,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # pdf.js needs these to fetch the viewer's PDF by byte ranges
+    expose_headers=["Accept-Ranges", "Content-Range", "Content-Length", "ETag", "Retry-After", "X-Trace-Id"],
 )
 
 
@@ -60,6 +72,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             data=None,
             message=exc.detail,
         ).model_dump(),
+        # e.g. Retry-After on 429, WWW-Authenticate on 401
+        headers=getattr(exc, "headers", None),
     )
 
 
@@ -69,6 +83,8 @@ app.include_router(search_history_router, prefix="/api")
 app.include_router(upload_router, prefix="/api")
 
 app.include_router(search_router, prefix="/api")
+app.include_router(admin_router, prefix="/api")
+app.include_router(health_router)
 
 
 @app.get("/health")
@@ -79,8 +95,21 @@ async def health_check():
             content={"status": "starting"}
         )
 
-    return {"status": "healthy", "app": settings.app_name}
+    # An open vector store circuit degrades search but the API stays up
+    return {
+        "status": "healthy",
+        "app": settings.app_name,
+        "vectorStore": vector_breaker.stats(),
+    }
+
+
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus exposition (search, upload, embedding, vector store, DB pool)."""
+    if not metrics_available():
+        return JSONResponse(status_code=503, content={"status": "prometheus_client not installed"})
+    return Response(content=render_latest(), media_type=CONTENT_TYPE)
 
 
 @app.get("/")
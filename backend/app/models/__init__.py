@@ -3,8 +3,9 @@ from app.models.search_history import SearchHistory
 from .pdf_triples import PDFTriple
 from app.models.pdf_metadata import PDFMetadata, ProcessingStatus
 from app.models.pdf_chunks import PDFChunk
+from app.models.ingest_stage import IngestStage
 
 
-__all__ = ["User", "SearchHistory", "PDFTriple", "PDFMetadata", "ProcessingStatus", "PDFChunk"]
+__all__ = ["User", "SearchHistory", "PDFTriple", "PDFMetadata", "ProcessingStatus", "PDFChunk", "IngestStage"]
 
 
@@ -0,0 +1,41 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Float, ForeignKey, String, UniqueConstraint, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import Base
+
+# Task wall time row (one per task and document)
+TOTAL_STAGE = "total"
+# Stages contained in another stage (never the dominant one)
+NESTED_STAGES = {"tokenize"}
+
+
+class IngestStage(Base):
+    """One ingestion stage of one document (written by app/worker/ledger.py)."""
+
+    __tablename__ = "ingest_stages"
+    __table_args__ = (
+        # A retried task replaces its rows (ON CONFLICT target)
+        UniqueConstraint("pdf_metadata_id", "task", "stage", name="uq_ingest_stages_pdf_task_stage"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        server_default=text("gen_random_uuid()"),
+    )
+    pdf_metadata_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("pdf_metadata.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    task: Mapped[str] = mapped_column(String(64), nullable=False)
+    stage: Mapped[str] = mapped_column(String(64), nullable=False)
+    duration_ms: Mapped[float] = mapped_column(Float, nullable=False)
+    item_count: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    recorded_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=text("now()"),
+        nullable=False,
+    )
@@ -30,7 +30,7 @@ class PDFMetadata(Base):
     )
     object_key: Mapped[str] = mapped_column(
         String(500),
-        unique=True,
+        index=True,
         nullable=False,
     )
     file_size: Mapped[int] = mapped_column(
@@ -53,6 +53,17 @@ class PDFMetadata(Base):
         UUID(as_uuid=True),
         nullable=True,  # Optional: link to user who uploaded
     )
+    content_hash: Mapped[str] = mapped_column(
+        String(64),
+        nullable=True,
+        index=True,
+    )
+    # Owner row whose chunks/triples/vectors are reused (NULL = owns them)
+    source_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=True,
+        index=True,
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
@@ -63,4 +74,9 @@ class PDFMetadata(Base):
         default=datetime.utcnow,
         onupdate=datetime.utcnow,
         nullable=False,
-    )
\ No newline at end of file
+    )
+
+    @property
+    def artifact_id(self) -> uuid.UUID:
+        """ID under which chunks, triples and vectors are stored."""
+        return self.source_id or self.id
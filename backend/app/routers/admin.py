@@ -0,0 +1,86 @@
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.dependencies import get_admin_user
+from app.models.user import User
+from app.schemas import ApiResponse
+from app.models.ingest_stage import NESTED_STAGES, TOTAL_STAGE
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+# SLOWEST INGESTIONS (ingest_stages ledger)
+@router.get("/ingestion/slowest", response_model=ApiResponse)
+async def slowest_ingestions(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    admin: Annotated[User, Depends(get_admin_user)],
+    limit: int = Query(20, ge=1, le=200),
+    task: Optional[str] = Query(None, description="process_pdf or embed_pdf (default: both)"),
+):
+    """
+    Documents with the longest ingestion (sum of task wall times), with
+    their per-stage durations / item counts and the dominant stage.
+    """
+    task_filter = "AND s.task = :task" if task else ""
+    docs = (await db.execute(
+        text(f"""
+            SELECT s.pdf_metadata_id AS id, m.filename, m.page_count, m.file_size,
+                   m.status, SUM(s.duration_ms) AS total_ms, MAX(s.recorded_at) AS recorded_at
+            FROM ingest_stages s
+            JOIN pdf_metadata m ON m.id = s.pdf_metadata_id
+            WHERE s.stage = :total
+              {task_filter}
+            GROUP BY s.pdf_metadata_id, m.filename, m.page_count, m.file_size, m.status
+            ORDER BY total_ms DESC
+            LIMIT :limit
+        """),
+        {"total": TOTAL_STAGE, "task": task, "limit": limit},
+    )).fetchall()
+
+    stages_by_doc = {d.id: [] for d in docs}
+    if docs:
+        rows = (await db.execute(
+            text(f"""
+                SELECT s.pdf_metadata_id AS id, s.task, s.stage, s.duration_ms, s.item_count
+                FROM ingest_stages s
+                WHERE s.pdf_metadata_id = ANY(:ids)
+                  AND s.stage <> :total
+                  {task_filter}
+                ORDER BY s.duration_ms DESC
+            """),
+            {"ids": list(stages_by_doc), "total": TOTAL_STAGE, "task": task},
+        )).fetchall()
+        for r in rows:
+            stages_by_doc[r.id].append({
+                "task": r.task,
+                "stage": r.stage,
+                "ms": round(r.duration_ms, 1),
+                "items": r.item_count,
+            })
+
+    results = []
+    for d in docs:
+        stages = stages_by_doc[d.id]
+        # Rows are sorted by duration; nested stages are part of another one
+        dominant = next((s for s in stages if s["stage"] not in NESTED_STAGES), None)
+        results.append({
+            "id": str(d.id),
+            "filename": d.filename,
+            "pageCount": d.page_count,
+            "fileSize": d.file_size,
+            "status": d.status,
+            "totalMs": round(d.total_ms, 1),
+            "dominantStage": dominant["stage"] if dominant else None,
+            "dominantShare": round(dominant["ms"] / d.total_ms, 3) if dominant and d.total_ms else None,
+            "stages": stages,
+            "recordedAt": d.recorded_at.isoformat() if d.recorded_at else None,
+        })
+
+    return ApiResponse(
+        success=True,
+        data={"documents": results},
+    )
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 
 from app.config import settings
-from app.services.qdrant.qdrant_client import client, COLLECTION_NAME, VECTOR_SIZE
+from app.services.qdrant.qdrant_client import async_client, client, COLLECTION_NAME, VECTOR_SIZE
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -9,7 +9,7 @@ router = APIRouter(prefix="/health", tags=["health"])
 @router.get("/qdrant")
 async def qdrant_health():
     """Check Qdrant connectivity and collection vector size."""
-    info = client.get_collection(COLLECTION_NAME)
+    info = await async_client.get_collection(COLLECTION_NAME)
     vector_size = info.config.params.vectors.size
 
     return {
@@ -19,5 +19,8 @@ async def qdrant_health():
         "expected_vector_size": VECTOR_SIZE,
         "host": settings.qdrant_host,
         "port": settings.qdrant_port,
+        "transport": "grpc" if settings.qdrant_prefer_grpc else "rest",
         "match": vector_size == VECTOR_SIZE,
+        # Per-method latency / error / retry counters of this process
+        "calls": client.stats(),
     }
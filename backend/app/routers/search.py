@@ -1,78 +1,518 @@
+import asyncio
+import json
+import logging
 import time
 import uuid
-import re
-import numpy as np
-from typing import Dict, List
+from typing import Annotated, AsyncIterator, Dict, List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from sentence_transformers.util import cos_sim
-
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, async_session
 from app.dependencies import get_current_user
 from app.models import PDFMetadata
 from app.models.search_history import SearchHistory
 from app.models.user import User
 from app.schemas import ApiResponse
 
-from app.services.embeddings.embedder import embed_query
+from app.services.embeddings.embedder import embed_query, expand_query
 from app.services.search.fusion import (
     semantic_channel,
+    semantic_channel_batch,
     lexical_channel,
+    lexical_channel_batch,
     triple_channel,
+    triple_channel_batch,
     fuse_results,
+    qdrant_lexical_enabled,
+)
+from app.services.search.rerank import (
+    order_by_page,
+    gather_sentences,
+    priority_order,
+    subset_candidates,
+    score_candidates,
+    lexical_scores,
+    split_candidate_sentences,
+    rank,
+    RerankScores,
+    CandidateSentences,
+    RERANK_CHUNK_HITS,
+)
+from app.services.search.result_cache import (
+    RankedHit,
+    RankedSearch,
+    result_cache,
+    encode_cursor,
+    decode_cursor,
+)
+from app.services.search.deadline import (
+    Deadline,
+    ChannelReport,
+    request_deadline,
+    set_statement_timeout,
 )
-from app.services.search.utils import split_query_sentences
+from app.services.metrics import SEARCH_SECONDS, SEARCH_STAGE_SECONDS, Timings, timed, use_timings
+from app.services.qdrant.breaker import vector_breaker
+from app.services.search.admission import AdmissionRejected, Slot, admission
+from app.services.tracing import in_context
+from app.services.search.exact import exact_search
+from app.services.search.utils import split_query_sentences, tokens, exact_phrase
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
-_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
-_TOKEN_RE = re.compile(r"[a-zA-Z0-9]+")
 
-_STOPWORDS = {
-    "the","is","are","was","were","of","on","in","for","to",
-    "with","using","use","based","by","and","or","from"
-}
+def rank_hits(
+    fused: List[Dict],
+    scores: RerankScores,
+    cand: CandidateSentences,
+    id_map: Dict[str, PDFMetadata],
+) -> List[RankedHit]:
+    """Full ranking of surviving hits as lightweight tuples."""
+    order, _ = rank(scores, len(fused))
+    ranked = []
+    for i in order:
+        sent_idx = scores.best_sentence[i]
+        ranked.append(RankedHit(
+            document_id=str(id_map[fused[i]["pdf_id"]].id),
+            page=fused[i]["page"],
+            snippet=cand.sentences[sent_idx] if sent_idx >= 0 else "",
+            confidence=int(scores.confidence[i]),
+            semantic=round(float(scores.semantic[i]), 3),
+            lexical=round(float(scores.lexical[i]), 3),
+            has_oie=bool(fused[i].get("has_oie")),
+        ))
+    return ranked
+
+
+def unscored_hits(
+    fused: List[Dict],
+    scored: List[Dict],
+    id_map: Dict[str, PDFMetadata],
+) -> List[RankedHit]:
+    """
+    Candidates the rerank did not reach before the deadline, best channel
+    rank first. They go after the scored hits with confidence 0.
+    """
+    seen = {id(h) for h in scored}
+    out = []
+    for i in priority_order(fused):
+        h = fused[i]
+        if id(h) in seen:
+            continue
+        sentences = split_candidate_sentences(h.get("text") or "")
+        out.append(RankedHit(
+            document_id=str(id_map[h["pdf_id"]].id),
+            page=h["page"],
+            snippet=sentences[0] if sentences else (h.get("text") or "")[:200],
+            confidence=0,
+            semantic=0.0,
+            lexical=0.0,
+            has_oie=bool(h.get("has_oie")),
+        ))
+    return out
+
+
+def build_result(hit: RankedHit, search: RankedSearch) -> Dict:
+    # 🔒 semantic fallback for long queries highlights the sentence itself
+    if search.fallback:
+        highlight = tokens(hit.snippet)[:8]
+    else:
+        highlight = list(set(tokens(hit.snippet)) & search.query_tokens)[:8]
+
+    return {
+        "documentId": hit.document_id,
+        "documentName": search.document_names[hit.document_id],
+        "pageNumber": hit.page,
+        "snippet": hit.snippet,
+        "highlightTokens": highlight,
+        "confidenceScore": hit.confidence,
+        "hasOie": hit.has_oie,
+        "matchOffsets": [list(span) for span in hit.offsets],
+        "scores": {
+            "semantic": hit.semantic,
+            "lexical": hit.lexical,
+        },
+    }
+
+
+def page_data(search_id: str, search: RankedSearch, offset: int, limit: int) -> Dict:
+    """Materialize one page of a cached ranked result set."""
+    end = offset + limit
+    return {
+        "results": [build_result(h, search) for h in search.hits[offset:end]],
+        "totalResults": len(search.hits),
+        "searchId": search_id,
+        "nextCursor": encode_cursor(search_id, end) if end < len(search.hits) else None,
+    }
+
+
+# Same shape as page_data() when the user has no searchable documents
+EMPTY_PAGE = {"results": [], "totalResults": 0, "searchId": None, "nextCursor": None}
+
+
+class SearchRequest(BaseModel):
+    query: str = Field(..., min_length=1)
+    limit: int = Field(default=5, ge=1, le=50)
+    # auto: quoted phrases and identifiers (part numbers, error codes) go exact
+    mode: Literal["auto", "semantic", "exact"] = "auto"
+    # Overrides search_deadline_ms for this request (0 = no deadline)
+    deadline_ms: Optional[int] = Field(default=None, ge=0, le=60000)
+    # Return per-stage timings (ms) in the response
+    debug: bool = False
+
+
+class SearchPageRequest(BaseModel):
+    cursor: str = Field(..., min_length=1)
+    limit: int = Field(default=5, ge=1, le=50)
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[Annotated[str, Field(min_length=1)]] = Field(..., min_length=1, max_length=200)
+    limit: int = Field(default=5, ge=1, le=50)
+    mode: Literal["auto", "semantic", "exact"] = "auto"
 
-def tokens(text):
+
+def search_phrase(query: str, mode: str):
+    """Phrase for exact mode, or None to run the semantic pipeline."""
+    if mode == "semantic":
+        return None
+    phrase = exact_phrase(query)
+    if mode == "exact":
+        return phrase or query.strip()
+    return phrase
+
+
+async def exact_ranked(db: AsyncSession, phrase: str, id_map: Dict[str, PDFMetadata]) -> List[RankedHit]:
+    with timed("exact"):
+        matches = await exact_search(db, phrase, [uuid.UUID(i) for i in id_map])
     return [
-        t for t in _TOKEN_RE.findall(text.lower())
-        if t not in _STOPWORDS and len(t) > 2
+        RankedHit(
+            document_id=str(id_map[m.pdf_id].id),
+            page=m.page,
+            snippet=m.snippet,
+            confidence=100,
+            semantic=0.0,
+            lexical=1.0,
+            has_oie=False,
+            offsets=m.offsets,
+        )
+        for m in matches
     ]
 
 
-def lexical_sentence_score(sentence: str, query: str) -> float:
-    s = set(tokens(sentence))
-    q = set(tokens(query))
-    if not q:
-        return 0.0
-    overlap = len(s & q) / len(q)
-    if overlap >= 0.9:
-        return 1.0
-    if overlap >= 0.75:
-        return 0.7
-    if overlap >= 0.5:
-        return 0.5
-    return 0.0
+async def embed_query_vectors(query: str, query_sents: List[str]):
+    # 🔒 CRITICAL: sentence-wise semantic fan-out, NO regression
+    if len(query_sents) >= 2:
+        return await embed_query(query_sents)
+    return [await embed_query(query)]
+
+
+def start_channels(
+    query: str,
+    query_sents: List[str],
+    allowed_ids: List[str],
+    deadline: Deadline,
+    with_semantic: bool = True,
+) -> Dict[asyncio.Task, str]:
+    """
+    Launch the retrieval channels concurrently; each task returns
+    (query_vecs or None, hits). SQL statements are bounded by `deadline`.
+    Without the semantic channel nothing is embedded.
+    """
+    uuids = [uuid.UUID(i) for i in allowed_ids]
+    hybrid = with_semantic and qdrant_lexical_enabled()
+    # Hybrid mode: lexical hits arrive with the semantic channel's request
+    sparse_hits: List[Dict] = []
+
+    async def semantic():
+        with timed("embed_query"):
+            vecs = await embed_query_vectors(query, query_sents)
+        loop = asyncio.get_running_loop()
+        hits = []
+        with timed("vector_search"):
+            for i, qv in enumerate(vecs):
+                hits.extend(await loop.run_in_executor(None, in_context(
+                    semantic_channel, qv, allowed_ids, query,
+                    sparse_hits if hybrid and i == 0 else None,
+                )))
+        return vecs, hits
+
+    async def from_db(channel, stage: str):
+        # Concurrent channels cannot share one session
+        async with async_session() as db:
+            await set_statement_timeout(db, deadline)
+            with timed(stage):
+                return None, await channel(db, query, uuids)
+
+    async def lexical():
+        if hybrid:
+            await asyncio.wait([semantic_task])
+            if not semantic_task.cancelled() and semantic_task.exception() is None:
+                return None, sparse_hits
+            # Hybrid request failed: lexical hits from Postgres instead
+        return await from_db(lexical_channel, "lexical")
+
+    tasks = {}
+    if with_semantic:
+        semantic_task = asyncio.create_task(semantic())
+        tasks[semantic_task] = "semantic"
+    tasks[asyncio.create_task(lexical())] = "lexical"
+    tasks[asyncio.create_task(from_db(triple_channel, "triples"))] = "triples"
+    return tasks
+
+
+def ranked_search(
+    hits: List[Dict],
+    scores: RerankScores,
+    cand: CandidateSentences,
+    query: str,
+    user_id: str,
+    id_map: Dict[str, PDFMetadata],
+) -> RankedSearch:
+    # Rank on score tuples; response objects are built for the page only
+    return RankedSearch(
+        user_id=user_id,
+        query_tokens=set(tokens(query)),
+        fallback=scores.fallback,
+        hits=rank_hits(hits, scores, cand, id_map),
+        document_names={str(d.id): d.filename for d in id_map.values()},
+    )
 
 
-async def best_sentence_score(text: str, query_vec):
-    sents = [s.strip() for s in _SENT_SPLIT.split(text) if len(s.strip()) > 20]
-    if not sents:
-        return "", 0.0
+async def rerank_search(
+    fused: List[Dict],
+    query: str,
+    query_vecs,
+    query_sents: List[str],
+    user_id: str,
+    id_map: Dict[str, PDFMetadata],
+) -> RankedSearch:
+    # 🔒 sentence-aligned semantic + lexical, one batched encode for all hits
+    cand = gather_sentences(fused)
+    with timed("rerank_encode"):
+        sentence_vecs = await embed_query(cand.sentences) if cand.sentences else []
+    with timed("rerank_score"):
+        scores = score_candidates(fused, cand, sentence_vecs, query_vecs, query_sents)
+        return ranked_search(fused, scores, cand, query, user_id, id_map)
+
+
+def lexical_ranked(
+    fused: List[Dict],
+    query: str,
+    query_sents: List[str],
+    user_id: str,
+    id_map: Dict[str, PDFMetadata],
+) -> RankedSearch:
+    # Degraded mode: sentence lexical overlap only, nothing is encoded
+    cand = gather_sentences(fused)
+    with timed("rerank_score"):
+        scores = lexical_scores(fused, cand, query_sents or [query])
+        return ranked_search(fused, scores, cand, query, user_id, id_map)
+
+
+def search_meta(report: ChannelReport, rerank_info: Dict) -> Dict:
+    """Channel status, rerank coverage and partial/degraded flags."""
+    return {
+        "channels": report.summary(),
+        "rerank": rerank_info,
+        "partial": report.partial or rerank_info["scored"] < rerank_info["total"],
+        "degraded": report.degraded,
+    }
+
+
+async def rerank_progressive(
+    fused: List[Dict],
+    query_vecs,
+    query_sents: List[str],
+    chunk_hits: int = RERANK_CHUNK_HITS,
+) -> AsyncIterator[Tuple[List[Dict], RerankScores, CandidateSentences, bool]]:
+    """
+    Rerank in steps of `chunk_hits` candidates, most promising first.
+
+    Each step encodes only the new hits' sentences and yields the scores of
+    every hit scored so far (in page order) and whether all hits are in.
+    The last step scores the full list, identical to rerank_search.
+    """
+    cand = gather_sentences(fused)
+    order = priority_order(fused)
+    vectors: List = [None] * len(cand.sentences)
+    scored: List[int] = []
+
+    for step in range(0, max(len(order), 1), chunk_hits):
+        chunk = order[step:step + chunk_hits]
+        rows = [r for i in chunk for r in range(cand.offsets[i], cand.offsets[i + 1])]
+        if rows:
+            with timed("rerank_encode"):
+                encoded = await embed_query([cand.sentences[r] for r in rows])
+            for r, vec in zip(rows, encoded):
+                vectors[r] = vec
+        scored.extend(int(i) for i in chunk)
+
+        idx = np.sort(np.asarray(scored, dtype=np.int64))
+        sub_cand, sentence_rows = subset_candidates(cand, idx)
+        sub_hits = [fused[i] for i in idx]
+        with timed("rerank_score"):
+            scores = score_candidates(
+                sub_hits, sub_cand, [vectors[r] for r in sentence_rows], query_vecs, query_sents
+            )
+        yield sub_hits, scores, sub_cand, len(scored) == len(fused)
+
+
+async def semantic_ranked(
+    query: str,
+    user_id: str,
+    id_map: Dict[str, PDFMetadata],
+    deadline: Deadline,
+) -> Tuple[RankedSearch, ChannelReport, Dict]:
+    """
+    Embed, retrieve on all channels, fuse and rerank within `deadline`.
+
+    Returns the ranked search, the per-channel report and how many of the
+    fused candidates the rerank got to.
+    """
+    query_sents = split_query_sentences(query)
+
+    report = ChannelReport()
+    report.degraded = not vector_breaker.available()
+    if report.degraded:
+        report.unavailable("semantic")
+
+    channel_deadline = deadline.share(settings.search_channel_share)
+    tasks = start_channels(
+        query, query_sents, list(id_map), channel_deadline, with_semantic=not report.degraded
+    )
 
-    sent_vecs = await embed_query(sents)
-    sims = cos_sim(np.array(query_vec), np.array(sent_vecs))[0]
-    idx = int(np.argmax(sims))
-    return sents[idx], float(sims[idx])
+    done, pending = await asyncio.wait(tasks, timeout=channel_deadline.remaining())
+    for task in done:
+        report.collect(tasks[task], task)
+    for task in pending:
+        task.cancel()
+        report.timed_out(tasks[task])
 
+    fused = order_by_page(fuse_results(
+        report.hits["semantic"], report.hits["lexical"], report.hits["triples"]
+    ))
 
-class SearchRequest(BaseModel):
-    query: str = Field(..., min_length=1)
-    limit: int = Field(default=5, ge=1, le=50)
+    if report.degraded:
+        search = lexical_ranked(fused, query, query_sents, user_id, id_map)
+        return search, report, {"scored": 0, "total": len(fused)}
+
+    # Rerank needs the query vectors even if the semantic channel missed
+    query_vecs = report.query_vecs or await embed_query_vectors(query, query_sents)
+
+    if not deadline.enabled:
+        search = await rerank_search(fused, query, query_vecs, query_sents, user_id, id_map)
+        return search, report, {"scored": len(fused), "total": len(fused)}
+
+    # Best results so far when time runs out (at least one step runs)
+    steps = rerank_progressive(fused, query_vecs, query_sents)
+    try:
+        async for sub_hits, scores, sub_cand, complete in steps:
+            if complete or deadline.expired():
+                break
+    finally:
+        await steps.aclose()
+
+    search = ranked_search(sub_hits, scores, sub_cand, query, user_id, id_map)
+    if not complete:
+        search.hits.extend(unscored_hits(fused, sub_hits, id_map))
+    return search, report, {"scored": len(sub_hits), "total": len(fused)}
+
+
+async def semantic_ranked_batch(
+    db: AsyncSession,
+    queries: List[str],
+    user_id: str,
+    id_map: Dict[str, PDFMetadata],
+    degraded: bool = False,
+) -> AsyncIterator[Tuple[int, RankedSearch]]:
+    """
+    semantic_ranked for many queries: one encode, one Qdrant batch request
+    and one lexical / triple SQL round trip for all of them, then per-query
+    rerank, yielded as each query finishes. `degraded` skips the encode and
+    the vector store and ranks lexically.
+    """
+    allowed_ids = list(id_map)
+    uuids = [uuid.UUID(i) for i in allowed_ids]
+    query_sents = [split_query_sentences(q) for q in queries]
+
+    if degraded:
+        with timed("lexical"):
+            lexical_hits = await lexical_channel_batch(db, queries, uuids)
+        with timed("triples"):
+            triple_hits = await triple_channel_batch(db, queries, uuids)
+        for qi, query in enumerate(queries):
+            fused = order_by_page(fuse_results([], lexical_hits[qi], triple_hits[qi]))
+            yield qi, lexical_ranked(fused, query, query_sents[qi], user_id, id_map)
+        return
+
+    # Same texts as the single-query path: sentences, or the expanded query
+    texts, owner = [], []
+    for qi, (query, sents) in enumerate(zip(queries, query_sents)):
+        parts = sents if len(sents) >= 2 else [expand_query(query)]
+        texts.extend(parts)
+        owner.extend([qi] * len(parts))
+
+    with timed("embed_query"):
+        vectors = await embed_query(texts)
+    query_vecs = [[] for _ in queries]
+    for qi, vec in zip(owner, vectors):
+        query_vecs[qi].append(vec)
+
+    # Hybrid mode: each query's sparse search rides on its first vector
+    lexical_texts = None
+    if qdrant_lexical_enabled():
+        lexical_texts = [
+            queries[qi] if i == 0 or owner[i - 1] != qi else None for i, qi in enumerate(owner)
+        ]
+
+    with timed("vector_search"):
+        try:
+            semantic, sparse = semantic_channel_batch(vectors, allowed_ids, lexical_texts)
+        except Exception:
+            # Only the hybrid request raises; lexical hits then come from Postgres
+            logger.exception("Hybrid batch search failed")
+            semantic, sparse = [[] for _ in vectors], None
+    semantic_hits = [[] for _ in queries]
+    for qi, hits in zip(owner, semantic):
+        semantic_hits[qi].extend(hits)
+
+    if sparse is not None:
+        lexical_hits = [[] for _ in queries]
+        for qi, hits in zip(owner, sparse):
+            lexical_hits[qi].extend(hits)
+    else:
+        with timed("lexical"):
+            lexical_hits = await lexical_channel_batch(db, queries, uuids)
+    with timed("triples"):
+        triple_hits = await triple_channel_batch(db, queries, uuids)
+
+    for qi, query in enumerate(queries):
+        fused = order_by_page(fuse_results(semantic_hits[qi], lexical_hits[qi], triple_hits[qi]))
+        yield qi, await rerank_search(
+            fused, query, query_vecs[qi], query_sents[qi], user_id, id_map
+        )
+
+
+async def admit(user_id: uuid.UUID) -> Slot:
+    """A search slot for the user, or 429 with Retry-After when saturated."""
+    try:
+        return await admission.acquire(str(user_id))
+    except AdmissionRejected as e:
+        logger.warning("Search rejected for user %s: %s", user_id, e.reason)
+        raise HTTPException(
+            status_code=429,
+            detail=f"Search is busy ({e.reason}), retry in {e.retry_after}s",
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
 
 @router.post("", response_model=ApiResponse)
@@ -93,118 +533,467 @@ async def search_documents(
     ).scalars().all()
 
     if not docs:
-        return ApiResponse(success=True, data={"results": []})
-
-    allowed_ids = [str(d.id) for d in docs]
-    id_map = {str(d.id): d for d in docs}
-
-    query_sents = split_query_sentences(request.query)
+        return ApiResponse(success=True, data=dict(EMPTY_PAGE))
+
+    # Deduplicated documents search their owner's chunks and vectors
+    id_map = {}
+    for d in docs:
+        id_map.setdefault(str(d.artifact_id), d)
+
+    phrase = search_phrase(request.query, request.mode)
+    mode = "exact" if phrase is not None else "semantic"
+    timings = Timings(SEARCH_STAGE_SECONDS)
+
+    with use_timings(timings):
+        with timed("admission"):
+            slot = await admit(current_user.id)
+
+        async with slot:
+            if phrase is not None:
+                # Identifier / exact phrase: trigram lookup, no embedding
+                search = RankedSearch(
+                    user_id=str(current_user.id),
+                    query_tokens=set(tokens(phrase)),
+                    fallback=False,
+                    hits=await exact_ranked(db, phrase, id_map),
+                    document_names={str(d.id): d.filename for d in id_map.values()},
+                )
+                report, rerank_info = None, None
+            else:
+                search, report, rerank_info = await semantic_ranked(
+                    request.query, str(current_user.id), id_map, request_deadline(request.deadline_ms)
+                )
+
+        search_id = result_cache.put(search)
+
+        with timed("history"):
+            db.add(SearchHistory(
+                user_id=current_user.id,
+                query=request.query[:500]
+            ))
+            await db.commit()
+
+        with timed("page"):
+            data = page_data(search_id, search, 0, request.limit)
+
+    data["mode"] = mode
+    if report is not None:
+        data.update(search_meta(report, rerank_info))
+    data["searchTime"] = round(time.perf_counter() - start, 3)
+    SEARCH_SECONDS.labels(mode=mode).observe(time.perf_counter() - start)
+    if request.debug:
+        data["timings"] = timings.as_ms()
+
+    return ApiResponse(success=True, data=data)
+
+
+@router.post("/page", response_model=ApiResponse)
+async def search_page(
+    request: SearchPageRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """Next slice of a previous search; never re-embeds or re-queries."""
+    start = time.perf_counter()
 
-    # 🔒 CRITICAL: sentence-wise semantic fan-out, NO regression
-    if len(query_sents) >= 2:
-        query_vecs = await embed_query(query_sents)
-    else:
-        query_vecs = [await embed_query(request.query)]
+    decoded = decode_cursor(request.cursor)
+    if decoded is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    search_id, offset = decoded
+    search = result_cache.get(search_id)
+    if search is None or search.user_id != str(current_user.id):
+        raise HTTPException(status_code=410, detail="Search expired, please search again")
+
+    data = page_data(search_id, search, offset, request.limit)
+    data["searchTime"] = round(time.perf_counter() - start, 3)
+
+    return ApiResponse(success=True, data=data)
+
+
+def ndjson(obj: Dict) -> str:
+    return json.dumps(obj) + "\n"
+
+
+class SlotResponse(StreamingResponse):
+    """
+    StreamingResponse that holds an admission slot until the response ends.
+
+    The body generator's finally never runs when the client disconnects
+    before the first chunk, and Starlette skips background tasks on a
+    disconnect, so the slot is released around the whole ASGI call.
+    """
+
+    def __init__(self, content, slot: Slot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+
+async def batch_lines(
+    request: BatchSearchRequest,
+    user_id: uuid.UUID,
+    id_map: Dict[str, PDFMetadata],
+    start: float,
+) -> AsyncIterator[str]:
+    """
+    One NDJSON line per query as soon as it is ranked, then a summary.
+
+    A query that fails gets a {"success": false, "error"} line instead; the
+    summary line is always the last one.
+    """
+    phrases = [search_phrase(q, request.mode) for q in request.queries]
+    modes = ["exact" if phrase is not None else "semantic" for phrase in phrases]
+    degraded = not vector_breaker.available()
+    answered = set()
+    failed = 0
+
+    def line(i: int, search: RankedSearch) -> str:
+        data = page_data(result_cache.put(search), search, 0, request.limit)
+        if modes[i] == "semantic":
+            data["degraded"] = degraded
+        answered.add(i)
+        return ndjson({
+            "index": i,
+            "query": request.queries[i],
+            "success": True,
+            "mode": modes[i],
+            "data": data,
+        })
+
+    def error_line(i: int) -> str:
+        nonlocal failed
+        failed += 1
+        answered.add(i)
+        return ndjson({
+            "index": i,
+            "query": request.queries[i],
+            "success": False,
+            "mode": modes[i],
+            "error": "Search failed",
+        })
+
+    try:
+        # The request session is closed once streaming starts
+        async with async_session() as db:
+            # Exact queries need no embedding: answer them first
+            for i, phrase in enumerate(phrases):
+                if phrase is None:
+                    continue
+                try:
+                    hits = await exact_ranked(db, phrase, id_map)
+                except Exception:
+                    logger.exception("Exact search failed in batch (query %d)", i)
+                    await db.rollback()
+                    yield error_line(i)
+                    continue
+                yield line(i, RankedSearch(
+                    user_id=str(user_id),
+                    query_tokens=set(tokens(phrase)),
+                    fallback=False,
+                    hits=hits,
+                    document_names={str(d.id): d.filename for d in id_map.values()},
+                ))
+
+            semantic_idx = [i for i, phrase in enumerate(phrases) if phrase is None]
+            if semantic_idx and id_map:
+                batch = semantic_ranked_batch(
+                    db, [request.queries[i] for i in semantic_idx], str(user_id), id_map, degraded
+                )
+                try:
+                    async for qi, search in batch:
+                        yield line(semantic_idx[qi], search)
+                except Exception:
+                    # Queries not yet yielded get error lines below
+                    logger.exception("Semantic batch search failed")
+                    await db.rollback()
+            else:
+                # No completed documents: never query Qdrant without a scope
+                for i in semantic_idx:
+                    yield line(i, RankedSearch(
+                        user_id=str(user_id),
+                        query_tokens=set(),
+                        fallback=False,
+                        hits=[],
+                        document_names={},
+                    ))
+
+            db.add_all([
+                SearchHistory(user_id=user_id, query=q[:500]) for q in request.queries
+            ])
+            await db.commit()
+    except Exception:
+        logger.exception("Batch search failed")
+
+    for i in range(len(request.queries)):
+        if i not in answered:
+            yield error_line(i)
+
+    yield ndjson({
+        "done": True,
+        "totalQueries": len(request.queries),
+        "failedQueries": failed,
+        "searchTime": round(time.perf_counter() - start, 3),
+    })
+
+
+@router.post("/batch")
+async def search_batch(
+    request: BatchSearchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Many queries against one document scope, streamed as NDJSON.
+
+    Each line is {"index", "query", "success", "mode", "data"} where data is
+    the first page of that query (pageable via POST /search/page), or
+    {"index", "query", "success": false, "mode", "error"} if it failed; the
+    last line is {"done": true, "totalQueries", "failedQueries", "searchTime"}.
+    """
+    start = time.perf_counter()
 
-    semantic_hits = []
-    for qv in query_vecs:
-        semantic_hits.extend(
-            semantic_channel(qv, allowed_ids, request.query)
+    docs = (
+        await db.execute(
+            select(PDFMetadata).where(
+                PDFMetadata.uploaded_by == current_user.id,
+                PDFMetadata.status == "COMPLETED",
+            )
         )
+    ).scalars().all()
 
-    lexical_hits = await lexical_channel(
-        db, request.query, [uuid.UUID(i) for i in allowed_ids]
-    )
-
-    triple_hits = await triple_channel(
-        db, request.query, [uuid.UUID(i) for i in allowed_ids]
-    )
-
-    fused = fuse_results(semantic_hits, lexical_hits, triple_hits)
-
-    pages: Dict[int, list] = {}
-    for h in fused:
-        pages.setdefault(h["page"], []).append(h)
-
-    candidates = []
-
-    for page, hits in pages.items():
-        for h in hits:
-            text = h.get("text") or h.get("parent_text") or ""
+    id_map = {}
+    for d in docs:
+        id_map.setdefault(str(d.artifact_id), d)
+
+    # The whole batch holds one slot: its encoding is batched already
+    timings = Timings(SEARCH_STAGE_SECONDS)
+    with use_timings(timings), timed("admission"):
+        slot = await admit(current_user.id)
+
+    async def body():
+        try:
+            with use_timings(timings):
+                async for line in batch_lines(request, current_user.id, id_map, start):
+                    yield line
+        finally:
+            SEARCH_SECONDS.labels(mode="batch").observe(time.perf_counter() - start)
+
+    return SlotResponse(body(), slot, media_type="application/x-ndjson")
+
+
+# STREAMING
+def preview_results(hits: List[Dict], id_map: Dict[str, PDFMetadata], limit: int) -> List[Dict]:
+    """Provisional top hits before rerank: best channel rank first."""
+    out = []
+    for i in priority_order(hits)[:limit]:
+        h = hits[i]
+        doc = id_map.get(h["pdf_id"])
+        if doc is None:
+            continue
+        sentences = split_candidate_sentences(h.get("text") or "")
+        out.append({
+            "documentId": str(doc.id),
+            "documentName": doc.filename,
+            "pageNumber": h["page"],
+            "snippet": sentences[0] if sentences else (h.get("text") or "")[:200],
+            "provisional": True,
+            "scores": {
+                "semantic": round(h["semantic_score"], 3) if "semantic_score" in h else None,
+                "lexical": round(h["lexical_score"], 3) if "lexical_score" in h else None,
+            },
+        })
+    return out
+
+
+async def search_events(
+    request: SearchRequest,
+    user_id: uuid.UUID,
+    id_map: Dict[str, PDFMetadata],
+    start: float,
+    timings: Timings,
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    (event, payload) pairs: channel previews, rerank steps, final page.
+
+    A failure ends the stream with an "error" event instead of cutting it.
+    """
+    try:
+        phrase = search_phrase(request.query, request.mode)
+        yield "start", {"mode": "exact" if phrase is not None else "semantic"}
+
+        report, rerank_info = None, None
+
+        if phrase is not None:
+            async with async_session() as db:
+                hits = await exact_ranked(db, phrase, id_map)
+            search = RankedSearch(
+                user_id=str(user_id),
+                query_tokens=set(tokens(phrase)),
+                fallback=False,
+                hits=hits,
+                document_names={str(d.id): d.filename for d in id_map.values()},
+            )
+        elif not id_map:
+            search = RankedSearch(
+                user_id=str(user_id),
+                query_tokens=set(),
+                fallback=False,
+                hits=[],
+                document_names={},
+            )
+        else:
+            deadline = request_deadline(request.deadline_ms)
+            channel_deadline = deadline.share(settings.search_channel_share)
+            query_sents = split_query_sentences(request.query)
+
+            report = ChannelReport()
+            report.degraded = not vector_breaker.available()
+            if report.degraded:
+                report.unavailable("semantic")
+                yield "degraded", {"channels": ["semantic"]}
+
+            tasks = start_channels(
+                request.query, query_sents, list(id_map), channel_deadline,
+                with_semantic=not report.degraded,
+            )
+            pending = set(tasks)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending,
+                        timeout=channel_deadline.remaining(),
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    if not done:
+                        break
+                    for task in done:
+                        name = tasks[task]
+                        error = report.collect(name, task)
+                        merged = fuse_results(
+                            report.hits["semantic"], report.hits["lexical"], report.hits["triples"]
+                        )
+                        yield name, {
+                            "count": len(report.hits[name]),
+                            "error": error,
+                            "results": preview_results(merged, id_map, request.limit),
+                        }
+            finally:
+                for task in pending:
+                    task.cancel()
+                    report.timed_out(tasks[task])
+
+            if pending:
+                yield "timeout", {"channels": sorted(tasks[t] for t in pending)}
+
+            fused = order_by_page(fuse_results(
+                report.hits["semantic"], report.hits["lexical"], report.hits["triples"]
+            ))
+
+            if report.degraded:
+                search = lexical_ranked(fused, request.query, query_sents, str(user_id), id_map)
+                rerank_info = {"scored": 0, "total": len(fused)}
+            else:
+                # Rerank needs the query vectors even if the semantic channel missed
+                query_vecs = report.query_vecs or await embed_query_vectors(request.query, query_sents)
+
+                steps = rerank_progressive(fused, query_vecs, query_sents)
+                try:
+                    async for sub_hits, scores, sub_cand, complete in steps:
+                        search = ranked_search(
+                            sub_hits, scores, sub_cand, request.query, str(user_id), id_map
+                        )
+                        if complete or deadline.expired():
+                            break
+                        yield "rerank", {
+                            "scored": len(sub_hits),
+                            "total": len(fused),
+                            "results": [build_result(h, search) for h in search.hits[:request.limit]],
+                        }
+                finally:
+                    await steps.aclose()
+
+                if not complete:
+                    search.hits.extend(unscored_hits(fused, sub_hits, id_map))
+                rerank_info = {"scored": len(sub_hits), "total": len(fused)}
+
+        search_id = result_cache.put(search)
+
+        async with async_session() as db:
+            db.add(SearchHistory(user_id=user_id, query=request.query[:500]))
+            await db.commit()
+
+        data = page_data(search_id, search, 0, request.limit)
+        data["mode"] = "exact" if phrase is not None else "semantic"
+        if report is not None:
+            data.update(search_meta(report, rerank_info))
+        data["searchTime"] = round(time.perf_counter() - start, 3)
+        SEARCH_SECONDS.labels(mode=data["mode"]).observe(time.perf_counter() - start)
+        if request.debug:
+            data["timings"] = timings.as_ms()
+        yield "final", data
+    except Exception:
+        logger.exception("Streamed search failed")
+        yield "error", {"error": "Search failed"}
+
+
+def sse(event: str, payload: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@router.post("/stream")
+async def search_stream(
+    request: SearchRequest,
+    http_request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    POST /search, streamed: channel previews as each channel answers,
+    rerank refinements, then the same first page as POST /search.
 
-            best_sent = ""
-            best_sem = 0.0
-            best_lex = 0.0
+    NDJSON ({"event": ..., ...payload}) by default; Server-Sent Events
+    when the client sends Accept: text/event-stream.
+    """
+    start = time.perf_counter()
 
-            # 🔒 sentence-aligned semantic + lexical
-            for i, qv in enumerate(query_vecs):
-                sent, sem = await best_sentence_score(text, qv)
-                if sem > best_sem:
-                    best_sem = sem
-                    best_sent = sent
+    docs = (
+        await db.execute(
+            select(PDFMetadata).where(
+                PDFMetadata.uploaded_by == current_user.id,
+                PDFMetadata.status == "COMPLETED",
+            )
+        )
+    ).scalars().all()
 
-                if i < len(query_sents):
-                    best_lex = max(
-                        best_lex,
-                        lexical_sentence_score(sent, query_sents[i])
-                    )
+    id_map = {}
+    for d in docs:
+        id_map.setdefault(str(d.artifact_id), d)
+
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+    timings = Timings(SEARCH_STAGE_SECONDS)
+    with use_timings(timings), timed("admission"):
+        slot = await admit(current_user.id)
+    events = search_events(request, current_user.id, id_map, start, timings)
+
+    async def body():
+        with use_timings(timings):
+            async for event, payload in events:
+                yield sse(event, payload) if use_sse else ndjson({"event": event, **payload})
+
+    return SlotResponse(
+        body(),
+        slot,
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-            # 🔒 delayed guardrail, OIE can rescue
-            if len(query_sents) >= 2:
-                if best_sem < 0.4 and best_lex < 0.5 and not h.get("has_oie"):
-                    continue
 
-            oie = 1.0 if h.get("has_oie") else 0.0
-            confidence = min(1.0, 0.55*best_sem + 0.35*best_lex + 0.10*oie)
-
-            candidates.append({
-                "documentId": h["pdf_id"],
-                "documentName": id_map[h["pdf_id"]].filename,
-                "pageNumber": page,
-                "snippet": best_sent,
-                "highlightTokens": list(set(tokens(best_sent)) & set(tokens(request.query)))[:8],
-                "confidenceScore": int(confidence * 100),
-                "hasOie": bool(h.get("has_oie")),
-                "scores": {
-                    "semantic": round(best_sem, 3),
-                    "lexical": round(best_lex, 3),
-                },
-            })
-
-    # 🔒 semantic fallback for long queries
-    if len(query_sents) >= 2 and not candidates:
-        for page, hits in pages.items():
-            for h in hits:
-                text = h.get("text") or h.get("parent_text") or ""
-                sent, sem = await best_sentence_score(text, query_vecs[0])
-
-                candidates.append({
-                    "documentId": h["pdf_id"],
-                    "documentName": id_map[h["pdf_id"]].filename,
-                    "pageNumber": page,
-                    "snippet": sent,
-                    "highlightTokens": tokens(sent)[:8],
-                    "confidenceScore": int(min(1.0, sem) * 100),
-                    "hasOie": bool(h.get("has_oie")),
-                    "scores": {
-                        "semantic": round(sem, 3),
-                        "lexical": 0.0,
-                    },
-                })
-
-    candidates.sort(key=lambda x: x["confidenceScore"], reverse=True)
-
-    db.add(SearchHistory(
-        user_id=current_user.id,
-        query=request.query[:500]
-    ))
-    await db.commit()
-
-    return ApiResponse(
-        success=True,
-        data={
-            "results": candidates[:request.limit],
-            "totalResults": len(candidates),
-            "searchTime": round(time.perf_counter() - start, 3),
-        },
-    )
+@router.get("/admission", response_model=ApiResponse)
+async def search_admission(current_user: User = Depends(get_current_user)):
+    """Concurrency, queue depth and rejection counts of this API process."""
+    return ApiResponse(success=True, data=admission.stats())
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Response
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from minio import Minio
@@ -9,20 +10,38 @@ from app.models import PDFMetadata, ProcessingStatus
 from app.models.user import User
 from app.schemas import ApiResponse
 from app.dependencies import get_current_user
+from app.worker.celery_app import celery_app
 from app.worker.tasks import process_pdf
+from app.worker.tasks_delete import delete_job_owner, start_delete_job
+from celery.result import AsyncResult
 from app.services.qdrant.qdrant_client import delete_pdf_vectors
+from app.services.lexical.bm25_index import tombstone_pdfs
+from app.services.documents.dedup import find_owner, release_document
+from app.services.documents.streaming import StreamStats, stream_upload
+from app.services.tracing import Traced, in_context
+from app.services.metrics import UPLOAD_FILES, UPLOAD_STAGE_SECONDS, Timings, timed, use_timings
+from app.services.documents.http_range import (
+    RangeNotSatisfiable,
+    http_date,
+    is_not_modified,
+    parse_range,
+    range_applies,
+)
+import asyncio
 import uuid
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
+FILE_STREAM_CHUNK_SIZE = 256 * 1024
+
 
-# MinIO client
-minio_client = Minio(
+# MinIO client (calls inside a trace are recorded as minio.* spans)
+minio_client = Traced(Minio(
     settings.minio_endpoint,
     access_key=settings.minio_access_key,
     secret_key=settings.minio_secret_key,
     secure=False,
-)
+), "minio")
 
 
 def ensure_bucket_exists():
@@ -43,6 +62,48 @@ async def cleanup_orphaned_file(object_key: str):
         pass
 
 
+async def purge_document(db: AsyncSession, doc: PDFMetadata):
+    """Remove a document's vectors, stored file and row (chunks cascade)."""
+    try:
+        delete_pdf_vectors(str(doc.id))
+    except Exception as e:
+        print("Qdrant cleanup failed:", e)
+
+    try:
+        tombstone_pdfs([str(doc.id)])
+    except Exception as e:
+        print("BM25 tombstone failed:", e)
+
+    try:
+        minio_client.remove_object(settings.minio_bucket, doc.object_key)
+    except:
+        pass
+
+    await db.delete(doc)
+
+
+# Bounds how many files are streamed to MinIO at once (per worker process)
+upload_slots = asyncio.Semaphore(settings.upload_concurrency)
+
+
+async def stream_file_to_minio(file: UploadFile, object_key: str, file_size: int) -> StreamStats:
+    """Stream one upload to MinIO off the event loop, hashing on the fly."""
+    async with upload_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            in_context(lambda: stream_upload(
+                minio_client,
+                settings.minio_bucket,
+                object_key,
+                file.file,
+                length=file_size,
+                part_size=settings.upload_part_size,
+                parallel_parts=settings.upload_parallel_parts,
+            )),
+        )
+
+
 # UPLOAD PDFs
 @router.post("/upload")
 async def upload_documents(
@@ -50,7 +111,18 @@ async def upload_documents(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    ensure_bucket_exists()
+    with use_timings(Timings(UPLOAD_STAGE_SECONDS)):
+        response = await _upload_documents(files, db, current_user)
+
+    for item in response.data["uploaded"]:
+        UPLOAD_FILES.labels(outcome="deduplicated" if item["deduplicated"] else "uploaded").inc()
+    UPLOAD_FILES.labels(outcome="rejected").inc(len(response.data["errors"]))
+    return response
+
+
+async def _upload_documents(files: list[UploadFile], db: AsyncSession, current_user: User) -> ApiResponse:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, ensure_bucket_exists)
 
     results = []
     errors = []
@@ -59,55 +131,87 @@ async def upload_documents(
     # NEW: track tasks to enqueue
     tasks_to_enqueue: list[tuple[str, str]] = []
 
+    # Validate first, then stream every accepted file concurrently
+    staged: list[tuple[UploadFile, str, int]] = []
     for file in files:
         if not file.filename.lower().endswith(".pdf"):
             errors.append({"filename": file.filename, "error": "Only PDF files allowed"})
             continue
 
-        object_key = f"{uuid.uuid4()}_{file.filename}"
+        file.file.seek(0, 2)
+        file_size = file.file.tell()
+        file.file.seek(0)
 
-        try:
-            file.file.seek(0, 2)
-            file_size = file.file.tell()
-            file.file.seek(0)
-
-            if file_size > settings.max_upload_size:
-                errors.append({
-                    "filename": file.filename,
-                    "error": "File too large",
-                })
-                continue
-
-            minio_client.put_object(
-                settings.minio_bucket,
-                object_key,
-                file.file,
-                length=file_size,
-                content_type="application/pdf",
-            )
-            uploaded_keys.append(object_key)
-
-            pdf_record = PDFMetadata(
-                filename=file.filename,
-                object_key=object_key,
-                file_size=file_size,
-                status=ProcessingStatus.PENDING,
-                uploaded_by=current_user.id,
-            )
-            db.add(pdf_record)
+        if file_size > settings.max_upload_size:
+            errors.append({
+                "filename": file.filename,
+                "error": "File too large",
+            })
+            continue
+
+        staged.append((file, f"{uuid.uuid4()}_{file.filename}", file_size))
 
-            # IMPORTANT: flush ONLY, do NOT enqueue yet
-            await db.flush()
+    with timed("stream"):
+        streamed = await asyncio.gather(
+            *(stream_file_to_minio(f, key, size) for f, key, size in staged),
+            return_exceptions=True,
+        )
+
+    # DB writes stay sequential: one AsyncSession per request
+    for (file, object_key, file_size), stats in zip(staged, streamed):
+        if isinstance(stats, BaseException):
+            await cleanup_orphaned_file(object_key)
+            errors.append({"filename": file.filename, "error": str(stats)})
+            continue
+
+        uploaded_keys.append(object_key)
+
+        try:
+            owner = await find_owner(db, stats.content_hash)
 
-            
-            # NEW: defer Celery dispatch
-            tasks_to_enqueue.append((str(pdf_record.id), object_key))
+            if owner:
+                # Same bytes already ingested: reuse object, chunks and vectors
+                await cleanup_orphaned_file(object_key)
+                uploaded_keys.remove(object_key)
+
+                pdf_record = PDFMetadata(
+                    filename=file.filename,
+                    object_key=owner.object_key,
+                    file_size=file_size,
+                    page_count=owner.page_count,
+                    status=owner.status,
+                    uploaded_by=current_user.id,
+                    content_hash=stats.content_hash,
+                    source_id=owner.id,
+                )
+                db.add(pdf_record)
+                await db.flush()
+            else:
+                pdf_record = PDFMetadata(
+                    filename=file.filename,
+                    object_key=object_key,
+                    file_size=file_size,
+                    # Set by the worker once the PDF is opened
+                    page_count=None,
+                    status=ProcessingStatus.PENDING,
+                    uploaded_by=current_user.id,
+                    content_hash=stats.content_hash,
+                )
+                db.add(pdf_record)
+
+                # IMPORTANT: flush ONLY, do NOT enqueue yet
+                await db.flush()
+
+                # NEW: defer Celery dispatch
+                tasks_to_enqueue.append((str(pdf_record.id), object_key))
 
             results.append({
                 "id": str(pdf_record.id),
                 "filename": file.filename,
                 "file_size": file_size,
+                "page_count": pdf_record.page_count,
                 "status": pdf_record.status.value,
+                "deduplicated": owner is not None,
             })
 
         except Exception as e:
@@ -118,7 +222,8 @@ async def upload_documents(
    
     # COMMIT FIRST
     try:
-        await db.commit()
+        with timed("commit"):
+            await db.commit()
     except Exception as e:
         for key in uploaded_keys:
             await cleanup_orphaned_file(key)
@@ -126,8 +231,9 @@ async def upload_documents(
 
 
     # NOW enqueue Celery tasks
-    for pdf_id, object_key in tasks_to_enqueue:
-        process_pdf.delay(pdf_id, object_key)
+    with timed("enqueue"):
+        for pdf_id, object_key in tasks_to_enqueue:
+            process_pdf.delay(pdf_id, object_key)
 
     return ApiResponse(
         success=True,
@@ -139,6 +245,29 @@ async def upload_documents(
     )
 
 
+# BULK DELETE JOB STATUS
+@router.get("/delete-jobs/{job_id}")
+async def get_delete_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    # Unknown and foreign jobs look the same, whatever their state
+    if delete_job_owner(job_id) != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    job = AsyncResult(job_id, app=celery_app)
+
+    return ApiResponse(
+        success=True,
+        data={
+            "jobId": job_id,
+            "status": job.state,
+            "result": job.result if job.successful() else None,
+            "error": str(job.result) if job.failed() else None,
+        },
+    )
+
+
 # LIST DOCUMENTS
 @router.get("")
 async def list_documents(
@@ -217,6 +346,7 @@ async def get_document(
 @router.get("/{document_id}/file")
 async def get_document_file(
     document_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -236,24 +366,73 @@ async def get_document_file(
     if not metadata:
         raise HTTPException(status_code=404, detail="Document not found")
 
+    loop = asyncio.get_running_loop()
     try:
-        response = minio_client.get_object(settings.minio_bucket, metadata.object_key)
-        pdf_bytes = response.read()
-        response.close()
-        response.release_conn()
+        stat = await loop.run_in_executor(
+            None, minio_client.stat_object, settings.minio_bucket, metadata.object_key
+        )
+    except:
+        raise HTTPException(status_code=500, detail="Failed to fetch PDF")
+
+    total = stat.size
+    etag = f'"{stat.etag}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": http_date(stat.last_modified),
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'inline; filename="{metadata.filename}"',
+    }
+
+    if is_not_modified(request.headers, etag, stat.last_modified):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if range_applies(request.headers, etag, stat.last_modified):
+        try:
+            byte_range = parse_range(request.headers.get("range"), total)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=416,
+                headers={**headers, "Content-Range": f"bytes */{total}"},
+            )
+
+    start, end = byte_range if byte_range else (0, total - 1)
+    length = end - start + 1
+
+    try:
+        response = await loop.run_in_executor(
+            None,
+            lambda: minio_client.get_object(
+                settings.minio_bucket,
+                metadata.object_key,
+                offset=start,
+                length=length,
+            ),
+        )
     except:
         raise HTTPException(status_code=500, detail="Failed to fetch PDF")
 
-    return Response(
-        content=pdf_bytes,
+    def body():
+        # Sync generator: Starlette iterates it in the threadpool
+        try:
+            yield from response.stream(FILE_STREAM_CHUNK_SIZE)
+        finally:
+            response.close()
+            response.release_conn()
+
+    headers["Content-Length"] = str(length)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+
+    return StreamingResponse(
+        body(),
+        status_code=206 if byte_range else 200,
         media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'inline; filename="{metadata.filename}"'
-        },
+        headers=headers,
     )
 
 
-
 # DELETE SINGLE DOCUMENT (MinIO + Qdrant + DB)
 @router.delete("/{document_id}")
 async def delete_document(
@@ -277,49 +456,24 @@ async def delete_document(
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    try:
-        delete_pdf_vectors(str(doc.id))
-    except Exception as e:
-        print("Qdrant cleanup failed:", e)
-
-    try:
-        minio_client.remove_object(settings.minio_bucket, doc.object_key)
-    except:
-        pass
+    owner = await release_document(db, doc)
+    if owner is not None:
+        await purge_document(db, owner)
 
-    await db.delete(doc)
     await db.commit()
 
     return ApiResponse(success=True, message="Document deleted")
 
 
-# DELETE ALL DOCUMENTS (USER)
-@router.delete("")
+# DELETE ALL DOCUMENTS (USER) - background job
+@router.delete("", status_code=202)
 async def delete_all_documents(
-    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    result = await db.execute(
-        select(PDFMetadata).where(PDFMetadata.uploaded_by == current_user.id)
-    )
-    docs = result.scalars().all()
-
-    for doc in docs:
-        try:
-            delete_pdf_vectors(str(doc.id))
-        except Exception as e:
-            print("Qdrant cleanup failed:", e)
-
-        try:
-            minio_client.remove_object(settings.minio_bucket, doc.object_key)
-        except:
-            pass
-
-        await db.delete(doc)
-
-    await db.commit()
+    job_id = start_delete_job(str(current_user.id))
 
     return ApiResponse(
         success=True,
-        message=f"Deleted {len(docs)} document(s)",
+        data={"jobId": job_id, "status": "PENDING"},
+        message="Deletion started",
     )
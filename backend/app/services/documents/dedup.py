@@ -0,0 +1,83 @@
+"""
+Whole-document deduplication.
+
+Uploads are identified by the SHA-256 of their bytes. The first upload of a
+given hash owns the MinIO object, chunks, triples and vectors; later uploads
+get their own PDFMetadata row pointing at the owner through ``source_id``.
+
+Ownership is reference counted: deleting a document only purges the shared
+artifacts once no other row references them.
+
+Only a healthy owner is reused: COMPLETED, or PENDING/PROCESSING and updated
+by the worker within settings.dedup_owner_stale_seconds. A failed or stuck
+owner would never complete, so the same bytes are ingested again instead.
+"""
+
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import PDFMetadata, ProcessingStatus
+
+
+async def find_owner(db: AsyncSession, content_hash: str) -> Optional[PDFMetadata]:
+    """Return the healthy row owning the artifacts for this hash, if any."""
+    fresh_since = func.now() - timedelta(seconds=settings.dedup_owner_stale_seconds)
+    result = await db.execute(
+        select(PDFMetadata)
+        .where(
+            PDFMetadata.content_hash == content_hash,
+            PDFMetadata.source_id.is_(None),
+            or_(
+                PDFMetadata.status == ProcessingStatus.COMPLETED,
+                and_(
+                    PDFMetadata.status.in_([ProcessingStatus.PENDING, ProcessingStatus.PROCESSING]),
+                    PDFMetadata.updated_at >= fresh_since,
+                ),
+            ),
+        )
+        # Prefer a finished owner, then the oldest
+        .order_by(
+            (PDFMetadata.status == ProcessingStatus.COMPLETED).desc(),
+            PDFMetadata.created_at,
+        )
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+async def reference_count(db: AsyncSession, owner_id) -> int:
+    """Number of rows that reuse the owner's artifacts."""
+    result = await db.execute(
+        select(func.count())
+        .select_from(PDFMetadata)
+        .where(PDFMetadata.source_id == owner_id)
+    )
+    return result.scalar_one()
+
+
+async def release_document(db: AsyncSession, doc: PDFMetadata) -> Optional[PDFMetadata]:
+    """
+    Drop a user's document.
+
+    Returns the owner row whose artifacts (vectors, MinIO object, chunks) must
+    now be purged by the caller, or None while other references remain.
+    """
+    if doc.source_id is None:
+        if await reference_count(db, doc.id) > 0:
+            # Still referenced: hide it from the user but keep the artifacts
+            doc.uploaded_by = None
+            return None
+        return doc
+
+    owner = await db.get(PDFMetadata, doc.source_id)
+    await db.delete(doc)
+    await db.flush()
+
+    if owner is not None and owner.uploaded_by is None:
+        if await reference_count(db, owner.id) == 0:
+            return owner
+    return None
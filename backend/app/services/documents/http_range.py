@@ -0,0 +1,90 @@
+"""
+HTTP Range / conditional request helpers for streaming stored PDFs.
+
+Only single byte ranges are honoured; anything else falls back to a full
+200 response, which RFC 9110 allows and pdf.js handles.
+"""
+
+import re
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value, usegmt=True)
+
+
+def parse_range(header: Optional[str], total: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a Range header into an inclusive (start, end) pair.
+
+    Returns None when the whole file should be sent and raises
+    RangeNotSatisfiable for ranges outside the file.
+    """
+    if not header:
+        return None
+
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None  # multi-range or unknown unit: serve everything
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(0, total - length), total - 1
+
+    start = int(first)
+    end = int(last) if last else total - 1
+    if start >= total or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, total - 1)
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def is_not_modified(headers, etag: str, last_modified: datetime) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since (If-None-Match wins)."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match:
+        return _etag_matches(if_none_match, etag)
+
+    since = _parse_http_date(headers.get("if-modified-since"))
+    if since is None:
+        return False
+    return last_modified.replace(microsecond=0) <= since
+
+
+def range_applies(headers, etag: str, last_modified: datetime) -> bool:
+    """If-Range: only honour Range when the validator still matches."""
+    if_range = headers.get("if-range")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    since = _parse_http_date(if_range)
+    return since is not None and last_modified.replace(microsecond=0) <= since
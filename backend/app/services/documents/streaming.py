@@ -0,0 +1,74 @@
+"""
+Streaming upload helpers.
+
+Files are pushed to MinIO as parallel multipart parts while a wrapping
+reader computes the SHA-256 from the bytes as they pass through, so
+nothing is read twice. The page count is left to the worker: a byte scan
+misses pages inside compressed object streams and double-counts objects
+rewritten by incremental updates.
+
+The hash is only known once the whole file has been streamed, so a
+duplicate is uploaded in full and then removed. Skipping the upload on a
+client-supplied digest would hand a document's artifacts to anyone who
+knows its hash, without proof that they hold the bytes.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from minio import Minio
+
+
+@dataclass
+class StreamStats:
+    content_hash: str
+    size: int
+
+
+class HashingReader:
+    """File-like wrapper that hashes the bytes on read()."""
+
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        if data:
+            self._digest.update(data)
+            self.size += len(data)
+        return data
+
+    def stats(self) -> StreamStats:
+        return StreamStats(content_hash=self._digest.hexdigest(), size=self.size)
+
+
+def stream_upload(
+    client: Minio,
+    bucket: str,
+    object_key: str,
+    fileobj: BinaryIO,
+    length: int,
+    part_size: int,
+    parallel_parts: int,
+) -> StreamStats:
+    """
+    Blocking multipart upload; run it in an executor from async code.
+
+    Parts are read sequentially (so the hash sees bytes in order) and
+    uploaded by MinIO's part thread pool.
+    """
+    fileobj.seek(0)
+    reader = HashingReader(fileobj)
+    client.put_object(
+        bucket,
+        object_key,
+        reader,
+        length=length,
+        content_type="application/pdf",
+        part_size=part_size,
+        num_parallel_uploads=parallel_parts,
+    )
+    return reader.stats()
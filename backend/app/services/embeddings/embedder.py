@@ -1,8 +1,11 @@
 import asyncio
+import time
 from functools import lru_cache
 from sentence_transformers import SentenceTransformer
 from typing import Union, List
 from app.config import settings
+from app.services.metrics import EMBED_BATCH_SIZE, EMBED_SECONDS
+from app.services.tracing import in_context, span
 
 
 @lru_cache(maxsize=1)
@@ -11,36 +14,45 @@ def get_model() -> SentenceTransformer:
 
 
 def generate_embeddings(texts: List[str]) -> List[List[float]]:
-    return get_model().encode(
-        texts,
-        convert_to_numpy=True,
-        normalize_embeddings=True,
-    ).tolist()
+    started = time.perf_counter()
+    with span("model.encode", batch=len(texts)):
+        vectors = get_model().encode(
+            texts,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).tolist()
+    EMBED_BATCH_SIZE.observe(len(texts))
+    EMBED_SECONDS.observe(time.perf_counter() - started)
+    return vectors
 
 
 async def embed_text_async(text: str) -> List[float]:
     loop = asyncio.get_event_loop()
     return await loop.run_in_executor(
         None,
-        lambda: generate_embeddings([text])[0],
+        in_context(lambda: generate_embeddings([text])[0]),
     )
 
 
+def expand_query(query: str) -> str:
+    """Single-sentence queries are embedded with an intent hint appended."""
+    q = query.lower()
+
+    intent = ""
+    if any(w in q for w in ["drawback", "shortcoming", "limitation"]):
+        intent = "limitations drawbacks shortcomings disadvantages"
+    elif any(w in q for w in ["investigate", "investigation", "examine", "study", "effect"]):
+        intent = "investigation study analysis effect"
+
+    return f"{query}. {intent}".strip()
+
+
 async def embed_query(
     query: Union[str, List[str]]
 ) -> Union[List[float], List[List[float]]]:
 
     if isinstance(query, str):
-        q = query.lower()
-
-        intent = ""
-        if any(w in q for w in ["drawback", "shortcoming", "limitation"]):
-            intent = "limitations drawbacks shortcomings disadvantages"
-        elif any(w in q for w in ["investigate", "investigation", "examine", "study", "effect"]):
-            intent = "investigation study analysis effect"
-
-        expanded_query = f"{query}. {intent}".strip()
-        return await embed_text_async(expanded_query)
+        return await embed_text_async(expand_query(query))
 
     if isinstance(query, list):
         texts = [q for q in query if isinstance(q, str) and q.strip()]
@@ -50,7 +62,7 @@ async def embed_query(
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(
             None,
-            lambda: generate_embeddings(texts),
+            in_context(lambda: generate_embeddings(texts)),
         )
 
     raise TypeError("embed_query expects str or List[str]")
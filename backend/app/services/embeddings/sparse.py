@@ -0,0 +1,47 @@
+"""
+Local BM25-style sparse term vectors (no external model).
+
+Documents get the BM25 term-frequency component per token; the IDF part is
+applied server-side by Qdrant (sparse vector modifier IDF), so the dot
+product with a binary query vector is a BM25 score. Term ids are stable
+CRC32 hashes, so the API and the workers agree without a shared vocabulary.
+"""
+
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+from app.config import settings
+from app.services.search.utils import tokens
+
+SPARSE_VECTOR_NAME = "lexical"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def term_id(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8")) & 0x7FFFFFFF
+
+
+def _to_sparse(weights: Dict[int, float]) -> Dict[str, List]:
+    indices = sorted(weights)
+    return {"indices": indices, "values": [weights[i] for i in indices]}
+
+
+def encode_document(text: str) -> Dict[str, List]:
+    toks = tokens(text)
+    if not toks:
+        return {"indices": [], "values": []}
+
+    length_norm = 1 - BM25_B + BM25_B * len(toks) / settings.sparse_avg_doc_tokens
+    weights: Dict[int, float] = {}
+    for tok, tf in Counter(toks).items():
+        tid = term_id(tok)
+        # Hash collisions just add up
+        weights[tid] = weights.get(tid, 0.0) + tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+    return _to_sparse(weights)
+
+
+def encode_query(text: str) -> Dict[str, List]:
+    return _to_sparse({term_id(t): 1.0 for t in set(tokens(text))})
@@ -0,0 +1,32 @@
+from typing import Dict, List, Protocol, Sequence
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class LexicalBackend(Protocol):
+    """
+    Lexical retrieval over child/parent chunks.
+
+    Hits use the same dict shape as the other fusion channels and carry
+    lexical_rank, lexical_score and has_lexical.
+    """
+
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        pdf_ids: Sequence[UUID],
+        k: int,
+    ) -> List[Dict]:
+        ...
+
+    async def search_many(
+        self,
+        db: AsyncSession,
+        queries: Sequence[str],
+        pdf_ids: Sequence[UUID],
+        k: int,
+    ) -> List[List[Dict]]:
+        """Top k per query, in query order."""
+        ...
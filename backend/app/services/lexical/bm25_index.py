@@ -0,0 +1,562 @@
+"""
+In-process BM25 inverted index over child chunks.
+
+Layout under settings.bm25_index_dir:
+
+    seg_<created_ns>_<id>/     immutable segment (built in .tmp_*, then renamed)
+        meta.json              doc count, total length, pdf id table, creation time,
+                               and for merged segments the sources they replace
+        docs.json              [chunk_id, parent_chunk_id, page, chunk_index] per doc
+        terms.npy              sorted int64 term ids (CRC32, as for sparse vectors)
+        term_offsets.npy       int64 [T + 1]: postings slice of each term
+        post_docs.npy          uint32 local doc ids
+        post_tf.npy            float32 term frequencies
+        doc_len.npy            float32 tokens per doc
+        doc_pdf.npy            int32 index into meta["pdf_ids"]
+    tombstones/<pdf_id>        time (ns) the pdf was deleted
+
+process_pdf appends one segment per document; deletes write tombstones,
+which hide a pdf's docs in every segment created before them. Segments are
+memory-mapped with np.load(mmap_mode="r") and merged by compact() once
+there are more than settings.bm25_max_segments of them. A merged segment's
+sources are ignored even while their directories are still on disk (a
+mapped file cannot be removed on Windows); tombstones are only dropped once
+those directories are gone.
+
+Chunk texts are not stored; the backend fetches them for the top hits.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.services.embeddings.sparse import term_id, BM25_K1, BM25_B
+from app.services.search.utils import tokens
+from app.services.tracing import in_context, span
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "seg_"
+TOMBSTONE_DIR = "tombstones"
+LOCK_FILE = ".compact.lock"
+STALE_LOCK_SECONDS = 3600
+# Re-lists when compact() removes segments while a refresh reads them
+REFRESH_ATTEMPTS = 3
+
+
+@dataclass
+class IndexedChunk:
+    chunk_id: str
+    parent_chunk_id: Optional[str]
+    page: int
+    chunk_index: int
+    text: str
+
+
+# WRITING
+def _build_postings(term_rows: np.ndarray, doc_rows: np.ndarray, tf_rows: np.ndarray):
+    order = np.lexsort((doc_rows, term_rows))
+    terms_sorted = term_rows[order]
+    terms, starts = np.unique(terms_sorted, return_index=True)
+    offsets = np.append(starts, len(terms_sorted)).astype(np.int64)
+    return terms, offsets, doc_rows[order], tf_rows[order]
+
+
+def _write_segment(root: str, meta: Dict, docs: List, arrays: Dict[str, np.ndarray]) -> str:
+    name = f"{SEGMENT_PREFIX}{meta['created_ns']}_{uuid.uuid4().hex[:8]}"
+    tmp = os.path.join(root, f".tmp_{name}")
+    os.makedirs(tmp)
+
+    for key, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{key}.npy"), arr)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    with open(os.path.join(tmp, "docs.json"), "w") as f:
+        json.dump(docs, f)
+
+    # Readers only ever see complete segments
+    os.rename(tmp, os.path.join(root, name))
+    return name
+
+
+def index_pdf(pdf_id: str, chunks: Sequence[IndexedChunk], root: Optional[str] = None) -> Optional[str]:
+    """Append one segment holding a pdf's chunks; returns its name."""
+    root = root or settings.bm25_index_dir
+    os.makedirs(os.path.join(root, TOMBSTONE_DIR), exist_ok=True)
+
+    term_rows, doc_rows, tf_rows, doc_len, docs = [], [], [], [], []
+    for local_id, c in enumerate(chunks):
+        toks = tokens(c.text)
+        counts = Counter(term_id(t) for t in toks)
+        term_rows.extend(counts.keys())
+        tf_rows.extend(counts.values())
+        doc_rows.extend([local_id] * len(counts))
+        doc_len.append(len(toks))
+        docs.append([c.chunk_id, c.parent_chunk_id, c.page, c.chunk_index])
+
+    if not docs:
+        return None
+
+    terms, offsets, post_docs, post_tf = _build_postings(
+        np.asarray(term_rows, dtype=np.int64),
+        np.asarray(doc_rows, dtype=np.uint32),
+        np.asarray(tf_rows, dtype=np.float32),
+    )
+    meta = {
+        "created_ns": time.time_ns(),
+        "num_docs": len(docs),
+        "total_len": int(sum(doc_len)),
+        "pdf_ids": [pdf_id],
+    }
+    return _write_segment(root, meta, docs, {
+        "terms": terms,
+        "term_offsets": offsets,
+        "post_docs": post_docs,
+        "post_tf": post_tf,
+        "doc_len": np.asarray(doc_len, dtype=np.float32),
+        "doc_pdf": np.zeros(len(docs), dtype=np.int32),
+    })
+
+
+def tombstone_pdfs(pdf_ids: Sequence[str], root: Optional[str] = None):
+    """Hide pdfs from every existing segment (no-op if no index was built)."""
+    root = root or settings.bm25_index_dir
+    tomb_dir = os.path.join(root, TOMBSTONE_DIR)
+    if not os.path.isdir(tomb_dir):
+        return
+
+    now = str(time.time_ns())
+    for pdf_id in pdf_ids:
+        tmp = os.path.join(tomb_dir, f".tmp_{pdf_id}")
+        with open(tmp, "w") as f:
+            f.write(now)
+        os.replace(tmp, os.path.join(tomb_dir, pdf_id))
+
+
+# READING
+def _read_meta(path: str) -> Dict:
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f)
+
+
+class Segment:
+    def __init__(self, path: str, meta: Optional[Dict] = None):
+        self.path = path
+        meta = meta or _read_meta(path)
+        with open(os.path.join(path, "docs.json")) as f:
+            self.docs = json.load(f)
+
+        self.created_ns: int = meta["created_ns"]
+        self.num_docs: int = meta["num_docs"]
+        self.total_len: int = meta["total_len"]
+        self.pdf_ids: List[str] = meta["pdf_ids"]
+        self.replaces: List[str] = meta.get("replaces", [])
+
+        def load(key):
+            return np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r")
+
+        self.terms = load("terms")
+        self.offsets = load("term_offsets")
+        self.post_docs = load("post_docs")
+        self.post_tf = load("post_tf")
+        self.doc_len = load("doc_len")
+        self.doc_pdf = load("doc_pdf")
+
+    def close(self):
+        """Drop the memory maps so the directory can be removed."""
+        self.terms = self.offsets = self.post_docs = None
+        self.post_tf = self.doc_len = self.doc_pdf = None
+
+    def _locate(self, tids: np.ndarray):
+        pos = np.searchsorted(self.terms, tids)
+        found = pos < len(self.terms)
+        found[found] = self.terms[pos[found]] == tids[found]
+        return pos, found
+
+    def doc_freq(self, tids: np.ndarray) -> np.ndarray:
+        pos, found = self._locate(tids)
+        df = np.zeros(len(tids), dtype=np.int64)
+        df[found] = self.offsets[pos[found] + 1] - self.offsets[pos[found]]
+        return df
+
+    def live_mask(self, tombstones: Dict[str, int], allowed: Optional[set] = None) -> np.ndarray:
+        live_pdf = np.array([
+            (allowed is None or p in allowed) and tombstones.get(p, -1) < self.created_ns
+            for p in self.pdf_ids
+        ], dtype=bool)
+        return live_pdf[self.doc_pdf]
+
+    def score(self, tids: np.ndarray, idf: np.ndarray, avgdl: float) -> np.ndarray:
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        pos, found = self._locate(tids)
+        for t in np.flatnonzero(found):
+            lo, hi = self.offsets[pos[t]], self.offsets[pos[t] + 1]
+            docs = self.post_docs[lo:hi]
+            tf = self.post_tf[lo:hi]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[docs] / avgdl)
+            scores[docs] += idf[t] * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+
+def _mtime_ns(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+class BM25Index:
+    def __init__(self, root: str):
+        self.root = root
+        self.segments: Dict[str, Segment] = {}
+        self.tombstones: Dict[str, int] = {}
+        # Merged-away segment directories still on disk, and the newest
+        # merged segment's creation time
+        self.leftovers: List[str] = []
+        self.merged_ns = 0
+        self._stamp = None
+
+    def close(self):
+        for seg in self.segments.values():
+            seg.close()
+        self.segments = {}
+        self._stamp = None
+
+    def refresh(self):
+        """Pick up new segments / tombstones when the directories change."""
+        for _ in range(REFRESH_ATTEMPTS):
+            if self._refresh_once():
+                return
+        # Still racing a compaction: search what loaded, re-list next time
+        logger.warning("BM25 index under %s changed during refresh", self.root)
+
+    def _refresh_once(self) -> bool:
+        """False when a listed segment or tombstone vanished before it was read."""
+        tomb_dir = os.path.join(self.root, TOMBSTONE_DIR)
+        stamp = (_mtime_ns(self.root), _mtime_ns(tomb_dir))
+        if stamp == self._stamp:
+            return True
+
+        names = sorted(
+            n for n in (os.listdir(self.root) if os.path.isdir(self.root) else [])
+            if n.startswith(SEGMENT_PREFIX)
+        )
+        complete = True
+        metas, missing = {}, set()
+        for n in names:
+            if n in self.segments:
+                continue
+            try:
+                metas[n] = _read_meta(os.path.join(self.root, n))
+            except FileNotFoundError:
+                missing.add(n)
+
+        # Sources of a merged segment never load, even if still on disk
+        replaced, merged_ns = set(), 0
+        for n in names:
+            seg = self.segments.get(n)
+            replaces = seg.replaces if seg is not None else metas.get(n, {}).get("replaces")
+            if replaces:
+                replaced.update(replaces)
+                merged_ns = max(merged_ns, int(n.split("_")[1]))
+        self.leftovers = [n for n in names if n in replaced]
+        self.merged_ns = merged_ns
+
+        segments = {}
+        for n in names:
+            if n in replaced:
+                continue
+            seg = self.segments.get(n)
+            if seg is None:
+                try:
+                    if n in missing:
+                        raise FileNotFoundError(n)
+                    seg = Segment(os.path.join(self.root, n), metas[n])
+                except FileNotFoundError:
+                    # Merged away by compact() since the listing; its docs
+                    # are in the merged segment, which a re-list finds
+                    complete = False
+                    continue
+            segments[n] = seg
+        self.segments = segments
+
+        tombstones = {}
+        for name in (os.listdir(tomb_dir) if os.path.isdir(tomb_dir) else []):
+            if name.startswith("."):
+                continue
+            try:
+                with open(os.path.join(tomb_dir, name)) as f:
+                    tombstones[name] = int(f.read() or 0)
+            except FileNotFoundError:
+                # Dropped by compact(): no remaining segment predates it
+                continue
+        self.tombstones = tombstones
+        self._stamp = stamp if complete else None
+        return complete
+
+    def live_pdf_ids(self) -> set:
+        """Pdfs with at least one segment not hidden by a tombstone."""
+        self.refresh()
+        return {
+            p for seg in self.segments.values() for p in seg.pdf_ids
+            if self.tombstones.get(p, -1) < seg.created_ns
+        }
+
+    def search(self, query: str, pdf_ids: Sequence[str], k: int) -> List[Dict]:
+        self.refresh()
+        segments = list(self.segments.values())
+        tids = np.unique(np.asarray([term_id(t) for t in tokens(query)], dtype=np.int64))
+        if not segments or not len(tids):
+            return []
+
+        # Collection statistics across segments (tombstoned docs included
+        # until compaction, like deleted docs in Lucene)
+        n_docs = sum(s.num_docs for s in segments)
+        avgdl = max(sum(s.total_len for s in segments) / n_docs, 1.0)
+        df = sum(s.doc_freq(tids) for s in segments)
+        idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+        allowed = set(pdf_ids)
+        found = []
+        for seg in segments:
+            mask = seg.live_mask(self.tombstones, allowed)
+            if not mask.any():
+                continue
+            scores = seg.score(tids, idf, avgdl)
+            scores[~mask] = 0.0
+            cand = np.flatnonzero(scores > 0)
+            if len(cand) > k:
+                cand = cand[np.argpartition(-scores[cand], k - 1)[:k]]
+            found.extend((float(scores[d]), seg, int(d)) for d in cand)
+
+        found.sort(key=lambda f: -f[0])
+        hits = []
+        for score, seg, d in found[:k]:
+            chunk_id, parent_chunk_id, page, chunk_index = seg.docs[d]
+            hits.append({
+                "chunk_id": chunk_id,
+                "parent_chunk_id": parent_chunk_id,
+                "pdf_id": seg.pdf_ids[seg.doc_pdf[d]],
+                "page": page,
+                "chunk_index": chunk_index,
+                "score": score,
+            })
+        return hits
+
+
+# COMPACTION
+def _acquire_lock(root: str) -> bool:
+    path = os.path.join(root, LOCK_FILE)
+    try:
+        if time.time() - os.stat(path).st_mtime > STALE_LOCK_SECONDS:
+            os.remove(path)  # left behind by a crashed compaction
+    except FileNotFoundError:
+        pass
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL))
+        return True
+    except FileExistsError:
+        return False
+
+
+def _merge(segments: List[Segment], tombstones: Dict[str, int]):
+    """Live docs of `segments` as one segment's (pdf ids, docs, arrays)."""
+    pdf_table: Dict[str, int] = {}
+    term_parts, doc_parts, tf_parts = [], [], []
+    doc_len_parts, doc_pdf_parts, docs = [], [], []
+    base = 0
+
+    for seg in segments:
+        live = seg.live_mask(tombstones)
+        new_ids = np.cumsum(live) - 1 + base
+
+        posting_terms = np.repeat(np.asarray(seg.terms), np.diff(seg.offsets))
+        posting_docs = np.asarray(seg.post_docs)
+        keep = live[posting_docs]
+        term_parts.append(posting_terms[keep])
+        doc_parts.append(new_ids[posting_docs[keep]].astype(np.uint32))
+        tf_parts.append(np.asarray(seg.post_tf)[keep])
+
+        pdf_remap = np.array(
+            [pdf_table.setdefault(p, len(pdf_table)) for p in seg.pdf_ids],
+            dtype=np.int32,
+        )
+        doc_len_parts.append(np.asarray(seg.doc_len)[live])
+        doc_pdf_parts.append(pdf_remap[np.asarray(seg.doc_pdf)[live]])
+        docs.extend(d for d, alive in zip(seg.docs, live) if alive)
+        base += int(live.sum())
+
+    terms, offsets, post_docs, post_tf = _build_postings(
+        np.concatenate(term_parts),
+        np.concatenate(doc_parts),
+        np.concatenate(tf_parts),
+    )
+    return list(pdf_table), docs, {
+        "terms": terms,
+        "term_offsets": offsets,
+        "post_docs": post_docs,
+        "post_tf": post_tf,
+        "doc_len": np.concatenate(doc_len_parts),
+        "doc_pdf": np.concatenate(doc_pdf_parts),
+    }
+
+
+def _remove_leftovers(root: str, leftovers: List[str], merged_ns: int, tombstones: Dict[str, int]):
+    """
+    Remove merged-away segment directories. Tombstones older than the merged
+    segment only go once all of them are gone: a leftover still on disk is
+    what they hide.
+    """
+    remaining = []
+    for name in leftovers:
+        path = os.path.join(root, name)
+        try:
+            shutil.rmtree(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("Could not remove merged BM25 segment %s, will retry", path, exc_info=True)
+        if os.path.exists(path):
+            remaining.append(name)
+    if remaining:
+        return
+
+    tomb_dir = os.path.join(root, TOMBSTONE_DIR)
+    for pdf_id, deleted_ns in tombstones.items():
+        if deleted_ns < merged_ns:
+            try:
+                os.remove(os.path.join(tomb_dir, pdf_id))
+            except FileNotFoundError:
+                pass
+
+
+def compact(root: Optional[str] = None) -> Optional[str]:
+    """Merge all segments into one, dropping tombstoned docs."""
+    root = root or settings.bm25_index_dir
+    if not os.path.isdir(root) or not _acquire_lock(root):
+        return None
+
+    try:
+        index = BM25Index(root)
+        index.refresh()
+        segments = list(index.segments.values())
+        if len(segments) < 2:
+            # Retry the cleanup of an earlier compaction
+            if index.leftovers:
+                leftovers, merged_ns, tombstones = index.leftovers, index.merged_ns, index.tombstones
+                index.close()
+                _remove_leftovers(root, leftovers, merged_ns, tombstones)
+            return None
+
+        pdf_ids, docs, arrays = _merge(segments, index.tombstones)
+
+        # Keep the newest source time so tombstones written meanwhile still
+        # apply. Earlier leftovers are listed too: this segment may outlive
+        # the one that replaced them.
+        created_ns = max(s.created_ns for s in segments)
+        sources = [os.path.basename(s.path) for s in segments] + index.leftovers
+        meta = {
+            "created_ns": created_ns,
+            "num_docs": len(docs),
+            "total_len": int(arrays["doc_len"].sum()),
+            "pdf_ids": pdf_ids,
+            "replaces": sources,
+        }
+        name = _write_segment(root, meta, docs, arrays)
+
+        # Unmap the sources before removing them; whatever cannot be removed
+        # yet is skipped by readers and retried by the next compaction
+        merged, tombstones = len(segments), index.tombstones
+        index.close()
+        _remove_leftovers(root, sources, created_ns, tombstones)
+
+        logger.info("Compacted %d BM25 segments into %s", merged, name)
+        return name
+
+    finally:
+        os.remove(os.path.join(root, LOCK_FILE))
+
+
+def maybe_compact(root: Optional[str] = None) -> Optional[str]:
+    root = root or settings.bm25_index_dir
+    if not os.path.isdir(root):
+        return None
+    count = sum(1 for n in os.listdir(root) if n.startswith(SEGMENT_PREFIX))
+    if count > settings.bm25_max_segments:
+        return compact(root)
+    return None
+
+
+# BACKEND
+_index: Optional[BM25Index] = None
+
+
+def get_index() -> BM25Index:
+    global _index
+    if _index is None:
+        _index = BM25Index(settings.bm25_index_dir)
+    return _index
+
+
+class BM25LexicalBackend:
+    """Lexical channel backed by the in-process segment index."""
+
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        pdf_ids: Sequence[UUID],
+        k: int,
+    ) -> List[Dict]:
+        return (await self.search_many(db, [query], pdf_ids, k))[0]
+
+    async def search_many(
+        self,
+        db: AsyncSession,
+        queries: Sequence[str],
+        pdf_ids: Sequence[UUID],
+        k: int,
+    ) -> List[List[Dict]]:
+        index = get_index()
+        scope = [str(i) for i in pdf_ids]
+
+        # Scoring is numpy over memory-mapped postings; keep it off the loop
+        with span("bm25.search", queries=len(queries)):
+            per_query = await asyncio.get_running_loop().run_in_executor(
+                None, in_context(lambda: [index.search(q, scope, k) for q in queries])
+            )
+        chunk_ids = {h["chunk_id"] for hits in per_query for h in hits}
+        if not chunk_ids:
+            return [[] for _ in queries]
+
+        # Texts for the top hits only, one query for all of them
+        rows = (await db.execute(
+            text("SELECT id, chunk_text FROM pdf_chunks WHERE id = ANY(:ids)"),
+            {"ids": [UUID(c) for c in chunk_ids]},
+        )).fetchall()
+        texts = {str(r.id): r.chunk_text for r in rows}
+
+        return [[{
+            "chunk_id": h["chunk_id"],
+            "parent_chunk_id": h["parent_chunk_id"],
+            "pdf_id": h["pdf_id"],
+            "page": h["page"],
+            "chunk_index": h["chunk_index"],
+            "text": texts.get(h["chunk_id"], ""),
+            "lexical_rank": i + 1,
+            "lexical_score": h["score"],
+            "has_lexical": True,
+        } for i, h in enumerate(hits)] for hits in per_query]
@@ -0,0 +1,82 @@
+from typing import Dict, List, Sequence
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _hit(r, i: int) -> Dict:
+    return {
+        "chunk_id": str(r.id),
+        "parent_chunk_id": str(r.parent_chunk_id) if r.parent_chunk_id else None,
+        "pdf_id": str(r.pdf_metadata_id),
+        "page": r.page_num,
+        "chunk_index": r.chunk_index,
+        "text": r.chunk_text,
+        "lexical_rank": i + 1,
+        "lexical_score": float(r.score or 0),
+        "has_lexical": True,
+    }
+
+
+class PostgresLexicalBackend:
+    """ts_rank_cd over pdf_chunks.lexical_tsv (GIN index)."""
+
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        pdf_ids: Sequence[UUID],
+        k: int,
+    ) -> List[Dict]:
+        sql = text("""
+            SELECT id, parent_chunk_id, pdf_metadata_id, page_num,
+                   chunk_index, chunk_text,
+                   ts_rank_cd(lexical_tsv, websearch_to_tsquery('english', :q)) AS score
+            FROM pdf_chunks
+            WHERE pdf_metadata_id = ANY(:ids)
+              AND lexical_tsv @@ websearch_to_tsquery('english', :q)
+            ORDER BY score DESC
+            LIMIT :k
+        """)
+
+        rows = (await db.execute(
+            sql, {"q": query, "ids": list(pdf_ids), "k": k}
+        )).fetchall()
+
+        return [_hit(r, i) for i, r in enumerate(rows)]
+
+    async def search_many(
+        self,
+        db: AsyncSession,
+        queries: Sequence[str],
+        pdf_ids: Sequence[UUID],
+        k: int,
+    ) -> List[List[Dict]]:
+        # One round trip: a LATERAL top-k per query
+        sql = text("""
+            SELECT q.idx, c.*
+            FROM unnest(CAST(:queries AS text[])) WITH ORDINALITY AS q(query, idx)
+            CROSS JOIN LATERAL (
+                SELECT id, parent_chunk_id, pdf_metadata_id, page_num,
+                       chunk_index, chunk_text,
+                       ts_rank_cd(lexical_tsv, websearch_to_tsquery('english', q.query)) AS score
+                FROM pdf_chunks
+                WHERE pdf_metadata_id = ANY(:ids)
+                  AND lexical_tsv @@ websearch_to_tsquery('english', q.query)
+                ORDER BY score DESC
+                LIMIT :k
+            ) c
+            ORDER BY q.idx, c.score DESC
+        """)
+
+        rows = (await db.execute(
+            sql, {"queries": list(queries), "ids": list(pdf_ids), "k": k}
+        )).fetchall()
+
+        out: List[List[Dict]] = [[] for _ in queries]
+        for r in rows:
+            hits = out[r.idx - 1]
+            hits.append(_hit(r, len(hits)))
+        return out
+
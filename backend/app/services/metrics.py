@@ -0,0 +1,247 @@
+"""
+Prometheus metrics and per-stage timers.
+
+prometheus_client is optional: without it every metric is a no-op and
+/metrics answers 503, but Timings still collect stage durations for the
+search debug field.
+
+A Timings object is bound to the current request / task with
+use_timings(); code anywhere below it marks stages with `with timed(name)`
+and each stage is observed into the Timings' histogram (labelled by
+stage) as well as summed per stage for the caller. Concurrent stages
+(the retrieval channels) overlap, so their sum can exceed the wall time.
+Hot loops use `with tally(name)` instead: per-call durations are only
+summed, and the total is observed once when the Timings is unbound.
+record_count() adds item counts (pages, chunks, rows...) per stage.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Set
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+except ImportError:  # metrics are optional
+    prometheus_client = None
+
+# Seconds; search stages are mostly sub-second, ingestion runs for minutes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+INGEST_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def set_function(self, fn):
+        pass
+
+
+_NOOP = _NoopMetric()
+
+
+def _histogram(name: str, doc: str, labels=(), buckets=LATENCY_BUCKETS):
+    if prometheus_client is None:
+        return _NOOP
+    return Histogram(name, doc, labels, buckets=buckets)
+
+
+def _counter(name: str, doc: str, labels=()):
+    if prometheus_client is None:
+        return _NOOP
+    return Counter(name, doc, labels)
+
+
+def _gauge(name: str, doc: str, labels=()):
+    if prometheus_client is None:
+        return _NOOP
+    # Live gauges are read from the API process only
+    return Gauge(name, doc, labels, multiprocess_mode="livesum")
+
+
+# ---------- search ----------
+SEARCH_SECONDS = _histogram("search_seconds", "Search request latency", ["mode"])
+SEARCH_STAGE_SECONDS = _histogram("search_stage_seconds", "Search stage latency", ["stage"])
+SEARCH_ADMISSION_REJECTED = _counter(
+    "search_admission_rejected_total", "Searches rejected with 429", ["reason"]
+)
+SEARCH_ADMISSION_QUEUE = _gauge("search_admission_queue_depth", "Searches waiting for a slot")
+SEARCH_ADMISSION_RUNNING = _gauge("search_admission_running", "Searches holding a slot")
+CACHE_REQUESTS = _counter("cache_requests_total", "Cache lookups", ["cache", "result"])
+
+# ---------- upload / ingestion ----------
+UPLOAD_STAGE_SECONDS = _histogram("upload_stage_seconds", "Upload stage latency", ["stage"])
+UPLOAD_FILES = _counter("upload_files_total", "Uploaded files", ["outcome"])
+INGEST_STAGE_SECONDS = _histogram(
+    "ingest_stage_seconds", "Ingestion stage latency", ["stage"], buckets=INGEST_BUCKETS
+)
+TASK_SECONDS = _histogram(
+    "celery_task_seconds", "Celery task run time", ["task"], buckets=INGEST_BUCKETS
+)
+TASKS = _counter("celery_tasks_total", "Finished Celery tasks", ["task", "state"])
+
+# ---------- embeddings / vector store / database ----------
+EMBED_BATCH_SIZE = _histogram(
+    "embedding_batch_size", "Texts per encode call", buckets=BATCH_BUCKETS
+)
+EMBED_SECONDS = _histogram("embedding_seconds", "Encode call latency")
+VECTOR_STORE_SECONDS = _histogram(
+    "vector_store_call_seconds", "Vector store call latency", ["method", "outcome"]
+)
+VECTOR_STORE_RETRIES = _counter(
+    "vector_store_retries_total", "Retried vector store calls", ["method"]
+)
+VECTOR_BREAKER_OPEN = _gauge("vector_breaker_open", "1 while the vector store circuit is not closed")
+DB_POOL_CONNECTIONS = _gauge("db_pool_connections", "Database pool connections", ["state"])
+
+
+class Timings:
+    """Stage durations (and item counts) of one operation, observed into `histogram`."""
+
+    def __init__(self, histogram=_NOOP):
+        self.histogram = histogram
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        # Tallied stages not observed yet
+        self._pending: Set[str] = set()
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.histogram.labels(stage=stage).observe(seconds)
+
+    def tally(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self._pending.add(stage)
+
+    def count(self, stage: str, n: int):
+        self.counts[stage] = self.counts.get(stage, 0) + n
+
+    def flush(self):
+        """Observe the totals of tallied stages."""
+        for stage in self._pending:
+            self.histogram.labels(stage=stage).observe(self.stages[stage])
+        self._pending.clear()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_ms(self) -> Dict[str, float]:
+        out = {stage: round(s * 1000, 1) for stage, s in self.stages.items()}
+        out["total"] = round(self.elapsed() * 1000, 1)
+        return out
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def use_timings(timings: Timings) -> Iterator[Timings]:
+    """Bind `timings` for timed() calls in this context (and tasks it spawns)."""
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        timings.flush()
+        try:
+            _current.reset(token)
+        except ValueError:
+            # Streaming body finalized from another context; nothing to restore
+            pass
+
+
+def record_stage(stage: str, seconds: float):
+    """Add a separately measured duration (e.g. summed over a loop)."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def record_count(stage: str, n: int = 1):
+    timings = _current.get()
+    if timings is not None:
+        timings.count(stage, n)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Add the block's duration to the bound Timings (no-op when none)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def tally(stage: str) -> Iterator[None]:
+    """timed() for blocks run many times per operation (per page, per chunk)."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.tally(stage, time.perf_counter() - started)
+
+
+def register_pool_metrics(pool):
+    """Export SQLAlchemy QueuePool usage (checked out / idle / overflow)."""
+    DB_POOL_CONNECTIONS.labels(state="checked_out").set_function(pool.checkedout)
+    DB_POOL_CONNECTIONS.labels(state="idle").set_function(pool.checkedin)
+    DB_POOL_CONNECTIONS.labels(state="overflow").set_function(lambda: max(pool.overflow(), 0))
+
+
+def metrics_available() -> bool:
+    return prometheus_client is not None
+
+
+def multiprocess_enabled() -> bool:
+    # prometheus_client's own switch: values live in files under this dir
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def _registry():
+    """Default registry, or one merging every process in multiprocess mode."""
+    if not multiprocess_enabled():
+        return prometheus_client.REGISTRY
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_latest() -> bytes:
+    """Exposition text for /metrics."""
+    return prometheus_client.generate_latest(_registry())
+
+
+def start_metrics_server(port: int):
+    """Serve /metrics from a background thread (Celery workers)."""
+    prometheus_client.start_http_server(port, registry=_registry())
+
+
+def mark_process_dead(pid: int):
+    if multiprocess_enabled():
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
+
+
+CONTENT_TYPE = prometheus_client.CONTENT_TYPE_LATEST if prometheus_client else "text/plain"
@@ -0,0 +1,29 @@
+from typing import Any, Protocol
+
+
+class VectorStore(Protocol):
+    """
+    The part of the QdrantClient API the app uses.
+
+    QdrantClient satisfies it as is; LocalVectorStore implements it in
+    process. Points are upserted as {"id", "vector", "payload"} dicts and
+    filters are qdrant_client.models objects either way.
+    """
+
+    def get_collections(self) -> Any: ...
+
+    def get_collection(self, collection_name: str) -> Any: ...
+
+    def create_collection(self, collection_name: str, vectors_config: Any, **kwargs) -> Any: ...
+
+    def create_payload_index(self, collection_name: str, field_name: str, **kwargs) -> Any: ...
+
+    def upsert(self, collection_name: str, points: Any, wait: bool = True) -> Any: ...
+
+    def delete(self, collection_name: str, points_selector: Any, wait: bool = True) -> Any: ...
+
+    def query_points(self, collection_name: str, query: Any = None, **kwargs) -> Any: ...
+
+    def query_batch_points(self, collection_name: str, requests: Any, **kwargs) -> Any: ...
+
+    def query_points_groups(self, collection_name: str, group_by: str, query: Any = None, **kwargs) -> Any: ...
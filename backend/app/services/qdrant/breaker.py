@@ -0,0 +1,113 @@
+"""
+Circuit breaker for vector store calls.
+
+After vector_breaker_failures consecutive failures the circuit opens and
+calls fail immediately with CircuitOpenError instead of waiting for the
+client timeout. Once vector_breaker_reset_s has passed, one call is let
+through as a probe (half-open): success closes the circuit, failure opens
+it for another period. Search checks available() up front and runs in
+degraded (lexical + triples, no embedding) mode while the circuit is open.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+from app.services.metrics import VECTOR_BREAKER_OPEN
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout_s: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+
+        # Calls run on executor threads as well as the event loop
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+        self.trips = 0
+        self.short_circuited = 0
+
+    def _reset_due(self) -> bool:
+        return time.monotonic() - self.opened_at >= self.reset_timeout_s
+
+    def available(self) -> bool:
+        """Whether a call would be attempted now (does not take the probe)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return self._reset_due()
+            return not self._probing
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError; the first call after the
+        reset timeout becomes the half-open probe."""
+        with self._lock:
+            if self.state == OPEN and self._reset_due():
+                self.state = HALF_OPEN
+                self._probing = False
+                logger.info("Circuit %s half-open, probing", self.name)
+
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+
+            self.short_circuited += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("Circuit %s closed", self.name)
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.trips += 1
+                    logger.warning(
+                        "Circuit %s open after %d failure(s)", self.name, self.failures
+                    )
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutiveFailures": self.failures,
+                "trips": self.trips,
+                "shortCircuited": self.short_circuited,
+            }
+
+
+vector_breaker = CircuitBreaker(
+    "vector_store",
+    failure_threshold=settings.vector_breaker_failures,
+    reset_timeout_s=settings.vector_breaker_reset_s,
+)
+VECTOR_BREAKER_OPEN.set_function(lambda: int(vector_breaker.state != CLOSED))
@@ -0,0 +1,240 @@
+"""
+One pooled vector store client per process, shared by the API and workers.
+
+QdrantGateway (sync) and AsyncQdrantGateway (async) wrap the underlying
+client (QdrantClient / AsyncQdrantClient, or LocalVectorStore) and expose
+the same methods with:
+
+- a single client per process, created on first use and recreated after
+  fork, so Celery prefork children never share gRPC channels or sockets
+- REST or gRPC transport (qdrant_prefer_grpc) and an explicit timeout
+- retry with exponential backoff and jitter for transient failures
+  (connection errors, timeouts, 5xx/429, gRPC UNAVAILABLE...) within a
+  time budget, so a timed-out call fails after one client timeout
+- per-method latency, error and retry counters (gateway.stats())
+- a `qdrant.<method>` trace span per call, retries included
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    stop_after_delay,
+    wait_exponential_jitter,
+)
+
+from app.config import settings
+from app.services.metrics import VECTOR_STORE_RETRIES, VECTOR_STORE_SECONDS
+from app.services.qdrant.base import VectorStore
+from app.services.qdrant.local_store import LocalVectorStore
+from app.services.tracing import current_span, span
+
+try:
+    import grpc
+except ImportError:  # REST-only installs
+    grpc = None
+
+logger = logging.getLogger(__name__)
+
+RETRY_MAX_BACKOFF_S = 2.0
+
+
+def _retryable(exc: BaseException) -> bool:
+    """Transient transport / server errors; client errors (4xx) are final."""
+    if isinstance(exc, UnexpectedResponse):
+        return exc.status_code is None or exc.status_code == 429 or exc.status_code >= 500
+    if grpc is not None and isinstance(exc, grpc.RpcError):
+        return exc.code() in (
+            grpc.StatusCode.UNAVAILABLE,
+            grpc.StatusCode.DEADLINE_EXCEEDED,
+            grpc.StatusCode.RESOURCE_EXHAUSTED,
+        )
+    return isinstance(exc, (ResponseHandlingException, ConnectionError, TimeoutError))
+
+
+def _retry_kwargs(stats: "CallStats", method: str) -> Dict:
+    return {
+        "stop": (
+            stop_after_attempt(max(settings.qdrant_retry_attempts, 1))
+            | stop_after_delay(settings.qdrant_retry_budget_s)
+        ),
+        "wait": wait_exponential_jitter(
+            initial=settings.qdrant_retry_backoff_s, max=RETRY_MAX_BACKOFF_S
+        ),
+        "retry": retry_if_exception(_retryable),
+        "before_sleep": lambda state: stats.retried(method, state),
+        "reraise": True,
+    }
+
+
+class CallStats:
+    """Per-method call counts, errors, retries and latency (ms)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, method: str) -> Dict[str, float]:
+        entry = self._methods.get(method)
+        if entry is None:
+            entry = self._methods[method] = {
+                "calls": 0, "errors": 0, "retries": 0, "totalMs": 0.0, "maxMs": 0.0,
+            }
+        return entry
+
+    def record(self, method: str, elapsed_s: float, ok: bool):
+        VECTOR_STORE_SECONDS.labels(method=method, outcome="ok" if ok else "error").observe(elapsed_s)
+        ms = elapsed_s * 1000
+        with self._lock:
+            entry = self._entry(method)
+            entry["calls"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["totalMs"] += ms
+            entry["maxMs"] = max(entry["maxMs"], ms)
+
+    def retried(self, method: str, state):
+        VECTOR_STORE_RETRIES.labels(method=method).inc()
+        with self._lock:
+            self._entry(method)["retries"] += 1
+        call_span = current_span()
+        if call_span is not None:
+            call_span.set("retries", state.attempt_number)
+        logger.warning(
+            "Vector store %s failed (attempt %d), retrying: %s",
+            method, state.attempt_number, state.outcome.exception(),
+        )
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                method: {
+                    **entry,
+                    "totalMs": round(entry["totalMs"], 1),
+                    "maxMs": round(entry["maxMs"], 1),
+                    "avgMs": round(entry["totalMs"] / entry["calls"], 1) if entry["calls"] else 0.0,
+                }
+                for method, entry in self._methods.items()
+            }
+
+
+def create_sync_client() -> VectorStore:
+    if settings.vector_backend == "local":
+        return LocalVectorStore(settings.local_vector_dir)
+    return QdrantClient(
+        host=settings.qdrant_host,
+        port=settings.qdrant_port,
+        grpc_port=settings.qdrant_grpc_port,
+        prefer_grpc=settings.qdrant_prefer_grpc,
+        timeout=settings.qdrant_timeout_s,
+    )
+
+
+def create_async_client() -> Optional[AsyncQdrantClient]:
+    # The local store has no async client; its calls run in a thread
+    if settings.vector_backend == "local":
+        return None
+    return AsyncQdrantClient(
+        host=settings.qdrant_host,
+        port=settings.qdrant_port,
+        grpc_port=settings.qdrant_grpc_port,
+        prefer_grpc=settings.qdrant_prefer_grpc,
+        timeout=settings.qdrant_timeout_s,
+    )
+
+
+class QdrantGateway:
+    """Sync face: `gateway.query_points(...)` etc., with retries and timing."""
+
+    def __init__(self, factory: Callable[[], VectorStore], stats: CallStats):
+        self._factory = factory
+        self._stats = stats
+        self._lock = threading.Lock()
+        self._client: Optional[VectorStore] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def raw(self) -> VectorStore:
+        """The process's underlying client (created on first use / after fork)."""
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self._client = self._factory()
+                    self._pid = os.getpid()
+        return self._client
+
+    def _invoke(self, method: str, args, kwargs) -> Any:
+        with span(f"qdrant.{method}"):
+            for attempt in Retrying(**_retry_kwargs(self._stats, method)):
+                with attempt:
+                    started = time.perf_counter()
+                    try:
+                        result = getattr(self.raw, method)(*args, **kwargs)
+                    except Exception:
+                        self._stats.record(method, time.perf_counter() - started, ok=False)
+                        raise
+                    self._stats.record(method, time.perf_counter() - started, ok=True)
+                    return result
+
+    def __getattr__(self, method: str) -> Callable:
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return lambda *args, **kwargs: self._invoke(method, args, kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return self._stats.snapshot()
+
+
+class AsyncQdrantGateway:
+    """Async face of the same gateway (same stats, same retry policy)."""
+
+    def __init__(self, sync: QdrantGateway, stats: CallStats):
+        self._sync = sync
+        self._stats = stats
+        self._client: Optional[AsyncQdrantClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get(self) -> Optional[AsyncQdrantClient]:
+        # Async clients are bound to the loop that created them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._client = create_async_client()
+            self._loop = loop
+        return self._client
+
+    async def _call(self, method: str, args, kwargs) -> Any:
+        client = self._get()
+        if client is None:
+            return await asyncio.to_thread(getattr(self._sync.raw, method), *args, **kwargs)
+        return await getattr(client, method)(*args, **kwargs)
+
+    async def _invoke(self, method: str, args, kwargs) -> Any:
+        with span(f"qdrant.{method}"):
+            async for attempt in AsyncRetrying(**_retry_kwargs(self._stats, method)):
+                with attempt:
+                    started = time.perf_counter()
+                    try:
+                        result = await self._call(method, args, kwargs)
+                    except Exception:
+                        self._stats.record(method, time.perf_counter() - started, ok=False)
+                        raise
+                    self._stats.record(method, time.perf_counter() - started, ok=True)
+                    return result
+
+    def __getattr__(self, method: str) -> Callable:
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        async def call(*args, **kwargs):
+            return await self._invoke(method, args, kwargs)
+
+        return call
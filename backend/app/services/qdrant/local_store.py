@@ -0,0 +1,595 @@
+"""
+In-process vector store for the desktop build and CI (VECTOR_BACKEND=local).
+
+Implements the VectorStore subset of QdrantClient over files under
+settings.local_vector_dir:
+
+    <collection>/config.json            vector size, distance, payload indexes
+    <collection>/seg_<created_ns>_<id>/ immutable segment (built in .tmp_*)
+        vectors.npy                     float16 [n, dim], L2-normalised
+        points.json                     {"ids": [...], "payloads": [...]}
+        replaces.json                   merged segment: names of its sources
+    <collection>/deletes/<ns>_<id>.json filter or id list deleted at <ns>
+
+Every upsert appends a segment; a point lives in the newest segment that
+holds its id, and delete records hide matching points in older segments.
+Vectors are memory-mapped. Search is exact (blocked float32 matmul) unless
+hnswlib is installed and the collection has at least
+settings.local_vector_ann_threshold live points; then each segment gets an
+in-memory HNSW graph. Segments are merged once there are more than
+settings.local_vector_max_segments. Sources of a merged segment are
+ignored even while their directories are still on disk (a mapped file
+cannot be removed on Windows), and delete records are only dropped once
+those directories are gone.
+
+Dense cosine only: no sparse vectors, so hybrid search reports itself
+unavailable and lexical retrieval stays on its configured backend.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from qdrant_client.http import models
+
+from app.config import settings
+
+try:
+    import hnswlib
+except ImportError:  # optional: exact search only
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "seg_"
+DELETES_DIR = "deletes"
+CONFIG_FILE = "config.json"
+REPLACES_FILE = "replaces.json"
+LOCK_FILE = ".compact.lock"
+STALE_LOCK_SECONDS = 3600
+
+# Rows converted to float32 per matmul in exact search
+SEARCH_BLOCK_ROWS = 65536
+# Grouped ANN queries fetch this many times limit * group_size candidates
+ANN_OVERSAMPLE = 4
+
+Conditions = List[Tuple[str, list]]
+
+
+def _mtime_ns(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _normalize(vectors) -> np.ndarray:
+    arr = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(arr, axis=-1, keepdims=True)
+    return arr / np.maximum(norms, 1e-12)
+
+
+def _dense(vector):
+    # Named vectors: only the unnamed dense one is stored
+    return vector[""] if isinstance(vector, dict) else vector
+
+
+def _write_json(path: str, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_replaces(segment_path: str) -> List[str]:
+    try:
+        with open(os.path.join(segment_path, REPLACES_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _remove_dir(path: str) -> bool:
+    """Whether `path` is gone; failures (e.g. a file still mapped) are logged."""
+    try:
+        shutil.rmtree(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        logger.warning("Could not remove merged segment %s, will retry", path, exc_info=True)
+    return not os.path.exists(path)
+
+
+def _conditions(query_filter: Optional[models.Filter]) -> Conditions:
+    """Flatten a must-only keyword Filter into (key, allowed values) pairs."""
+    if query_filter is None:
+        return []
+    if query_filter.should or query_filter.must_not:
+        raise NotImplementedError("LocalVectorStore supports 'must' filters only")
+
+    must = query_filter.must or []
+    if not isinstance(must, list):
+        must = [must]
+
+    out = []
+    for cond in must:
+        match = getattr(cond, "match", None)
+        if isinstance(match, models.MatchAny):
+            out.append((cond.key, list(match.any)))
+        elif isinstance(match, models.MatchValue):
+            out.append((cond.key, [match.value]))
+        else:
+            raise NotImplementedError("LocalVectorStore supports keyword matches only")
+    return out
+
+
+class _Segment:
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.created_ns = int(self.name.split("_")[1])
+
+        with open(os.path.join(path, "points.json")) as f:
+            points = json.load(f)
+        self.ids: List[str] = points["ids"]
+        self.payloads: List[Dict] = points["payloads"]
+        self.replaces: List[str] = _read_replaces(path)
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+
+        self.live = np.ones(len(self.ids), dtype=bool)
+        self._columns: Dict[str, list] = {}
+        self._ann = None
+
+    def close(self):
+        """Drop the memory map so the directory can be removed."""
+        self.vectors = None
+        self._ann = None
+
+    def match(self, conditions: Conditions) -> np.ndarray:
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, values in conditions:
+            if key not in self._columns:
+                self._columns[key] = [p.get(key) for p in self.payloads]
+            allowed = set(values)
+            mask &= np.fromiter(
+                (v in allowed for v in self._columns[key]), dtype=bool, count=len(self.ids)
+            )
+        return mask
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        out = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+            out[start:start + len(block)] = block @ q
+        return out
+
+    def exact_search(self, q: np.ndarray, k: Optional[int], mask: np.ndarray):
+        rows = np.flatnonzero(mask)
+        scores = self.scores(q)[rows]
+        if k is not None and len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        return rows, scores
+
+    def ann_search(self, q: np.ndarray, k: int, mask: np.ndarray):
+        if self._ann is None:
+            index = hnswlib.Index(space="ip", dim=self.vectors.shape[1])
+            index.init_index(max_elements=len(self.ids), ef_construction=200, M=16)
+            index.add_items(np.asarray(self.vectors, dtype=np.float32), np.arange(len(self.ids)))
+            self._ann = index
+
+        k = min(k, int(mask.sum()))
+        self._ann.set_ef(max(2 * k, 64))
+        try:
+            labels, distances = self._ann.knn_query(q, k=k, filter=lambda i: bool(mask[i]))
+        except RuntimeError:
+            # Too few reachable points pass the filter
+            return self.exact_search(q, k, mask)
+        # "ip" distance is 1 - dot
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+
+class _Collection:
+    def __init__(self, path: str):
+        self.path = path
+        self.config: Dict = {}
+        self.segments: List[_Segment] = []
+        self.deletes: List[Dict] = []
+        self.count = 0
+        # Merged-away segment directories still on disk, and the newest
+        # merged segment's time (delete records before it go with them)
+        self.leftovers: List[str] = []
+        self.merged_ns = 0
+        self._stamp = None
+
+    @property
+    def deletes_dir(self) -> str:
+        return os.path.join(self.path, DELETES_DIR)
+
+    def remove_leftovers(self):
+        """Remove merged-away segments; once all are gone, the delete records
+        older than the merged segment no longer hide anything."""
+        self.leftovers = [
+            n for n in self.leftovers if not _remove_dir(os.path.join(self.path, n))
+        ]
+        if self.leftovers:
+            return
+        for record_name in os.listdir(self.deletes_dir):
+            if record_name.endswith(".json") and int(record_name.split("_")[0]) < self.merged_ns:
+                try:
+                    os.remove(os.path.join(self.deletes_dir, record_name))
+                except FileNotFoundError:
+                    pass
+
+    def refresh(self):
+        """Reload when segments, deletes or config changed on disk."""
+        if self.leftovers:
+            self.remove_leftovers()
+
+        stamp = (_mtime_ns(self.path), _mtime_ns(self.deletes_dir))
+        if stamp == self._stamp:
+            return
+
+        with open(os.path.join(self.path, CONFIG_FILE)) as f:
+            self.config = json.load(f)
+
+        cached = {s.name: s for s in self.segments}
+        names = [n for n in os.listdir(self.path) if n.startswith(SEGMENT_PREFIX)]
+
+        # Sources of a merged segment never load, even if still on disk
+        replaced, merged_ns = set(), 0
+        for n in names:
+            replaces = cached[n].replaces if n in cached else _read_replaces(os.path.join(self.path, n))
+            if replaces:
+                replaced.update(replaces)
+                merged_ns = max(merged_ns, int(n.split("_")[1]))
+        self.leftovers = [n for n in names if n in replaced]
+        self.merged_ns = merged_ns
+
+        segments = [
+            cached.get(n) or _Segment(os.path.join(self.path, n))
+            for n in names if n not in replaced
+        ]
+        segments.sort(key=lambda s: (s.created_ns, s.name))
+
+        deletes = []
+        for name in os.listdir(self.deletes_dir):
+            if name.endswith(".json"):
+                with open(os.path.join(self.deletes_dir, name)) as f:
+                    deletes.append(json.load(f))
+
+        # Newest copy of each id wins
+        newest = {}
+        for seg in segments:
+            for pid in seg.ids:
+                newest[pid] = seg.name
+
+        for seg in segments:
+            live = np.fromiter(
+                (newest[pid] == seg.name for pid in seg.ids), dtype=bool, count=len(seg.ids)
+            )
+            for record in deletes:
+                if record["created_ns"] <= seg.created_ns:
+                    continue
+                if "ids" in record:
+                    gone = set(record["ids"])
+                    live &= np.fromiter(
+                        (pid not in gone for pid in seg.ids), dtype=bool, count=len(seg.ids)
+                    )
+                else:
+                    live &= ~seg.match([(c["key"], c["any"]) for c in record["must"]])
+            seg.live = live
+
+        self.segments = segments
+        self.deletes = deletes
+        self.count = int(sum(s.live.sum() for s in segments))
+        self._stamp = stamp
+
+
+def _write_segment(
+    path: str,
+    vectors: np.ndarray,
+    ids: list,
+    payloads: list,
+    created_ns: int,
+    replaces: Sequence[str] = (),
+) -> str:
+    name = f"{SEGMENT_PREFIX}{created_ns}_{uuid.uuid4().hex[:8]}"
+    tmp = os.path.join(path, f".tmp_{name}")
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "vectors.npy"), vectors)
+    with open(os.path.join(tmp, "points.json"), "w") as f:
+        json.dump({"ids": ids, "payloads": payloads}, f)
+    if replaces:
+        with open(os.path.join(tmp, REPLACES_FILE), "w") as f:
+            json.dump(list(replaces), f)
+    os.rename(tmp, os.path.join(path, name))
+    return name
+
+
+def _completed() -> models.UpdateResult:
+    return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+
+class LocalVectorStore:
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._collections: Dict[str, _Collection] = {}
+
+    def _collection(self, collection_name: str) -> _Collection:
+        path = os.path.join(self.root, collection_name)
+        if not os.path.exists(os.path.join(path, CONFIG_FILE)):
+            raise ValueError(f"Collection '{collection_name}' not found")
+
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            collection = self._collections[collection_name] = _Collection(path)
+        collection.refresh()
+        return collection
+
+    # COLLECTIONS
+    def get_collections(self) -> models.CollectionsResponse:
+        names = sorted(
+            n for n in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, n, CONFIG_FILE))
+        )
+        return models.CollectionsResponse(
+            collections=[models.CollectionDescription(name=n) for n in names]
+        )
+
+    def create_collection(self, collection_name: str, vectors_config: models.VectorParams, **kwargs):
+        # sparse_vectors_config and tuning options do not apply here
+        path = os.path.join(self.root, collection_name)
+        os.makedirs(os.path.join(path, DELETES_DIR), exist_ok=True)
+        _write_json(os.path.join(path, CONFIG_FILE), {
+            "size": vectors_config.size,
+            "distance": str(getattr(vectors_config.distance, "value", vectors_config.distance)),
+            "payload_indexes": [],
+        })
+        return True
+
+    def get_collection(self, collection_name: str):
+        """Mirrors the CollectionInfo attributes the app reads."""
+        collection = self._collection(collection_name)
+        config = collection.config
+        return SimpleNamespace(
+            status="green",
+            points_count=collection.count,
+            payload_schema={
+                field: SimpleNamespace(data_type="keyword")
+                for field in config["payload_indexes"]
+            },
+            config=SimpleNamespace(params=SimpleNamespace(
+                vectors=SimpleNamespace(size=config["size"], distance=config["distance"]),
+                sparse_vectors=None,
+            )),
+        )
+
+    def create_payload_index(self, collection_name: str, field_name: str, **kwargs):
+        # Filters scan cached payload columns; the field is recorded for parity
+        collection = self._collection(collection_name)
+        config = dict(collection.config)
+        if field_name not in config["payload_indexes"]:
+            config["payload_indexes"] = config["payload_indexes"] + [field_name]
+            _write_json(os.path.join(collection.path, CONFIG_FILE), config)
+        return _completed()
+
+    # WRITES
+    def upsert(self, collection_name: str, points, wait: bool = True):
+        collection = self._collection(collection_name)
+        if not points:
+            return _completed()
+
+        ids, vectors, payloads = [], [], []
+        for p in points:
+            if not isinstance(p, dict):
+                p = {"id": p.id, "vector": p.vector, "payload": p.payload}
+            ids.append(str(p["id"]))
+            vectors.append(_dense(p["vector"]))
+            payloads.append(p.get("payload") or {})
+
+        matrix = _normalize(vectors)
+        if matrix.shape[1] != collection.config["size"]:
+            raise ValueError(
+                f"Vector size {matrix.shape[1]} does not match collection "
+                f"'{collection_name}' ({collection.config['size']})"
+            )
+
+        _write_segment(collection.path, matrix.astype(np.float16), ids, payloads, time.time_ns())
+        self._maybe_compact(collection)
+        return _completed()
+
+    def delete(self, collection_name: str, points_selector, wait: bool = True):
+        collection = self._collection(collection_name)
+
+        if isinstance(points_selector, models.PointIdsList):
+            record = {"ids": [str(i) for i in points_selector.points]}
+        else:
+            query_filter = (
+                points_selector.filter
+                if isinstance(points_selector, models.FilterSelector)
+                else points_selector
+            )
+            record = {"must": [{"key": k, "any": v} for k, v in _conditions(query_filter)]}
+
+        record["created_ns"] = time.time_ns()
+        _write_json(
+            os.path.join(collection.deletes_dir, f"{record['created_ns']}_{uuid.uuid4().hex[:8]}.json"),
+            record,
+        )
+        return _completed()
+
+    # SEARCH
+    def _use_ann(self, collection: _Collection) -> bool:
+        threshold = settings.local_vector_ann_threshold
+        return hnswlib is not None and threshold > 0 and collection.count >= threshold
+
+    def _ranked(self, collection: _Collection, query, query_filter, k: Optional[int]):
+        """(score, segment, row) best first; k=None ranks every match."""
+        q = _normalize(_dense(query))
+        conditions = _conditions(query_filter)
+        use_ann = k is not None and self._use_ann(collection)
+
+        ranked = []
+        for seg in collection.segments:
+            mask = seg.live & seg.match(conditions)
+            if not mask.any():
+                continue
+            if use_ann:
+                rows, scores = seg.ann_search(q, k, mask)
+            else:
+                rows, scores = seg.exact_search(q, k, mask)
+            ranked.extend(zip(scores.tolist(), [seg] * len(rows), rows.tolist()))
+
+        ranked.sort(key=lambda r: -r[0])
+        return ranked if k is None else ranked[:k]
+
+    @staticmethod
+    def _scored_point(score: float, seg: _Segment, row: int, with_payload) -> models.ScoredPoint:
+        payload = seg.payloads[row]
+        if with_payload is False:
+            payload = None
+        elif isinstance(with_payload, list):
+            payload = {f: payload[f] for f in with_payload if f in payload}
+        return models.ScoredPoint(id=seg.ids[row], version=0, score=score, payload=payload)
+
+    @staticmethod
+    def _check_query(query, kwargs):
+        if query is None or kwargs.get("prefetch"):
+            raise NotImplementedError("LocalVectorStore supports plain dense queries only")
+
+    def query_points(
+        self,
+        collection_name: str,
+        query=None,
+        limit: int = 10,
+        with_payload=True,
+        query_filter: Optional[models.Filter] = None,
+        **kwargs,
+    ) -> models.QueryResponse:
+        self._check_query(query, kwargs)
+        collection = self._collection(collection_name)
+        ranked = self._ranked(collection, query, query_filter, limit)
+        return models.QueryResponse(
+            points=[self._scored_point(s, seg, row, with_payload) for s, seg, row in ranked]
+        )
+
+    def query_points_groups(
+        self,
+        collection_name: str,
+        group_by: str,
+        query=None,
+        limit: int = 10,
+        group_size: int = 3,
+        with_payload=True,
+        query_filter: Optional[models.Filter] = None,
+        **kwargs,
+    ) -> models.GroupsResult:
+        self._check_query(query, kwargs)
+        collection = self._collection(collection_name)
+
+        # Exact search ranks every match; ANN oversamples
+        k = limit * group_size * ANN_OVERSAMPLE if self._use_ann(collection) else None
+        ranked = self._ranked(collection, query, query_filter, k)
+
+        groups: Dict[str, list] = {}
+        for score, seg, row in ranked:
+            key = seg.payloads[row].get(group_by)
+            if key is None:
+                continue
+            hits = groups.get(key)
+            if hits is None:
+                if len(groups) >= limit:
+                    continue
+                hits = groups[key] = []
+            if len(hits) < group_size:
+                hits.append(self._scored_point(score, seg, row, with_payload))
+
+        return models.GroupsResult(
+            groups=[models.PointGroup(id=key, hits=hits) for key, hits in groups.items()]
+        )
+
+    def query_batch_points(self, collection_name: str, requests: list, **kwargs) -> List[models.QueryResponse]:
+        return [
+            self.query_points(
+                collection_name,
+                query=r.query,
+                limit=r.limit or 10,
+                with_payload=True if r.with_payload is None else r.with_payload,
+                query_filter=r.filter,
+                prefetch=r.prefetch,
+            )
+            for r in requests
+        ]
+
+    # COMPACTION
+    def _maybe_compact(self, collection: _Collection):
+        count = sum(1 for n in os.listdir(collection.path) if n.startswith(SEGMENT_PREFIX))
+        if count > settings.local_vector_max_segments:
+            self.compact(os.path.basename(collection.path))
+
+    def compact(self, collection_name: str) -> Optional[str]:
+        """Merge all segments of a collection, dropping dead points."""
+        collection = self._collection(collection_name)
+        lock = os.path.join(collection.path, LOCK_FILE)
+        try:
+            if time.time() - os.stat(lock).st_mtime > STALE_LOCK_SECONDS:
+                os.remove(lock)  # left behind by a crashed compaction
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL))
+        except FileExistsError:
+            return None
+
+        try:
+            segments = list(collection.segments)
+            if len(segments) < 2:
+                collection.remove_leftovers()
+                return None
+
+            vectors, ids, payloads = [], [], []
+            for seg in segments:
+                rows = np.flatnonzero(seg.live)
+                vectors.append(np.asarray(seg.vectors[rows], dtype=np.float16))
+                ids.extend(seg.ids[r] for r in rows)
+                payloads.extend(seg.payloads[r] for r in rows)
+
+            # Newest source time, so deletes recorded meanwhile still apply.
+            # Earlier leftovers are listed too: this segment may outlive the
+            # one that replaced them.
+            created_ns = max(s.created_ns for s in segments)
+            sources = [s.name for s in segments] + collection.leftovers
+            name = _write_segment(
+                collection.path,
+                np.concatenate(vectors).reshape(-1, collection.config["size"]),
+                ids,
+                payloads,
+                created_ns,
+                replaces=sources,
+            )
+
+            # Unmap the sources before removing them; whatever cannot be
+            # removed yet is retried on the next refresh or compaction
+            merged = len(segments)
+            collection.segments = []
+            collection._stamp = None
+            for seg in segments:
+                seg.close()
+            del segments, vectors
+            collection.leftovers = sources
+            collection.merged_ns = created_ns
+            collection.remove_leftovers()
+
+            logger.info("Compacted %d segments of '%s' into %s", merged, collection_name, name)
+            return name
+
+        finally:
+            os.remove(lock)
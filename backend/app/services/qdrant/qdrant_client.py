@@ -1,48 +1,159 @@
-from qdrant_client import QdrantClient
+from typing import Optional
+
 from qdrant_client.models import VectorParams, Distance
 from qdrant_client.http import models
+from qdrant_client.http.exceptions import UnexpectedResponse
 from app.config import settings
+from app.services.embeddings.sparse import SPARSE_VECTOR_NAME
+from app.services.qdrant.gateway import (
+    AsyncQdrantGateway,
+    CallStats,
+    QdrantGateway,
+    create_sync_client,
+)
 
 COLLECTION_NAME = settings.qdrant_collection
 VECTOR_SIZE = settings.embedding_dim  # must align with embedding model
 
-client = QdrantClient(
-    host=settings.qdrant_host,
-    port=settings.qdrant_port,
-)
+# Coarse-to-fine routing: pooled document and page vectors
+DOC_COLLECTION_NAME = f"{COLLECTION_NAME}_docs"
+PAGE_COLLECTION_NAME = f"{COLLECTION_NAME}_pages"
+
+
+# Shared by indexing, search and health checks (one pooled client per
+# process); async_client is the async face with the same retries and stats
+call_stats = CallStats()
+client = QdrantGateway(create_sync_client, call_stats)
+async_client = AsyncQdrantGateway(client, call_stats)
+
+# Collection state, checked once per process: whether the chunk collection
+# accepts sparse vectors (None = not checked yet)
+_sparse_enabled: Optional[bool] = None
+
+# Payload fields used for filtering and grouping
+KEYWORD_INDEXES = {
+    COLLECTION_NAME: ("pdf_id", "parent_chunk_id", "page_key"),
+    DOC_COLLECTION_NAME: ("pdf_id",),
+    PAGE_COLLECTION_NAME: ("pdf_id", "page_key"),
+}
+
+
+def page_key(pdf_id: str, page: int) -> str:
+    return f"{pdf_id}:{page}"
+
+
+def reset_collection_state():
+    global _sparse_enabled
+    _sparse_enabled = None
+
+
+def ensure_collection() -> bool:
+    """
+    Create missing collections; returns whether chunks accept sparse vectors.
+
+    Cached per process, so only the first call talks to the vector store.
+    """
+    if _sparse_enabled is not None:
+        return _sparse_enabled
 
-def ensure_collection():
     collections = client.get_collections().collections
     names = [c.name for c in collections]
 
-    if COLLECTION_NAME not in names:
-        client.create_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config=VectorParams(
-                size=VECTOR_SIZE,
-                distance=Distance.COSINE,
-            ),
+    for name in (COLLECTION_NAME, DOC_COLLECTION_NAME, PAGE_COLLECTION_NAME):
+        if name not in names:
+            client.create_collection(
+                collection_name=name,
+                vectors_config=VectorParams(
+                    size=VECTOR_SIZE,
+                    distance=Distance.COSINE,
+                ),
+                # Only the chunk collection carries BM25 term vectors
+                sparse_vectors_config=(
+                    {SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)}
+                    if name == COLLECTION_NAME else None
+                ),
+            )
+            print(f"[QDRANT] Created collection '{name}' with dim={VECTOR_SIZE}")
+        else:
+            print(f"[QDRANT] Collection '{name}' already exists")
+
+        ensure_payload_indexes(name)
+
+    return has_sparse_vectors()
+
+
+def cached_sparse_vectors() -> Optional[bool]:
+    """has_sparse_vectors() if already known, without a vector store call."""
+    return _sparse_enabled
+
+
+def has_sparse_vectors() -> bool:
+    global _sparse_enabled
+    if _sparse_enabled is not None:
+        return _sparse_enabled
+
+    info = client.get_collection(COLLECTION_NAME)
+    sparse = info.config.params.sparse_vectors or {}
+    if SPARSE_VECTOR_NAME not in sparse and settings.vector_backend != "local":
+        print(
+            f"[QDRANT] '{COLLECTION_NAME}' has no '{SPARSE_VECTOR_NAME}' sparse vectors; "
+            "recreate it to enable hybrid search"
+        )
+    _sparse_enabled = SPARSE_VECTOR_NAME in sparse
+    return _sparse_enabled
+
+
+def ensure_payload_indexes(collection_name: str):
+    existing = client.get_collection(collection_name).payload_schema or {}
+    for field in KEYWORD_INDEXES[collection_name]:
+        if field not in existing:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field,
+                field_schema=models.PayloadSchemaType.KEYWORD,
+            )
+            print(f"[QDRANT] Created keyword index on '{collection_name}.{field}'")
+
+
+def upsert_points(points: list[dict], collection_name: str = COLLECTION_NAME):
+    try:
+        client.upsert(
+            collection_name=collection_name,
+            points=points,
+            wait=True,
+        )
+    except UnexpectedResponse as e:
+        # Collection dropped behind our back: recreate on the next ensure_collection
+        if e.status_code == 404:
+            reset_collection_state()
+        raise
+
+
+def _pdf_selector(match) -> models.FilterSelector:
+    return models.FilterSelector(
+        filter=models.Filter(
+            must=[models.FieldCondition(key="pdf_id", match=match)]
         )
-        print(f"[QDRANT] Created collection '{COLLECTION_NAME}' with dim={VECTOR_SIZE}")
-    else:
-        print(f"[QDRANT] Collection '{COLLECTION_NAME}' already exists")
-
-def upsert_points(points: list[dict]):
-    client.upsert(
-        collection_name=COLLECTION_NAME,
-        points=points,
-        wait=True,
     )
 
 
 def delete_pdf_vectors(pdf_id: str):
     """Delete all vectors in Qdrant for a given pdf_id payload."""
-    client.delete(
-        collection_name=COLLECTION_NAME,
-        points_selector=models.FilterSelector(
-            filter=models.Filter(
-                must=[models.FieldCondition(key="pdf_id", match=models.MatchValue(value=pdf_id))]
-            )
-        ),
-        wait=True,
-    )
+    for name in (COLLECTION_NAME, DOC_COLLECTION_NAME, PAGE_COLLECTION_NAME):
+        client.delete(
+            collection_name=name,
+            points_selector=_pdf_selector(models.MatchValue(value=pdf_id)),
+            wait=True,
+        )
+
+
+def delete_pdfs_vectors(pdf_ids: list[str]):
+    """Delete the vectors of many PDFs with a single multi-value filter."""
+    if not pdf_ids:
+        return
+    for name in (COLLECTION_NAME, DOC_COLLECTION_NAME, PAGE_COLLECTION_NAME):
+        client.delete(
+            collection_name=name,
+            points_selector=_pdf_selector(models.MatchAny(any=pdf_ids)),
+            wait=True,
+        )
@@ -1,19 +1,72 @@
 import logging
 from typing import Optional, Sequence
 
-from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue
+from qdrant_client.models import (
+    Filter,
+    FieldCondition,
+    MatchAny,
+    SparseVector,
+    QueryRequest,
+)
 
-from app.config import settings
+from app.services.qdrant.qdrant_client import (
+    client as qdrant,
+    COLLECTION_NAME,
+    DOC_COLLECTION_NAME,
+    PAGE_COLLECTION_NAME,
+    cached_sparse_vectors,
+    has_sparse_vectors,
+)
+from app.services.qdrant.breaker import vector_breaker
+from app.services.embeddings.sparse import SPARSE_VECTOR_NAME, encode_query
 
 logger = logging.getLogger(__name__)
 
-COLLECTION_NAME = "pdf_chunks"
+# Children of one parent collapse into one context during fusion, so
+# semantic retrieval asks Qdrant for distinct parents directly.
+GROUP_BY_FIELD = "parent_chunk_id"
 
-qdrant = QdrantClient(
-    host=settings.qdrant_host,
-    port=settings.qdrant_port,
-)
+# Batch queries have no server-side grouping: fetch this many times
+# top_k * group_size points and group on parent_chunk_id locally
+BATCH_GROUP_FACTOR = 3
+
+def _call(method, *args, **kwargs):
+    """Vector store call through the circuit breaker (fails fast while open)."""
+    vector_breaker.before_call()
+    try:
+        result = method(*args, **kwargs)
+    except Exception:
+        vector_breaker.record_failure()
+        raise
+    vector_breaker.record_success()
+    return result
+
+
+def _pdf_filter(
+    pdf_ids: Optional[Sequence[str]],
+    page_keys: Optional[Sequence[str]] = None,
+) -> Optional[Filter]:
+    must = []
+    if pdf_ids:
+        must.append(FieldCondition(key="pdf_id", match=MatchAny(any=list(pdf_ids))))
+    if page_keys:
+        must.append(FieldCondition(key="page_key", match=MatchAny(any=list(page_keys))))
+    return Filter(must=must) if must else None
+
+
+def _format_point(r) -> dict:
+    payload = r.payload if hasattr(r, "payload") else {}
+    score = r.score if hasattr(r, "score") else r[1] if isinstance(r, tuple) and len(r) > 1 else None
+    return {
+        "score": score,
+        "chunk_id": payload.get("chunk_id") if payload else None,
+        "parent_chunk_id": payload.get("parent_chunk_id") if payload else None,
+        "pdf_id": payload.get("pdf_id") if payload else None,
+        "page": payload.get("page") if payload else None,
+        "chunk_index": payload.get("chunk_index") if payload else None,
+        "text": payload.get("text") if payload else None,
+        "parent_text": payload.get("parent_text") if payload else None,
+    }
 
 
 def semantic_search(
@@ -22,17 +75,14 @@ def semantic_search(
     pdf_ids: Optional[Sequence[str]] = None,
 ):
     """Search Qdrant for similar chunks. Optional filter by pdf_ids."""
-    q_filter = None
-    if pdf_ids:
-        q_filter = Filter(should=[FieldCondition(key="pdf_id", match=MatchValue(value=pid)) for pid in pdf_ids])
-
     try:
-        results = qdrant.query_points(
+        results = _call(
+            qdrant.query_points,
             collection_name=COLLECTION_NAME,
             query=query_vector,
             limit=top_k,
             with_payload=True,
-            query_filter=q_filter,
+            query_filter=_pdf_filter(pdf_ids),
         )
         # qdrant_client>=1.16 returns QueryResponse with .points
         if hasattr(results, "points"):
@@ -41,18 +91,248 @@ def semantic_search(
         logger.exception("Qdrant search failed")
         return []
 
-    formatted = []
-    for r in results:
-        payload = r.payload if hasattr(r, "payload") else {}
-        score = r.score if hasattr(r, "score") else r[1] if isinstance(r, tuple) and len(r) > 1 else None
-        formatted.append({
-            "score": score,
-            "chunk_id": payload.get("chunk_id") if payload else None,
-            "pdf_id": payload.get("pdf_id") if payload else None,
-            "page": payload.get("page") if payload else None,
-            "chunk_index": payload.get("chunk_index") if payload else None,
-            "text": payload.get("text") if payload else None,
-            "parent_text": payload.get("parent_text") if payload else None,
+    return [_format_point(r) for r in results]
+
+
+def semantic_search_grouped(
+    query_vector: list[float],
+    top_k: int = 5,
+    pdf_ids: Optional[Sequence[str]] = None,
+    group_size: int = 1,
+    page_keys: Optional[Sequence[str]] = None,
+):
+    """
+    Top `top_k` distinct parents, each with its best `group_size` children.
+
+    Returns the children flattened in group order (best group first).
+    """
+    try:
+        result = _call(
+            qdrant.query_points_groups,
+            collection_name=COLLECTION_NAME,
+            query=query_vector,
+            group_by=GROUP_BY_FIELD,
+            limit=top_k,
+            group_size=group_size,
+            with_payload=True,
+            query_filter=_pdf_filter(pdf_ids, page_keys),
+        )
+    except Exception:
+        logger.exception("Qdrant grouped search failed")
+        return []
+
+    return [_format_point(hit) for group in result.groups for hit in group.hits]
+
+
+def hybrid_available() -> bool:
+    """Whether the chunk collection has BM25 sparse vectors (checked once)."""
+    # The cached answer is no vector store call: it must not count as a
+    # breaker success or take the half-open probe
+    cached = cached_sparse_vectors()
+    if cached is not None:
+        return cached
+    try:
+        return _call(has_sparse_vectors)
+    except Exception:
+        logger.exception("Qdrant collection info failed")
+        return False
+
+
+def _group_points(points, top_k: int, group_size: int) -> list[dict]:
+    """Client-side equivalent of query_points_groups on parent_chunk_id."""
+    groups: dict = {}
+    for p in points:
+        key = (p.payload or {}).get(GROUP_BY_FIELD)
+        if key is None:
+            continue
+        hits = groups.get(key)
+        if hits is None:
+            if len(groups) >= top_k:
+                continue
+            hits = groups[key] = []
+        if len(hits) < group_size:
+            hits.append(p)
+    return [_format_point(hit) for hits in groups.values() for hit in hits]
+
+
+def _lexical_hits(points) -> list[dict]:
+    """Sparse (BM25) points as lexical-channel hits, shaped like the Postgres backend's."""
+    out = []
+    for i, p in enumerate(points):
+        hit = _format_point(p)
+        out.append({
+            "chunk_id": hit["chunk_id"],
+            "parent_chunk_id": hit["parent_chunk_id"],
+            "pdf_id": hit["pdf_id"],
+            "page": hit["page"],
+            "chunk_index": hit["chunk_index"],
+            "text": hit["text"],
+            "lexical_rank": i + 1,
+            "lexical_score": float(hit["score"] or 0),
+            "has_lexical": True,
         })
+    return out
+
+
+def _dense_requests(query_vectors, pdf_ids, page_keys, limit: int) -> list[QueryRequest]:
+    page_keys = page_keys or [None] * len(query_vectors)
+    return [
+        QueryRequest(
+            query=vector, filter=_pdf_filter(pdf_ids[i], page_keys[i]), limit=limit, with_payload=True
+        )
+        for i, vector in enumerate(query_vectors)
+    ]
+
+
+def semantic_search_batch(
+    query_vectors: Sequence[list[float]],
+    pdf_ids: Sequence[Optional[Sequence[str]]],
+    top_k: int = 5,
+    group_size: int = 1,
+    page_keys: Optional[Sequence[Optional[Sequence[str]]]] = None,
+) -> list[list[dict]]:
+    """
+    Many grouped semantic searches in one query_batch_points round trip.
+    pdf_ids / page_keys are per vector.
+    """
+    if not query_vectors:
+        return []
+
+    limit = top_k * group_size * BATCH_GROUP_FACTOR
+    try:
+        responses = _call(
+            qdrant.query_batch_points,
+            collection_name=COLLECTION_NAME,
+            requests=_dense_requests(query_vectors, pdf_ids, page_keys, limit),
+        )
+    except Exception:
+        logger.exception("Qdrant batch search failed")
+        return [[] for _ in query_vectors]
+
+    return [_group_points(r.points, top_k, group_size) for r in responses]
+
+
+def hybrid_search_batch(
+    query_vectors: Sequence[list[float]],
+    pdf_ids: Sequence[Optional[Sequence[str]]],
+    query_texts: Sequence[Optional[str]],
+    lexical_pdf_ids: Optional[Sequence[str]],
+    lexical_k: int,
+    top_k: int = 5,
+    group_size: int = 1,
+    page_keys: Optional[Sequence[Optional[Sequence[str]]]] = None,
+) -> tuple[list[list[dict]], list[list[dict]]]:
+    """
+    semantic_search_batch plus a sparse BM25 search per non-None
+    query_texts[i] (over lexical_pdf_ids, unrouted), in the same round trip.
+
+    Returns (grouped dense points, lexical hits) per vector. Unlike the
+    other searches, failures raise: the caller then takes its lexical hits
+    from the Postgres backend instead.
+    """
+    if not query_vectors:
+        return [], []
+
+    limit = top_k * group_size * BATCH_GROUP_FACTOR
+    requests = _dense_requests(query_vectors, pdf_ids, page_keys, limit)
+    sparse_at = []
+    for i, query_text in enumerate(query_texts):
+        sparse = encode_query(query_text) if query_text else None
+        if sparse and sparse["indices"]:
+            sparse_at.append(i)
+            requests.append(QueryRequest(
+                query=SparseVector(**sparse),
+                using=SPARSE_VECTOR_NAME,
+                filter=_pdf_filter(lexical_pdf_ids),
+                limit=lexical_k,
+                with_payload=True,
+            ))
+
+    responses = _call(qdrant.query_batch_points, collection_name=COLLECTION_NAME, requests=requests)
+
+    dense = [_group_points(r.points, top_k, group_size) for r in responses[: len(query_vectors)]]
+    lexical: list[list[dict]] = [[] for _ in query_vectors]
+    for i, r in zip(sparse_at, responses[len(query_vectors):]):
+        lexical[i] = _lexical_hits(r.points)
+    return dense, lexical
+
+
+def hybrid_search_grouped(
+    query_vector: list[float],
+    query_text: str,
+    lexical_pdf_ids: Optional[Sequence[str]],
+    lexical_k: int,
+    top_k: int = 5,
+    pdf_ids: Optional[Sequence[str]] = None,
+    group_size: int = 1,
+    page_keys: Optional[Sequence[str]] = None,
+) -> tuple[list[dict], list[dict]]:
+    """Dense grouped hits and sparse BM25 lexical hits for one vector, one request."""
+    dense, lexical = hybrid_search_batch(
+        [query_vector], [pdf_ids], [query_text], lexical_pdf_ids, lexical_k,
+        top_k=top_k, group_size=group_size, page_keys=[page_keys],
+    )
+    return dense[0], lexical[0]
+
 
-    return formatted
+def _route(collection_name: str, query_vector, limit: int, pdf_ids, field: str) -> list[str]:
+    results = _call(
+        qdrant.query_points,
+        collection_name=collection_name,
+        query=query_vector,
+        limit=limit,
+        with_payload=[field],
+        query_filter=_pdf_filter(pdf_ids),
+    )
+    points = results.points if hasattr(results, "points") else results
+    return [p.payload[field] for p in points if p.payload]
+
+
+def route_documents(query_vector, pdf_ids: Sequence[str], top_docs: int) -> list[str]:
+    """Most relevant documents by pooled document vector."""
+    try:
+        return _route(DOC_COLLECTION_NAME, query_vector, top_docs, pdf_ids, "pdf_id")
+    except Exception:
+        logger.exception("Qdrant document routing failed")
+        return []
+
+
+def route_pages(query_vector, pdf_ids: Sequence[str], top_pages: int) -> list[str]:
+    """Most relevant page keys ("pdf_id:page") by pooled page vector."""
+    try:
+        return _route(PAGE_COLLECTION_NAME, query_vector, top_pages, pdf_ids, "page_key")
+    except Exception:
+        logger.exception("Qdrant page routing failed")
+        return []
+
+
+def _route_batch(collection_name: str, query_vectors, limit: int, pdf_ids, field: str) -> list[list[str]]:
+    responses = _call(
+        qdrant.query_batch_points,
+        collection_name=collection_name,
+        requests=[
+            QueryRequest(query=v, filter=_pdf_filter(ids), limit=limit, with_payload=[field])
+            for v, ids in zip(query_vectors, pdf_ids)
+        ],
+    )
+    return [[p.payload[field] for p in r.points if p.payload] for r in responses]
+
+
+def route_documents_batch(query_vectors, pdf_ids: Sequence[str], top_docs: int) -> list[list[str]]:
+    """route_documents for many query vectors in one round trip."""
+    try:
+        return _route_batch(
+            DOC_COLLECTION_NAME, query_vectors, top_docs, [pdf_ids] * len(query_vectors), "pdf_id"
+        )
+    except Exception:
+        logger.exception("Qdrant batch document routing failed")
+        return [[] for _ in query_vectors]
+
+
+def route_pages_batch(query_vectors, pdf_ids: Sequence[Sequence[str]], top_pages: int) -> list[list[str]]:
+    """route_pages for many query vectors, each within its own documents."""
+    try:
+        return _route_batch(PAGE_COLLECTION_NAME, query_vectors, top_pages, pdf_ids, "page_key")
+    except Exception:
+        logger.exception("Qdrant batch page routing failed")
+        return [[] for _ in query_vectors]
@@ -0,0 +1,202 @@
+"""
+Admission control for the search path.
+
+Searches are CPU-bound (query encoding and sentence re-encoding), so at
+most search_max_concurrent run at once per API process. Extra requests
+wait in a bounded queue that is served round-robin across users, so one
+client firing many searches cannot starve the others. A request is
+rejected immediately when the queue is full or its user already holds
+search_max_per_user slots/places, and after search_queue_timeout_ms of
+waiting; the caller turns that into 429 with a Retry-After estimated from
+the recent service time.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict
+
+from app.config import settings
+from app.services.metrics import (
+    SEARCH_ADMISSION_QUEUE,
+    SEARCH_ADMISSION_REJECTED,
+    SEARCH_ADMISSION_RUNNING,
+)
+
+# Weight of the newest sample in the service/wait time averages
+EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Slot:
+    """A granted search slot; release() is idempotent."""
+
+    def __init__(self, controller: "AdmissionController", user_id: str):
+        self.controller = controller
+        self.user_id = user_id
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+    async def __aenter__(self) -> "Slot":
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        max_per_user: int,
+        queue_timeout_ms: int,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.queue_timeout = queue_timeout_ms / 1000 if queue_timeout_ms else None
+
+        self.running = 0
+        self.queued = 0
+        # Slots held + places queued, per user
+        self._per_user: Dict[str, int] = {}
+        # user -> waiters; users are served in rotation
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "user_limit": 0, "timeout": 0}
+        self.avg_service_s = 0.5
+        self.avg_wait_s = 0.0
+
+    # ---------- internals ----------
+
+    def _reject(self, reason: str):
+        self.rejected[reason] += 1
+        SEARCH_ADMISSION_REJECTED.labels(reason=reason).inc()
+        raise AdmissionRejected(reason, self.retry_after())
+
+    def _hold(self, user_id: str):
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+
+    def _drop(self, user_id: str):
+        left = self._per_user.get(user_id, 0) - 1
+        if left > 0:
+            self._per_user[user_id] = left
+        else:
+            self._per_user.pop(user_id, None)
+
+    def _next_waiter(self) -> asyncio.Future:
+        user_id, waiters = self._waiting.popitem(last=False)
+        fut = waiters.popleft()
+        if waiters:
+            # Back of the rotation: other users go first
+            self._waiting[user_id] = waiters
+        return fut
+
+    def _grant_waiters(self):
+        while self._waiting and self.running < self.max_concurrent:
+            fut = self._next_waiter()
+            if fut.done():
+                continue
+            self.queued -= 1
+            self.running += 1
+            fut.set_result(None)
+
+    def _unqueue(self, user_id: str, fut: asyncio.Future):
+        waiters = self._waiting.get(user_id)
+        if waiters is not None and fut in waiters:
+            waiters.remove(fut)
+            if not waiters:
+                del self._waiting[user_id]
+        self.queued -= 1
+        self._drop(user_id)
+
+    def _release(self, slot: Slot):
+        elapsed = time.monotonic() - slot.started
+        self.avg_service_s += EWMA_ALPHA * (elapsed - self.avg_service_s)
+        self.running -= 1
+        self._drop(slot.user_id)
+        self._grant_waiters()
+
+    # ---------- public ----------
+
+    def retry_after(self) -> int:
+        """Seconds until a retry is likely to be admitted (1..60)."""
+        backlog = (self.queued + 1) / max(self.max_concurrent, 1)
+        return min(max(math.ceil(self.avg_service_s * backlog), 1), 60)
+
+    async def acquire(self, user_id: str) -> Slot:
+        if self._per_user.get(user_id, 0) >= self.max_per_user:
+            self._reject("user_limit")
+
+        if self.running < self.max_concurrent and not self.queued:
+            self.running += 1
+            self._hold(user_id)
+            self.admitted += 1
+            return Slot(self, user_id)
+
+        if self.queued >= self.max_queue:
+            self._reject("queue_full")
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(fut)
+        self.queued += 1
+        self._hold(user_id)
+        queued_at = time.monotonic()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not fut.done():
+                fut.cancel()
+                self._unqueue(user_id, fut)
+                self._reject("timeout")
+        except asyncio.CancelledError:
+            # Client went away; give back whatever we hold
+            if fut.done() and not fut.cancelled():
+                Slot(self, user_id).release()
+            else:
+                fut.cancel()
+                self._unqueue(user_id, fut)
+            raise
+
+        waited = time.monotonic() - queued_at
+        self.avg_wait_s += EWMA_ALPHA * (waited - self.avg_wait_s)
+        self.admitted += 1
+        return Slot(self, user_id)
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "maxConcurrent": self.max_concurrent,
+            "queueDepth": self.queued,
+            "maxQueue": self.max_queue,
+            "waitingUsers": len(self._waiting),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "avgServiceMs": round(self.avg_service_s * 1000, 1),
+            "avgQueueWaitMs": round(self.avg_wait_s * 1000, 1),
+        }
+
+
+admission = AdmissionController(
+    max_concurrent=settings.search_max_concurrent,
+    max_queue=settings.search_max_queue,
+    max_per_user=settings.search_max_per_user,
+    queue_timeout_ms=settings.search_queue_timeout_ms,
+)
+SEARCH_ADMISSION_QUEUE.set_function(lambda: admission.queued)
+SEARCH_ADMISSION_RUNNING.set_function(lambda: admission.running)
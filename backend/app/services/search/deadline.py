@@ -0,0 +1,115 @@
+"""
+Per-request deadline budgets for the search pipeline.
+
+A Deadline is created from search_deadline_ms (or the request's
+deadline_ms). Retrieval channels get settings.search_channel_share of it:
+SQL channels also set a transaction-local statement_timeout so Postgres
+stops the scan itself, and channels still running at the channel deadline
+are cancelled and reported as "timeout". Rerank then runs in steps until
+the overall deadline and keeps the best scores found so far.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ("semantic", "lexical", "triples")
+
+
+class Deadline:
+    """Wall-clock budget (monotonic); budget_ms falsy = unbounded."""
+
+    def __init__(self, budget_ms: Optional[float]):
+        self.expires_at = time.monotonic() + budget_ms / 1000 if budget_ms else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.expires_at is not None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None when unbounded."""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def share(self, fraction: float) -> "Deadline":
+        """A child deadline ending after `fraction` of the remaining time."""
+        child = Deadline(None)
+        remaining = self.remaining()
+        if remaining is not None:
+            child.expires_at = time.monotonic() + remaining * fraction
+        return child
+
+
+def request_deadline(deadline_ms: Optional[int] = None) -> Deadline:
+    return Deadline(deadline_ms if deadline_ms is not None else settings.search_deadline_ms)
+
+
+async def set_statement_timeout(db: AsyncSession, deadline: Deadline):
+    """Bound every statement of the current transaction by the deadline."""
+    remaining = deadline.remaining()
+    if remaining is None:
+        return
+    await db.execute(
+        text("SELECT set_config('statement_timeout', :ms, true)"),
+        {"ms": str(max(int(remaining * 1000), 1))},
+    )
+
+
+class ChannelReport:
+    """Hits, query vectors and status of each retrieval channel."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.hits: Dict[str, List[Dict]] = {name: [] for name in CHANNELS}
+        self.query_vecs = None
+        self.status: Dict[str, Dict] = {}
+        # Vector store circuit open: no semantic channel, no embedding
+        self.degraded = False
+
+    def _record(self, name: str, status: str):
+        self.status[name] = {
+            "status": status,
+            "hits": len(self.hits[name]),
+            "ms": round((time.perf_counter() - self.started) * 1000, 1),
+        }
+
+    def collect(self, name: str, task: asyncio.Task) -> Optional[str]:
+        """Store a finished channel task; returns its error message if it failed."""
+        try:
+            query_vecs, hits = task.result()
+        except Exception as e:
+            logger.exception("Search channel %s failed", name)
+            self._record(name, "error")
+            return str(e)
+
+        if query_vecs is not None:
+            self.query_vecs = query_vecs
+        self.hits[name] = hits
+        self._record(name, "ok")
+        return None
+
+    def timed_out(self, name: str):
+        self._record(name, "timeout")
+
+    def unavailable(self, name: str):
+        self._record(name, "unavailable")
+
+    @property
+    def partial(self) -> bool:
+        return any(s["status"] != "ok" for s in self.status.values())
+
+    def summary(self) -> Dict[str, Dict]:
+        return {name: self.status.get(name, {"status": "skipped", "hits": 0}) for name in CHANNELS}
@@ -0,0 +1,120 @@
+"""
+Exact phrase / identifier search over pdf_chunks.normalized_text.
+
+The phrase is matched on the normalized form (lowercase, punctuation turned
+into spaces, single-spaced) with LIKE, served by the pg_trgm GIN index on
+parent chunks (migration 005). Case and separators do not matter, so
+"AB-1234", "ab 1234" and "AB_1234" match each other, but "AB1234" is a
+different token sequence and does not. Matches must start and end on token
+boundaries: "x5" does not match "x500". No embedding is involved. Match
+offsets are mapped back onto the original chunk text.
+"""
+
+from typing import List, NamedTuple, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.search.utils import normalize_text, normalize_with_offsets
+
+# Parent chunks scanned per query
+EXACT_K = 200
+# Characters of context kept on each side of the first match
+SNIPPET_CONTEXT = 80
+
+
+class ExactMatch(NamedTuple):
+    pdf_id: str
+    page: int
+    chunk_index: int
+    snippet: str
+    # [start, end) of every occurrence, relative to the snippet
+    offsets: Tuple[Tuple[int, int], ...]
+    occurrences: int
+
+
+def find_offsets(chunk_text: str, phrase: str) -> List[Tuple[int, int]]:
+    """Whole-token occurrences of a normalized phrase as spans of the original text."""
+    normalized, positions = normalize_with_offsets(chunk_text)
+    spans = []
+    start = normalized.find(phrase)
+    while start != -1:
+        end = start + len(phrase)
+        if (start == 0 or normalized[start - 1] == " ") and (
+            end == len(normalized) or normalized[end] == " "
+        ):
+            spans.append((positions[start], positions[end - 1] + 1))
+        start = normalized.find(phrase, start + 1)
+    return spans
+
+
+def snippet_around(chunk_text: str, spans: List[Tuple[int, int]]):
+    """Window around the first match, cut at whitespace; spans made relative."""
+    first_start, first_end = spans[0]
+    lo = max(first_start - SNIPPET_CONTEXT, 0)
+    hi = min(first_end + SNIPPET_CONTEXT, len(chunk_text))
+
+    if lo > 0:
+        space = chunk_text.find(" ", lo, first_start)
+        lo = space + 1 if space != -1 else lo
+    if hi < len(chunk_text):
+        space = chunk_text.rfind(" ", first_end, hi)
+        hi = space if space != -1 else hi
+
+    inside = tuple((s - lo, e - lo) for s, e in spans if s >= lo and e <= hi)
+    return chunk_text[lo:hi], inside
+
+
+async def exact_search(
+    db: AsyncSession,
+    phrase: str,
+    pdf_ids: Sequence[UUID],
+) -> List[ExactMatch]:
+    """Chunks containing the phrase, most occurrences first, then reading order."""
+    normalized = normalize_text(phrase)
+    if not normalized:
+        return []
+
+    # Punctuation (incl. % and _) becomes spaces, so the patterns need no
+    # escaping. The unpadded LIKE uses the trigram index; the space-padded
+    # one keeps whole-token matches. Substring counts order the LIMIT so the
+    # chunks kept are the ones ranked first below.
+    sql = text("""
+        SELECT pdf_metadata_id, page_num, chunk_index, chunk_text
+        FROM pdf_chunks
+        WHERE pdf_metadata_id = ANY(:ids)
+          AND chunk_type = 'PARENT'
+          AND normalized_text LIKE :pattern
+          AND ' ' || normalized_text || ' ' LIKE :bounded
+        ORDER BY
+          (length(normalized_text) - length(replace(normalized_text, :phrase, ''))) DESC,
+          pdf_metadata_id, page_num, chunk_index
+        LIMIT :k
+    """)
+
+    rows = (await db.execute(sql, {
+        "ids": list(pdf_ids),
+        "pattern": f"%{normalized}%",
+        "bounded": f"% {normalized} %",
+        "phrase": normalized,
+        "k": EXACT_K,
+    })).fetchall()
+
+    matches = []
+    for r in rows:
+        spans = find_offsets(r.chunk_text, normalized)
+        if not spans:
+            continue
+        snippet, offsets = snippet_around(r.chunk_text, spans)
+        matches.append(ExactMatch(
+            pdf_id=str(r.pdf_metadata_id),
+            page=r.page_num,
+            chunk_index=r.chunk_index,
+            snippet=snippet,
+            offsets=offsets,
+            occurrences=len(spans),
+        ))
+
+    matches.sort(key=lambda m: (-m.occurrences, m.pdf_id, m.page, m.chunk_index))
+    return matches
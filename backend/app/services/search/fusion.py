@@ -1,20 +1,92 @@
-from typing import Dict, Sequence
+from typing import Dict, List, Optional, Sequence, Tuple
 from uuid import UUID
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.services.qdrant.qdrant_search import semantic_search
+from app.config import settings
+from app.services.qdrant.breaker import vector_breaker
+from app.services.qdrant.qdrant_search import (
+    semantic_search_grouped,
+    semantic_search_batch,
+    hybrid_search_batch,
+    hybrid_search_grouped,
+    hybrid_available,
+    route_documents,
+    route_pages,
+    route_documents_batch,
+    route_pages_batch,
+)
+from app.services.lexical.base import LexicalBackend
+from app.services.lexical.bm25_index import BM25LexicalBackend
+from app.services.lexical.postgres import PostgresLexicalBackend
 from app.services.search.utils import split_query_sentences, extract_terms
 
-SEMANTIC_K = 30
-LEXICAL_K = 50
-TRIPLE_K = 30
+def route_scope(query_vector, pdf_ids):
+    """
+    Coarse-to-fine narrowing: top documents, then top pages inside them.
 
+    Falls back to the full scope when routing is off, the scope is already
+    small, or the summary collections return nothing.
+    """
+    page_keys = None
+    top_docs = settings.semantic_route_docs
+    if not top_docs or len(pdf_ids) <= top_docs:
+        return pdf_ids, page_keys
 
-def semantic_channel(query_vector, pdf_ids, query):
-    hits = semantic_search(query_vector, top_k=SEMANTIC_K, pdf_ids=pdf_ids)
+    routed = route_documents(query_vector, pdf_ids, top_docs)
+    if not routed:
+        return pdf_ids, page_keys
 
+    if settings.semantic_route_pages:
+        page_keys = route_pages(query_vector, routed, settings.semantic_route_pages) or None
+
+    return routed, page_keys
+
+
+def route_scope_batch(query_vectors, pdf_ids):
+    """route_scope for many vectors with one Qdrant round trip per level."""
+    scopes = [pdf_ids] * len(query_vectors)
+    page_keys = [None] * len(query_vectors)
+    top_docs = settings.semantic_route_docs
+    if not top_docs or len(pdf_ids) <= top_docs:
+        return scopes, page_keys
+
+    routed = route_documents_batch(query_vectors, pdf_ids, top_docs)
+    scopes = [r or pdf_ids for r in routed]
+
+    if settings.semantic_route_pages:
+        pages = route_pages_batch(query_vectors, scopes, settings.semantic_route_pages)
+        page_keys = [p or None for p in pages]
+
+    return scopes, page_keys
+
+
+LEXICAL_BACKENDS: Dict[str, LexicalBackend] = {
+    "postgres": PostgresLexicalBackend(),
+    "bm25": BM25LexicalBackend(),
+}
+
+
+def get_lexical_backend() -> LexicalBackend:
+    # "qdrant" without sparse vectors lands here too
+    return LEXICAL_BACKENDS.get(settings.lexical_backend, LEXICAL_BACKENDS["postgres"])
+
+
+def qdrant_lexical_enabled() -> bool:
+    """
+    Lexical hits come from Qdrant sparse vectors, fetched with the semantic
+    channel's request, instead of Postgres. Decided once per search.
+    """
+    # Degraded mode: keep lexical retrieval off the vector store
+    return (
+        settings.lexical_backend == "qdrant"
+        and vector_breaker.available()
+        and hybrid_available()
+    )
+
+
+def _semantic_hits(hits) -> List[Dict]:
     out = []
     for i, h in enumerate(hits):
         out.append({
@@ -32,46 +104,111 @@ def semantic_channel(query_vector, pdf_ids, query):
     return out
 
 
+def semantic_channel(query_vector, pdf_ids, query, lexical_out: Optional[List[Dict]] = None):
+    """
+    Semantic hits for one query vector.
+
+    With `lexical_out` (hybrid mode) the same Qdrant round trip runs the
+    sparse BM25 query over the full scope and its lexical hits are stored
+    there; a failure then raises, so the lexical channel can fall back to
+    Postgres.
+    """
+    scope, page_keys = route_scope(query_vector, pdf_ids)
+
+    # search_semantic_k distinct parents per round trip (grouped on parent_chunk_id)
+    if lexical_out is not None:
+        hits, lexical_out[:] = hybrid_search_grouped(
+            query_vector,
+            query,
+            lexical_pdf_ids=pdf_ids,
+            lexical_k=settings.search_lexical_k,
+            top_k=settings.search_semantic_k,
+            pdf_ids=scope,
+            group_size=settings.semantic_group_size,
+            page_keys=page_keys,
+        )
+    else:
+        hits = semantic_search_grouped(
+            query_vector,
+            top_k=settings.search_semantic_k,
+            pdf_ids=scope,
+            group_size=settings.semantic_group_size,
+            page_keys=page_keys,
+        )
+
+    return _semantic_hits(hits)
+
+
+def semantic_channel_batch(
+    query_vectors, pdf_ids, lexical_texts: Optional[Sequence[Optional[str]]] = None
+) -> Tuple[List[List[Dict]], Optional[List[List[Dict]]]]:
+    """
+    semantic_channel for many vectors. With `lexical_texts` (hybrid mode:
+    the query text per vector, None to skip) also returns the sparse
+    lexical hits per vector from the same round trip, raising on failure.
+    """
+    scopes, page_keys = route_scope_batch(query_vectors, pdf_ids)
+    if lexical_texts is None:
+        results = semantic_search_batch(
+            query_vectors,
+            scopes,
+            top_k=settings.search_semantic_k,
+            group_size=settings.semantic_group_size,
+            page_keys=page_keys,
+        )
+        return [_semantic_hits(hits) for hits in results], None
+
+    results, lexical = hybrid_search_batch(
+        query_vectors,
+        scopes,
+        lexical_texts,
+        lexical_pdf_ids=pdf_ids,
+        lexical_k=settings.search_lexical_k,
+        top_k=settings.search_semantic_k,
+        group_size=settings.semantic_group_size,
+        page_keys=page_keys,
+    )
+    return [_semantic_hits(hits) for hits in results], lexical
+
+
 async def lexical_channel(db: AsyncSession, query: str, pdf_ids: Sequence[UUID]):
-    sql = text("""
-        SELECT id, parent_chunk_id, pdf_metadata_id, page_num,
-               chunk_index, chunk_text,
-               ts_rank_cd(lexical_tsv, websearch_to_tsquery('english', :q)) AS score
-        FROM pdf_chunks
-        WHERE pdf_metadata_id = ANY(:ids)
-          AND lexical_tsv @@ websearch_to_tsquery('english', :q)
-        ORDER BY score DESC
-        LIMIT :k
-    """)
+    # Also the hybrid mode fallback: "qdrant" resolves to Postgres here
+    return await get_lexical_backend().search(db, query, pdf_ids, settings.search_lexical_k)
 
-    rows = (await db.execute(
-        sql, {"q": query, "ids": list(pdf_ids), "k": LEXICAL_K}
-    )).fetchall()
 
-    return [{
-        "chunk_id": str(r.id),
+async def lexical_channel_batch(db: AsyncSession, queries: Sequence[str], pdf_ids: Sequence[UUID]):
+    return await get_lexical_backend().search_many(db, queries, pdf_ids, settings.search_lexical_k)
+
+
+def _triple_tsquery(query: str) -> Optional[str]:
+    sentences = split_query_sentences(query)
+    if not sentences:
+        return None
+
+    terms = extract_terms(sentences)
+    if not terms:
+        return None
+
+    return " | ".join(terms)
+
+
+def _triple_hit(r) -> Dict:
+    return {
+        "chunk_id": str(r.chunk_id),
         "parent_chunk_id": str(r.parent_chunk_id) if r.parent_chunk_id else None,
         "pdf_id": str(r.pdf_metadata_id),
         "page": r.page_num,
         "chunk_index": r.chunk_index,
         "text": r.chunk_text,
-        "lexical_rank": i + 1,
-        "lexical_score": float(r.score or 0),
-        "has_lexical": True,
-    } for i, r in enumerate(rows)]
+        "has_oie": True,
+    }
 
 
 async def triple_channel(db: AsyncSession, query: str, pdf_ids: Sequence[UUID]):
-    sentences = split_query_sentences(query)
-    if not sentences:
+    tsq = _triple_tsquery(query)
+    if not tsq:
         return []
 
-    terms = extract_terms(sentences)
-    if not terms:
-        return []
-
-    tsq = " | ".join(terms)
-
     sql = text("""
         SELECT t.chunk_id, c.parent_chunk_id, t.pdf_metadata_id,
                t.page_num, t.chunk_index,
@@ -84,18 +221,44 @@ async def triple_channel(db: AsyncSession, query: str, pdf_ids: Sequence[UUID]):
     """)
 
     rows = (await db.execute(
-        sql, {"tsq": tsq, "ids": list(pdf_ids), "k": TRIPLE_K}
+        sql, {"tsq": tsq, "ids": list(pdf_ids), "k": settings.search_triple_k}
     )).fetchall()
 
-    return [{
-        "chunk_id": str(r.chunk_id),
-        "parent_chunk_id": str(r.parent_chunk_id) if r.parent_chunk_id else None,
-        "pdf_id": str(r.pdf_metadata_id),
-        "page": r.page_num,
-        "chunk_index": r.chunk_index,
-        "text": r.chunk_text,
-        "has_oie": True,
-    } for r in rows]
+    return [_triple_hit(r) for r in rows]
+
+
+async def triple_channel_batch(db: AsyncSession, queries: Sequence[str], pdf_ids: Sequence[UUID]):
+    out: List[List[Dict]] = [[] for _ in queries]
+    tsqs = [_triple_tsquery(q) for q in queries]
+    wanted = [i for i, tsq in enumerate(tsqs) if tsq]
+    if not wanted:
+        return out
+
+    sql = text("""
+        SELECT q.idx, m.*
+        FROM unnest(CAST(:tsqs AS text[]), CAST(:idx AS int[])) AS q(tsq, idx)
+        CROSS JOIN LATERAL (
+            SELECT t.chunk_id, c.parent_chunk_id, t.pdf_metadata_id,
+                   t.page_num, t.chunk_index,
+                   c.chunk_text
+            FROM pdf_triples t
+            JOIN pdf_chunks c ON c.id = t.chunk_id
+            WHERE t.pdf_metadata_id = ANY(:ids)
+              AND t.triple_tsv @@ to_tsquery('english', q.tsq)
+            LIMIT :k
+        ) m
+    """)
+
+    rows = (await db.execute(sql, {
+        "tsqs": [tsqs[i] for i in wanted],
+        "idx": wanted,
+        "ids": list(pdf_ids),
+        "k": settings.search_triple_k,
+    })).fetchall()
+
+    for r in rows:
+        out[r.idx].append(_triple_hit(r))
+    return out
 
 
 def fuse_results(semantic, lexical, triples):
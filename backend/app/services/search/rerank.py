@@ -0,0 +1,277 @@
+"""
+Batch sentence reranker for fused candidates.
+
+Every candidate's sentences are embedded in one call and scored against all
+query vectors at once: cosine similarities, lexical overlap buckets, the
+multi-sentence guardrail and the confidence formula are array operations,
+and the page is picked with argpartition instead of a full sort.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.services.search.utils import tokens
+
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
+MIN_SENTENCE_CHARS = 20
+
+# Progressive rerank: hits re-encoded per step
+RERANK_CHUNK_HITS = 32
+
+# Token-overlap fraction -> lexical score
+_LEXICAL_BUCKETS = ((0.9, 1.0), (0.75, 0.7), (0.5, 0.5))
+
+
+def split_candidate_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENT_SPLIT.split(text) if len(s.strip()) > MIN_SENTENCE_CHARS]
+
+
+def order_by_page(hits: List[Dict]) -> List[Dict]:
+    """Group hits by page (first-seen order) so score ties keep page order."""
+    pages: Dict[int, list] = {}
+    for h in hits:
+        pages.setdefault(h["page"], []).append(h)
+    return [h for group in pages.values() for h in group]
+
+
+@dataclass
+class CandidateSentences:
+    sentences: List[str]
+    # hit i owns sentences[offsets[i]:offsets[i + 1]]
+    offsets: np.ndarray
+
+
+def gather_sentences(hits: Sequence[Dict]) -> CandidateSentences:
+    sentences: List[str] = []
+    offsets = [0]
+    for h in hits:
+        text = h.get("text") or h.get("parent_text") or ""
+        sentences.extend(split_candidate_sentences(text))
+        offsets.append(len(sentences))
+    return CandidateSentences(sentences, np.asarray(offsets, dtype=np.int64))
+
+
+def priority_order(hits: Sequence[Dict]) -> np.ndarray:
+    """Hit indices by best channel rank (semantic or lexical), triples last."""
+    best = [
+        min(h.get("semantic_rank", np.inf), h.get("lexical_rank", np.inf))
+        for h in hits
+    ]
+    return np.argsort(np.asarray(best, dtype=np.float64), kind="stable")
+
+
+def subset_candidates(cand: CandidateSentences, idx: np.ndarray):
+    """
+    Restrict candidates to hits `idx` (ascending).
+
+    Returns the sub-CandidateSentences and, for each of its sentences, the
+    row in the full sentence list (to pick the matching vectors).
+    """
+    rows = [np.arange(cand.offsets[i], cand.offsets[i + 1]) for i in idx]
+    counts = [len(r) for r in rows]
+    sentence_rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return (
+        CandidateSentences([cand.sentences[r] for r in sentence_rows], offsets),
+        sentence_rows,
+    )
+
+
+@dataclass
+class RerankScores:
+    keep: np.ndarray           # bool[H]
+    semantic: np.ndarray       # float[H]
+    lexical: np.ndarray        # float[H]
+    confidence: np.ndarray     # int[H], 0-100
+    best_sentence: np.ndarray  # int[H], index into sentences or -1
+    fallback: bool             # long-query fallback (semantic only) was used
+
+
+def _normalize_rows(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    return m / np.where(norms == 0, 1.0, norms)
+
+
+def _lexical_overlap(sentences: List[str], query_sents: Sequence[str]) -> np.ndarray:
+    """Fraction of each query sentence's tokens found in each sentence: [S, Qs]."""
+    query_sets = [set(tokens(q)) for q in query_sents]
+    vocab = {t: i for i, t in enumerate(set().union(*query_sets))}
+    if not vocab:
+        return np.zeros((len(sentences), len(query_sents)), dtype=np.float32)
+
+    presence = np.zeros((len(sentences), len(vocab)), dtype=np.float32)
+    for row, sent in enumerate(sentences):
+        cols = [vocab[t] for t in set(tokens(sent)) if t in vocab]
+        presence[row, cols] = 1.0
+
+    query_presence = np.zeros((len(query_sets), len(vocab)), dtype=np.float32)
+    for row, qs in enumerate(query_sets):
+        query_presence[row, [vocab[t] for t in qs]] = 1.0
+
+    sizes = query_presence.sum(axis=1)
+    overlap = presence @ query_presence.T
+    return np.divide(overlap, sizes, out=np.zeros_like(overlap), where=sizes > 0)
+
+
+def _lexical_bucket(overlap: np.ndarray) -> np.ndarray:
+    return np.select(
+        [overlap >= lo for lo, _ in _LEXICAL_BUCKETS],
+        [score for _, score in _LEXICAL_BUCKETS],
+        default=0.0,
+    )
+
+
+def score_candidates(
+    hits: Sequence[Dict],
+    cand: CandidateSentences,
+    sentence_vecs,
+    query_vecs,
+    query_sents: Sequence[str],
+) -> RerankScores:
+    n_hits = len(hits)
+    counts = np.diff(cand.offsets)
+    width = max(int(counts.max()) if n_hits else 0, 1)
+
+    q = _normalize_rows(np.asarray(query_vecs, dtype=np.float32).reshape(len(query_vecs), -1))
+    if cand.sentences:
+        s = _normalize_rows(np.asarray(sentence_vecs, dtype=np.float32))
+        sims = q @ s.T                                              # [Q, S]
+    else:
+        sims = np.zeros((len(q), 0), dtype=np.float32)
+
+    # Pad each hit's sentences into a [H, W] index grid (-1 = no sentence)
+    col = np.arange(width)
+    valid = col[None, :] < counts[:, None]
+    grid = np.where(valid, cand.offsets[:-1, None] + col[None, :], -1)
+
+    padded = np.full((len(q), n_hits, width), -np.inf, dtype=np.float32)
+    if cand.sentences:
+        padded[:, valid] = sims[:, grid[valid]]
+
+    arg = padded.argmax(axis=2)                                     # [Q, H]
+    has_sent = counts > 0
+    full_grid = np.broadcast_to(grid, padded.shape)
+    per_query_idx = np.where(has_sent[None, :], np.take_along_axis(full_grid, arg[..., None], 2)[..., 0], -1)
+    per_query_sim = np.where(has_sent[None, :], np.take_along_axis(padded, arg[..., None], 2)[..., 0], 0.0)
+
+    # Best semantic evidence over query vectors (first maximum wins, floor 0)
+    best_q = per_query_sim.argmax(axis=0)
+    best_sem = np.maximum(per_query_sim.max(axis=0), 0.0)
+    best_idx = np.where(best_sem > 0, per_query_idx[best_q, np.arange(n_hits)], -1)
+
+    # Lexical evidence: query sentence i vs the sentence chosen for vector i
+    n_lex = min(len(q), len(query_sents))
+    best_lex = np.zeros(n_hits, dtype=np.float32)
+    if n_lex and cand.sentences:
+        overlap = _lexical_bucket(_lexical_overlap(cand.sentences, query_sents[:n_lex]))
+        idx = per_query_idx[:n_lex]
+        lex = np.where(idx >= 0, overlap[np.maximum(idx, 0), np.arange(n_lex)[:, None]], 0.0)
+        best_lex = lex.max(axis=0)
+
+    oie = np.array([1.0 if h.get("has_oie") else 0.0 for h in hits], dtype=np.float64)
+
+    keep = np.ones(n_hits, dtype=bool)
+    if len(query_sents) >= 2:
+        # Guardrail: drop hits weak on both signals (OIE can rescue)
+        keep = ~(
+            (best_sem < settings.rerank_guard_min_semantic)
+            & (best_lex < settings.rerank_guard_min_lexical)
+            & (oie == 0)
+        )
+
+    # Confidence = weighted semantic + lexical + OIE evidence, in float64
+    # so truncation to 0-100 lands where the per-hit Python loop did
+    confidence = np.minimum(
+        1.0,
+        settings.rerank_semantic_weight * best_sem.astype(np.float64)
+        + settings.rerank_lexical_weight * best_lex.astype(np.float64)
+        + settings.rerank_oie_weight * oie,
+    )
+
+    if len(query_sents) >= 2 and n_hits and not keep.any():
+        # Semantic fallback for long queries: first vector only, no lexical
+        sem = per_query_sim[0]
+        return RerankScores(
+            keep=np.ones(n_hits, dtype=bool),
+            semantic=sem,
+            lexical=np.zeros(n_hits, dtype=np.float32),
+            confidence=np.trunc(np.minimum(1.0, sem.astype(np.float64)) * 100).astype(np.int64),
+            best_sentence=per_query_idx[0],
+            fallback=True,
+        )
+
+    return RerankScores(
+        keep=keep,
+        semantic=best_sem,
+        lexical=best_lex,
+        confidence=np.trunc(confidence * 100).astype(np.int64),
+        best_sentence=best_idx,
+        fallback=False,
+    )
+
+
+def lexical_scores(
+    hits: Sequence[Dict],
+    cand: CandidateSentences,
+    query_sents: Sequence[str],
+) -> RerankScores:
+    """
+    Degraded-mode scores (vector store down, no embeddings): each hit's
+    best lexical overlap bucket over its sentences, plus OIE evidence.
+    No guardrail, since there is no semantic signal to pair it with.
+    """
+    n_hits = len(hits)
+    best_lex = np.zeros(n_hits, dtype=np.float32)
+    best_idx = np.full(n_hits, -1, dtype=np.int64)
+
+    if cand.sentences and query_sents:
+        overlap = _lexical_bucket(_lexical_overlap(cand.sentences, query_sents)).max(axis=1)
+        for i in range(n_hits):
+            lo, hi = cand.offsets[i], cand.offsets[i + 1]
+            if hi > lo:
+                best_idx[i] = lo + int(overlap[lo:hi].argmax())
+                best_lex[i] = overlap[best_idx[i]]
+
+    oie = np.array([1.0 if h.get("has_oie") else 0.0 for h in hits], dtype=np.float64)
+    confidence = np.minimum(
+        1.0,
+        settings.rerank_lexical_weight * best_lex.astype(np.float64) + settings.rerank_oie_weight * oie,
+    )
+
+    return RerankScores(
+        keep=np.ones(n_hits, dtype=bool),
+        semantic=np.zeros(n_hits, dtype=np.float32),
+        lexical=best_lex,
+        confidence=np.trunc(confidence * 100).astype(np.int64),
+        best_sentence=best_idx,
+        fallback=False,
+    )
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, descending.
+
+    Ties are broken by index, which matches a stable full sort, but only
+    the selected k are sorted (argpartition does the rest).
+    """
+    n = len(scores)
+    if n <= k:
+        return np.argsort(-scores, kind="stable")
+
+    part = np.argpartition(-scores, k - 1)[:k]
+    threshold = scores[part].min()
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[: k - len(above)]
+    chosen = np.sort(np.concatenate([above, ties]))
+    return chosen[np.argsort(-scores[chosen], kind="stable")]
+
+
+def rank(scores: RerankScores, limit: int):
+    """Top-`limit` hit indices by confidence, plus the exact number of survivors."""
+    kept = np.flatnonzero(scores.keep)
+    return kept[top_k(scores.confidence[kept], limit)], len(kept)
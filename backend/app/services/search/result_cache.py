@@ -0,0 +1,95 @@
+"""
+Server-side ranked result sets for cursor pagination.
+
+A search ranks every surviving candidate once and stores lightweight
+RankedHit tuples here under a search id. Follow-up pages only slice the
+stored list and materialize snippets, they never re-embed or re-query.
+
+The cache is per process (TTL + LRU bound), so cursors are only valid on
+the API process that created them.
+"""
+
+import base64
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.services.metrics import CACHE_REQUESTS
+
+
+class RankedHit(NamedTuple):
+    document_id: str
+    page: int
+    snippet: str
+    confidence: int
+    semantic: float
+    lexical: float
+    has_oie: bool
+    # Exact mode: [start, end) spans of the match inside the snippet
+    offsets: Tuple[Tuple[int, int], ...] = ()
+
+
+@dataclass
+class RankedSearch:
+    user_id: str
+    query_tokens: set
+    fallback: bool
+    hits: List[RankedHit]
+    document_names: Dict[str, str]
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class ResultCache:
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, RankedSearch]" = OrderedDict()
+
+    def _expired(self, search: RankedSearch) -> bool:
+        return time.monotonic() - search.created_at > self.ttl_seconds
+
+    def put(self, search: RankedSearch) -> str:
+        search_id = uuid.uuid4().hex
+        self._entries[search_id] = search
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return search_id
+
+    def get(self, search_id: str) -> Optional[RankedSearch]:
+        search = self._entries.get(search_id)
+        if search is None:
+            CACHE_REQUESTS.labels(cache="search_results", result="miss").inc()
+            return None
+        if self._expired(search):
+            del self._entries[search_id]
+            CACHE_REQUESTS.labels(cache="search_results", result="expired").inc()
+            return None
+        self._entries.move_to_end(search_id)
+        CACHE_REQUESTS.labels(cache="search_results", result="hit").inc()
+        return search
+
+
+result_cache = ResultCache(
+    ttl_seconds=settings.search_cache_ttl_seconds,
+    max_entries=settings.search_cache_max_entries,
+)
+
+
+def encode_cursor(search_id: str, offset: int) -> str:
+    raw = f"{search_id}:{offset}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+    """(search id, offset), or None for a malformed cursor or negative offset."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        search_id, offset = base64.urlsafe_b64decode(padded).decode().split(":")
+        offset = int(offset)
+    except Exception:
+        return None
+    # A negative offset would slice from the end of the hit list
+    return (search_id, offset) if offset >= 0 else None
@@ -1,8 +1,75 @@
 import re
+import string
 
 _QUERY_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
 _TOKEN_RE = re.compile(r"[a-zA-Z0-9]+")
 
+_STOPWORDS = {
+    "the","is","are","was","were","of","on","in","for","to",
+    "with","using","use","based","by","and","or","from"
+}
+
+def tokens(text):
+    return [
+        t for t in _TOKEN_RE.findall(text.lower())
+        if t not in _STOPWORDS and len(t) > 2
+    ]
+
+# Punctuation separates tokens: "AB-1234" -> "ab 1234", "1.2.3" -> "1 2 3"
+_NORMALIZE_PUNCT = str.maketrans(string.punctuation, " " * len(string.punctuation))
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Part numbers, error codes, versions: one token with a digit in it
+_IDENTIFIER_RE = re.compile(r"^(?=\S*\d)[A-Za-z0-9][A-Za-z0-9\-_./:#]*$")
+_QUOTED_RE = re.compile(r'^"(.+)"$')
+
+def normalize_text(text: str) -> str:
+    """
+    Form stored in pdf_chunks.normalized_text (trigram-indexed): lowercase,
+    ASCII punctuation turned into spaces, single-spaced. Migration 007
+    applies the same transform in SQL.
+    """
+    text = text.lower()
+    text = text.translate(_NORMALIZE_PUNCT)
+    text = _WHITESPACE_RE.sub(" ", text)
+    return text.strip()
+
+def normalize_with_offsets(text: str):
+    """
+    normalize_text() plus, for every output character, its index in `text`.
+
+    Lets a match found in normalized form be mapped back to the original.
+    """
+    chars, positions = [], []
+    pending_space = None
+    for i, ch in enumerate(text):
+        if ch.isspace() or ch in string.punctuation:
+            if chars and pending_space is None:
+                pending_space = i
+            continue
+        if pending_space is not None:
+            chars.append(" ")
+            positions.append(pending_space)
+            pending_space = None
+        for low in ch.lower():
+            chars.append(low)
+            positions.append(i)
+    return "".join(chars), positions
+
+def exact_phrase(query: str):
+    """
+    The phrase to match verbatim, or None for natural-language queries.
+
+    Quoted queries and identifier-like single tokens qualify.
+    """
+    query = query.strip()
+    quoted = _QUOTED_RE.match(query)
+    if quoted:
+        return quoted.group(1).strip() or None
+    if _IDENTIFIER_RE.match(query):
+        return query
+    return None
+
 def split_query_sentences(query: str):
     return [
         s.strip()
@@ -0,0 +1,406 @@
+"""
+Lightweight request tracing.
+
+A trace starts at an HTTP request (TracingMiddleware) or a Celery task
+(app/worker/signals.py) and is propagated between processes with a W3C
+`traceparent` header: on Celery messages, and accepted from / returned
+to HTTP clients (X-Trace-Id). Inside a trace, MinIO, Postgres, vector
+store and model calls are recorded as child spans; outside a trace those
+wrappers do nothing.
+
+Finished spans are appended to tracing_file, one JSON object per line:
+"jsonl" writes flat span records, "otlp_json" writes OTLP/JSON
+ExportTraceServiceRequest lines that an OpenTelemetry collector can
+ingest with its otlpjsonfile receiver. No network is involved. Ending a
+span only queues its line; a background thread per process writes the
+queued lines in batches.
+"""
+
+import contextvars
+import functools
+import json
+import atexit
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = "traceparent"
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# Attribute values are clipped so SQL text and arguments stay readable
+MAX_ATTRIBUTE_CHARS = 300
+
+
+class Span:
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.sampled:
+            _export(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+class _RemoteParent:
+    """Span context received from another process."""
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+
+
+def enabled() -> bool:
+    return settings.tracing_exporter != "off"
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace_id if span else None
+
+
+# ---------- propagation ----------
+
+def inject() -> Dict[str, str]:
+    """Headers carrying the current span context (empty outside a trace)."""
+    span = _current.get()
+    return {TRACEPARENT: span.traceparent} if span else {}
+
+
+def extract(traceparent: Optional[str]) -> Optional[_RemoteParent]:
+    match = _TRACEPARENT_RE.match((traceparent or "").strip().lower())
+    if not match:
+        return None
+    trace_id, span_id, flags = match.groups()
+    return _RemoteParent(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+# ---------- spans ----------
+
+def start_root(name: str, parent: Optional[_RemoteParent] = None, **attributes) -> Optional[Span]:
+    """A new trace, or the continuation of a remote one; None when tracing is off."""
+    if not enabled():
+        return None
+    if parent is not None:
+        return Span(name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+    sampled = random.random() < settings.tracing_sample_rate
+    return Span(name, secrets.token_hex(16), None, sampled, attributes)
+
+
+def start_child(name: str, **attributes) -> Optional[Span]:
+    """A child of the current span (not made current); None outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        return None
+    return Span(name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+
+
+@contextmanager
+def activate(span: Optional[Span]) -> Iterator[Optional[Span]]:
+    """Make `span` current for the block and end it afterwards."""
+    if span is None:
+        yield None
+        return
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.end(error=e)
+        raise
+    finally:
+        span.end()
+        try:
+            _current.reset(token)
+        except ValueError:
+            # Streaming body finalized from another context
+            pass
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Child span around a block; a no-op outside a trace."""
+    with activate(start_child(name, **attributes)) as s:
+        yield s
+
+
+def in_context(fn: Callable, *args, **kwargs) -> Callable[[], Any]:
+    """
+    Bind fn to the current context for run_in_executor, which (unlike
+    asyncio.to_thread) does not carry contextvars into the worker thread.
+    """
+    return functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class Traced:
+    """Proxy recording a child span (`<prefix>.<method>`) per method call."""
+
+    def __init__(self, target: Any, prefix: str):
+        self._target = target
+        self._prefix = prefix
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            with span(f"{self._prefix}.{name}"):
+                return attr(*args, **kwargs)
+
+        return call
+
+
+# ---------- HTTP ----------
+
+# Requests under these paths start a trace; others only continue one
+TRACED_PATHS = ("/api/search", "/api/documents")
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware (streaming bodies stay inside the span): one root
+    span per traced request, continuing an incoming traceparent, with the
+    trace id returned in X-Trace-Id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = extract(headers.get(TRACEPARENT.encode(), b"").decode("latin-1"))
+        path = scope.get("path", "")
+        if parent is None and not path.startswith(TRACED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        root = start_root(f"{scope['method']} {path}", parent, method=scope["method"], path=path)
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                root.set("status", message["status"])
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-trace-id", root.trace_id.encode())
+                ]
+            await send(message)
+
+        with activate(root):
+            await self.app(scope, receive, send_with_trace_id)
+
+
+# ---------- SQLAlchemy ----------
+
+def instrument_engine(engine):
+    """Child span per statement on a (sync) SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._trace_span = start_child(
+                "postgres.query", statement=" ".join(statement.split())[:MAX_ATTRIBUTE_CHARS]
+            )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        s = getattr(context, "_trace_span", None)
+        if s is not None:
+            s.set("rows", cursor.rowcount)
+            s.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        s = getattr(exception_context.execution_context, "_trace_span", None)
+        if s is not None:
+            s.end(error=exception_context.original_exception)
+
+
+# ---------- export ----------
+
+# Lines queued per process; spans ended while it is full are dropped
+EXPORT_QUEUE_SIZE = 10000
+# Most lines per write
+EXPORT_BATCH = 512
+# Longest flush() waits for the writer at exit
+EXPORT_FLUSH_TIMEOUT_S = 2.0
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)[:MAX_ATTRIBUTE_CHARS]}
+
+
+def _jsonl_record(s: Span) -> Dict[str, Any]:
+    return {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "parentSpanId": s.parent_id,
+        "name": s.name,
+        "service": settings.tracing_service_name,
+        "pid": os.getpid(),
+        "start": s.start_ns / 1e9,
+        "durationMs": round((s.end_ns - s.start_ns) / 1e6, 3),
+        "attributes": {k: v if isinstance(v, (bool, int, float)) else str(v)[:MAX_ATTRIBUTE_CHARS]
+                       for k, v in s.attributes.items()},
+        "error": s.error,
+    }
+
+
+def _otlp_record(s: Span) -> Dict[str, Any]:
+    otlp_span = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": 1,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+        "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+    }
+    if s.parent_id:
+        otlp_span["parentSpanId"] = s.parent_id
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": settings.tracing_service_name}},
+                {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+            ]},
+            "scopeSpans": [{"scope": {"name": "app.services.tracing"}, "spans": [otlp_span]}],
+        }]
+    }
+
+
+class _SpanWriter:
+    """
+    Appends queued span lines to tracing_file from a daemon thread, one
+    write per batch, so ending a span never waits on the file system.
+    The thread starts on first use and again after fork (Celery prefork
+    children do not inherit it).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._pid: Optional[int] = None
+        self.dropped = 0
+
+    def _ensure(self) -> queue.Queue:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+                    threading.Thread(
+                        target=self._run, args=(self._queue,), name="span-export", daemon=True
+                    ).start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def put(self, line: str):
+        try:
+            self._ensure().put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = EXPORT_FLUSH_TIMEOUT_S):
+        """Wait until the lines queued so far are written (or `timeout`)."""
+        q = self._queue
+        if q is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while q.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _run(self, q: queue.Queue):
+        while True:
+            lines = [q.get()]
+            while len(lines) < EXPORT_BATCH:
+                try:
+                    lines.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write("".join(lines))
+            finally:
+                for _ in lines:
+                    q.task_done()
+
+    @staticmethod
+    def _write(data: str):
+        try:
+            os.makedirs(os.path.dirname(settings.tracing_file) or ".", exist_ok=True)
+            # One O_APPEND write per batch: API and workers share the file
+            fd = os.open(settings.tracing_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data.encode("utf-8"))
+            finally:
+                os.close(fd)
+        except OSError:
+            logger.exception("Trace export failed")
+
+
+_writer = _SpanWriter()
+atexit.register(_writer.flush)
+
+
+def flush():
+    """Write out the spans ended so far in this process."""
+    _writer.flush()
+
+
+def _export(s: Span):
+    record = _otlp_record(s) if settings.tracing_exporter == "otlp_json" else _jsonl_record(s)
+    _writer.put(json.dumps(record, default=str) + "\n")
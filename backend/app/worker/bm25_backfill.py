@@ -0,0 +1,104 @@
+"""
+Backfill or rebuild the BM25 segment index from pdf_chunks.
+
+process_pdf only indexes documents ingested while lexical_backend=bm25, so
+a corpus that predates the switch has to be indexed once:
+
+    cd backend
+    python -m app.worker.bm25_backfill            # pdfs missing from the index
+    python -m app.worker.bm25_backfill --rebuild  # every pdf, from scratch
+
+A rebuild tombstones each pdf before re-indexing it, which hides its old
+segments, so it is safe while the API is serving searches. Run it where
+bm25_index_dir is the directory the API reads.
+"""
+
+import argparse
+import logging
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.services.lexical.bm25_index import (
+    BM25Index,
+    IndexedChunk,
+    compact,
+    index_pdf,
+    tombstone_pdfs,
+)
+from app.worker.db import engine
+
+logger = logging.getLogger(__name__)
+
+
+def indexable_pdfs() -> List[str]:
+    """Owner documents (deduplicated copies share them) that have child chunks."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT m.id FROM pdf_metadata m
+            WHERE m.source_id IS NULL
+              AND m.status <> 'FAILED'
+              AND EXISTS (
+                  SELECT 1 FROM pdf_chunks c
+                  WHERE c.pdf_metadata_id = m.id AND c.chunk_type = 'CHILD'
+              )
+            ORDER BY m.created_at
+        """)).fetchall()
+    return [str(r.id) for r in rows]
+
+
+def load_chunks(pdf_id: str) -> List[IndexedChunk]:
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT id, parent_chunk_id, page_num, chunk_index, chunk_text
+            FROM pdf_chunks
+            WHERE pdf_metadata_id = :id AND chunk_type = 'CHILD'
+            ORDER BY page_num, chunk_index
+        """), {"id": pdf_id}).fetchall()
+    return [
+        IndexedChunk(
+            chunk_id=str(r.id),
+            parent_chunk_id=str(r.parent_chunk_id) if r.parent_chunk_id else None,
+            page=r.page_num,
+            chunk_index=r.chunk_index,
+            text=r.chunk_text,
+        )
+        for r in rows
+    ]
+
+
+def backfill(rebuild: bool = False, root: Optional[str] = None) -> int:
+    """Index every pdf (rebuild) or those missing from the index; returns the count."""
+    root = root or settings.bm25_index_dir
+    pdf_ids = indexable_pdfs()
+    if not rebuild:
+        indexed = BM25Index(root).live_pdf_ids()
+        pdf_ids = [p for p in pdf_ids if p not in indexed]
+
+    for n, pdf_id in enumerate(pdf_ids, 1):
+        if rebuild:
+            tombstone_pdfs([pdf_id], root=root)
+        index_pdf(pdf_id, load_chunks(pdf_id), root=root)
+        if n % 100 == 0:
+            logger.info("Indexed %d/%d pdfs", n, len(pdf_ids))
+
+    # One merged segment instead of one per backfilled pdf
+    if pdf_ids:
+        compact(root)
+    return len(pdf_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the BM25 index from pdf_chunks")
+    parser.add_argument("--rebuild", action="store_true", help="re-index every pdf, not only missing ones")
+    parser.add_argument("--root", help="index directory (default: bm25_index_dir)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    count = backfill(rebuild=args.rebuild, root=args.root)
+    logger.info("Indexed %d pdf(s)", count)
+
+
+if __name__ == "__main__":
+    main()
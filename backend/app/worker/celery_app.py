@@ -19,3 +19,5 @@ celery_app.conf.update(
 # IMPORTANT: Explicit imports so tasks are registered
 import app.worker.tasks          # registers process_pdf
 import app.worker.tasks_embedding  # registers embed_pdf
+import app.worker.tasks_delete     # registers delete_documents
+import app.worker.signals          # task metrics / worker /metrics server
@@ -15,6 +15,8 @@ from dataclasses import dataclass
 from typing import List, Tuple, Optional
 from enum import Enum
 
+from app.services.metrics import record_count, tally
+
 # Lazy-load tokenizer to avoid startup overhead
 _tokenizer = None
 
@@ -40,7 +42,11 @@ def token_count(text: str) -> int:
     if tokenizer == "fallback":
         # Fallback: approximate 1 token ≈ 0.75 words
         return int(len(text.split()) / 0.75)
-    return len(tokenizer.encode(text, add_special_tokens=False))
+    # Part of the "chunk" stage, broken out in the ingestion ledger
+    with tally("tokenize"):
+        n = len(tokenizer.encode(text, add_special_tokens=False))
+    record_count("tokenize", n)
+    return n
 
 
 def word_count(text: str) -> int:
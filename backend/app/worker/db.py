@@ -1,10 +1,12 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.services.tracing import instrument_engine
 
 engine = create_engine(
     settings.database_url.replace("+asyncpg", ""),
     pool_pre_ping=True
 )
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(bind=engine)
@@ -0,0 +1,66 @@
+"""
+Per-document ingestion ledger.
+
+When process_pdf / embed_pdf finish (successfully or not), the stage
+durations and item counts collected by their Timings are written to
+ingest_stages, one row per (document, task, stage), plus a "total" row
+with the task's wall time. Rows of a retried task are replaced.
+
+Stages: download, extract, ocr, clean, chunk (tokenize is the part of it
+spent in the tokenizer), triples (spaCy), db_write, commit, bm25 for
+process_pdf; embed, upsert, commit for embed_pdf.
+"""
+
+import logging
+from typing import Dict, List
+
+from sqlalchemy import text
+
+from app.models.ingest_stage import TOTAL_STAGE
+from app.services.metrics import Timings
+from .db import engine
+
+logger = logging.getLogger(__name__)
+
+LEDGER_TASKS = {"process_pdf", "embed_pdf"}
+
+
+def ledger_rows(pdf_id: str, task: str, timings: Timings, elapsed_s: float) -> List[Dict]:
+    rows = [
+        {
+            "pid": pdf_id,
+            "task": task,
+            "stage": stage,
+            "ms": round(seconds * 1000, 3),
+            "items": timings.counts.get(stage),
+        }
+        for stage, seconds in timings.stages.items()
+    ]
+    rows.append({
+        "pid": pdf_id,
+        "task": task,
+        "stage": TOTAL_STAGE,
+        "ms": round(elapsed_s * 1000, 3),
+        "items": None,
+    })
+    return rows
+
+
+def save_stages(pdf_id: str, task: str, timings: Timings, elapsed_s: float):
+    """Best effort: a failed write never fails the task."""
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO ingest_stages
+                    (pdf_metadata_id, task, stage, duration_ms, item_count)
+                    VALUES (:pid, :task, :stage, :ms, :items)
+                    ON CONFLICT (pdf_metadata_id, task, stage) DO UPDATE
+                    SET duration_ms = EXCLUDED.duration_ms,
+                        item_count = EXCLUDED.item_count,
+                        recorded_at = now()
+                """),
+                ledger_rows(pdf_id, task, timings, elapsed_s),
+            )
+    except Exception:
+        logger.exception("Could not record ingestion stages for %s (%s)", pdf_id, task)
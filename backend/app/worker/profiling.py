@@ -0,0 +1,85 @@
+"""
+Opt-in sampling profiler for Celery task runs.
+
+Task runs matching ingest_profile_targets (a task name or the document id
+passed as first argument) are sampled from a background thread every
+ingest_profile_interval_ms via sys._current_frames(). The aggregated
+stacks are written to ingest_profile_dir in collapsed format
+("outer;inner;leaf <count>" per line), which flamegraph.pl, inferno and
+speedscope read directly.
+
+Samples are taken when the sampler thread gets the GIL, so long C calls
+that hold it (PyMuPDF, tokenizer) show up as fewer, longer samples.
+"""
+
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def profile_targets() -> set:
+    return {t.strip() for t in settings.ingest_profile_targets.split(",") if t.strip()}
+
+
+def should_profile(task_name: str, args) -> bool:
+    targets = profile_targets()
+    if not targets:
+        return False
+    return task_name in targets or bool(args and str(args[0]) in targets)
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack; use as a context manager."""
+
+    def __init__(self, path: str, interval_s: float, thread_id: Optional[int] = None):
+        self.path = path
+        self.interval_s = interval_s
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ingest-profiler", daemon=True)
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if stack:
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self._sample()
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                for stack, count in self.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            logger.info("Profile (%d samples) written to %s", sum(self.samples.values()), self.path)
+        except OSError:
+            logger.exception("Could not write profile %s", self.path)
+
+
+def task_profiler(task_name: str, task_id: str, args) -> Optional[SamplingProfiler]:
+    if not should_profile(task_name, args):
+        return None
+    label = str(args[0]) if args else task_id
+    path = os.path.join(settings.ingest_profile_dir, f"{task_name}-{label}-{task_id}.collapsed")
+    return SamplingProfiler(path, max(settings.ingest_profile_interval_ms, 1) / 1000)
@@ -0,0 +1,117 @@
+"""
+Celery signal handlers: task run time / outcome metrics, per-task
+stage timings (timed() inside a task feeds ingest_stage_seconds, and the
+ingestion tasks' stages are written to the ledger), opt-in sampling
+profiles, and trace propagation (the publisher's traceparent travels in
+the message headers; each task run is a span continuing that trace).
+
+With worker_metrics_port set, the main worker process serves /metrics.
+Prefork children only share metrics through PROMETHEUS_MULTIPROC_DIR
+(prometheus_client multiprocess mode); without it only the main process'
+own metrics are exported, which suits --pool=solo / threads.
+"""
+
+import logging
+import time
+from contextlib import ExitStack
+from typing import Dict, Optional
+
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown,
+)
+
+from app.config import settings
+from app.services.metrics import (
+    INGEST_STAGE_SECONDS,
+    TASK_SECONDS,
+    TASKS,
+    Timings,
+    mark_process_dead,
+    metrics_available,
+    start_metrics_server,
+    use_timings,
+)
+from app.services.tracing import Span, activate, extract, flush, inject, start_root
+from .ledger import LEDGER_TASKS, save_stages
+from .profiling import task_profiler
+
+logger = logging.getLogger(__name__)
+
+
+class _TaskRun:
+    def __init__(self):
+        self.started = time.perf_counter()
+        # Bound timings, task span and profiler; closed in postrun
+        self.stack = ExitStack()
+        self.timings = Timings(INGEST_STAGE_SECONDS)
+        self.span: Optional[Span] = None
+
+
+_running: Dict[str, _TaskRun] = {}
+
+
+@before_task_publish.connect
+def propagate_trace(headers=None, **kwargs):
+    if headers is not None:
+        headers.update(inject())
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, task=None, args=None, **kwargs):
+    run = _TaskRun()
+    run.stack.enter_context(use_timings(run.timings))
+    # Custom message headers show up as task.request attributes
+    parent = extract(getattr(task.request, "traceparent", None))
+    run.span = run.stack.enter_context(activate(start_root(
+        f"celery.{task.name}", parent,
+        task_id=task_id, args=repr(args), retries=task.request.retries or 0,
+    )))
+    profiler = task_profiler(task.name, task_id, args)
+    if profiler is not None:
+        run.stack.enter_context(profiler)
+    _running[task_id] = run
+
+
+@task_failure.connect
+def mark_task_span_failed(task_id=None, exception=None, **kwargs):
+    run = _running.get(task_id)
+    if run is not None and run.span is not None:
+        run.span.end(error=exception)
+
+
+@task_postrun.connect
+def stop_task_timer(task_id=None, task=None, args=None, state=None, **kwargs):
+    run = _running.pop(task_id, None)
+    if run is not None:
+        if run.span is not None:
+            run.span.set("state", state or "UNKNOWN")
+        run.stack.close()
+        elapsed = time.perf_counter() - run.started
+        TASK_SECONDS.labels(task=task.name).observe(elapsed)
+        if task.name in LEDGER_TASKS and args:
+            save_stages(str(args[0]), task.name, run.timings, elapsed)
+    TASKS.labels(task=task.name, state=state or "UNKNOWN").inc()
+
+
+@worker_init.connect
+def serve_worker_metrics(**kwargs):
+    if not settings.worker_metrics_port:
+        return
+    if not metrics_available():
+        logger.warning("worker_metrics_port is set but prometheus_client is not installed")
+        return
+    start_metrics_server(settings.worker_metrics_port)
+    logger.info("Worker metrics on :%d/metrics", settings.worker_metrics_port)
+
+
+@worker_process_shutdown.connect
+def forget_worker_process(pid=None, **kwargs):
+    if pid:
+        mark_process_dead(pid)
+    # Prefork children exit without running atexit handlers
+    flush()
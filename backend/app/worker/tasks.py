@@ -7,8 +7,7 @@ import tempfile
 import os
 import re
 import logging
-import string
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
@@ -20,16 +19,22 @@ try:
 except Exception:
     _SPACY_AVAILABLE = False
 
-# Optional OCR
+# Optional OCR (pages are rendered by PyMuPDF, no poppler round-trip)
 try:
     import pytesseract
-    from pdf2image import convert_from_path
+    from PIL import Image
     _OCR_AVAILABLE = True
 except Exception:
     _OCR_AVAILABLE = False
 
+OCR_DPI = 300
+
 # Advanced chunking
 from .chunking import chunk_document_page
+from app.services.lexical.bm25_index import IndexedChunk, index_pdf, maybe_compact
+from app.services.search.utils import normalize_text
+from app.services.metrics import record_count, tally, timed
+from app.services.tracing import Traced, instrument_engine
 
 
 # LOGGING
@@ -39,15 +44,16 @@ logger = logging.getLogger("tasks")
 # DATABASE (SYNC — REQUIRED FOR CELERY ON WINDOWS)
 SYNC_DB_URL = settings.database_url.replace("+asyncpg", "")
 engine = create_engine(SYNC_DB_URL, pool_pre_ping=True)
+instrument_engine(engine)
 SessionLocal = sessionmaker(bind=engine)
 
 # MINIO
-minio_client = Minio(
+minio_client = Traced(Minio(
     settings.minio_endpoint,
     access_key=settings.minio_access_key,
     secret_key=settings.minio_secret_key,
     secure=False,
-)
+), "minio")
 
 # MINIO HELPERS
 def download_from_minio(object_key: str, file_path: str):
@@ -60,15 +66,43 @@ def download_from_minio(object_key: str, file_path: str):
         resp.close()
         resp.release_conn()
 
-# NORMALIZATION (CRITICAL FOR HIGHLIGHTING)
-_NORMALIZE_PUNCT = str.maketrans("", "", string.punctuation)
-_WHITESPACE_RE = re.compile(r"\s+")
 
-def normalize_text(text: str) -> str:
-    text = text.lower()
-    text = text.translate(_NORMALIZE_PUNCT)
-    text = _WHITESPACE_RE.sub(" ", text)
-    return text.strip()
+def read_from_minio(object_key: str) -> bytes:
+    resp = minio_client.get_object(settings.minio_bucket, object_key)
+    try:
+        return resp.read()
+    finally:
+        resp.close()
+        resp.release_conn()
+
+
+def open_pdf_from_minio(object_key: str) -> Tuple[fitz.Document, Optional[str]]:
+    """
+    Open a stored PDF once for the whole ingestion.
+
+    Returns (document, tmp_path); tmp_path is None for in-memory documents
+    and must otherwise be removed by the caller after closing the document.
+    Files above ingest_memory_max_bytes always go through a disk temp file.
+    """
+    size = minio_client.stat_object(settings.minio_bucket, object_key).size
+    record_count("download", size)
+    mode = settings.ingest_io_mode
+    fits_in_memory = size <= settings.ingest_memory_max_bytes
+
+    if mode == "memory" and fits_in_memory:
+        data = read_from_minio(object_key)
+        return fitz.open(stream=data, filetype="pdf"), None
+
+    tmp_dir = None
+    if mode == "tmpfs" and fits_in_memory and os.path.isdir(settings.ingest_tmpfs_dir):
+        tmp_dir = settings.ingest_tmpfs_dir
+
+    tmpfile = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf", dir=tmp_dir)
+    tmp_path = tmpfile.name
+    tmpfile.close()
+
+    download_from_minio(object_key, tmp_path)
+    return fitz.open(tmp_path), tmp_path
 
 # OCR
 def ocr_page_image(image) -> str:
@@ -80,40 +114,41 @@ def ocr_page_image(image) -> str:
         logger.warning("OCR failed: %s", e)
         return ""
 
-def extract_text_with_ocr(pdf_path: str, page_num: int) -> str:
+def extract_text_with_ocr(page: fitz.Page) -> str:
     if not _OCR_AVAILABLE:
         return ""
     try:
-        images = convert_from_path(
-            pdf_path, first_page=page_num, last_page=page_num, dpi=300
-        )
-        if images:
-            return ocr_page_image(images[0])
+        pix = page.get_pixmap(dpi=OCR_DPI)
+        image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        return ocr_page_image(image)
     except Exception as e:
-        logger.warning("OCR extraction failed for page %s: %s", page_num, e)
+        logger.warning("OCR extraction failed for page %s: %s", page.number + 1, e)
     return ""
 
 
 # PDF EXTRACTION
-def extract_text_pages(pdf_path: str) -> List[Tuple[int, str]]:
-    doc = fitz.open(pdf_path)
+def extract_text_pages(doc: fitz.Document) -> List[Tuple[int, str]]:
+    """Extract page texts from an already opened document (OCR shares it)."""
     pages = []
 
     for i, page in enumerate(doc):
         page_num = i + 1
-        try:
-            text = page.get_text() or ""
-        except Exception:
-            text = ""
+        with tally("extract"):
+            try:
+                text = page.get_text() or ""
+            except Exception:
+                text = ""
 
         if len(text.strip()) < 50 and _OCR_AVAILABLE:
-            ocr_text = extract_text_with_ocr(pdf_path, page_num)
+            with tally("ocr"):
+                ocr_text = extract_text_with_ocr(page)
+            record_count("ocr")
             if len(ocr_text.strip()) > len(text.strip()):
                 text = ocr_text
 
         pages.append((page_num, text))
 
-    doc.close()
+    record_count("extract", len(pages))
     return pages
 
 # CLEANING
@@ -193,6 +228,14 @@ def extract_triples(text: str, limit: int = 5):
 
     return triples or extract_naive_triples(text, limit)
 
+def index_bm25(pdf_id: str, chunks: List[IndexedChunk]):
+    # The chunks are committed; a failed segment only costs BM25 recall
+    try:
+        index_pdf(pdf_id, chunks)
+        maybe_compact()
+    except Exception:
+        logger.exception("BM25 indexing failed for %s", pdf_id)
+
 # CELERY TASK
 @celery_app.task(name="process_pdf")
 def process_pdf(pdf_id: str, object_key: str):
@@ -201,106 +244,137 @@ def process_pdf(pdf_id: str, object_key: str):
 
     try:
         db.execute(
-            text("UPDATE pdf_metadata SET status='PROCESSING' WHERE id=:id"),
+            text("UPDATE pdf_metadata SET status='PROCESSING', updated_at=now() WHERE id=:id OR source_id=:id"),
             {"id": pdf_id},
         )
         db.commit()
 
-        tmpfile = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-        tmp_path = tmpfile.name
-        tmpfile.close()
+        with timed("download"):
+            pdf_doc, tmp_path = open_pdf_from_minio(object_key)
+        try:
+            pages = extract_text_pages(pdf_doc)
+        finally:
+            pdf_doc.close()
 
-        download_from_minio(object_key, tmp_path)
-        pages = extract_text_pages(tmp_path)
+        db.execute(
+            text("UPDATE pdf_metadata SET page_count=:n WHERE id=:id OR source_id=:id"),
+            {"id": pdf_id, "n": len(pages)},
+        )
 
+        indexed: List[IndexedChunk] = []
         for page_num, page_text in pages:
-            cleaned = clean_text(page_text)
+            with tally("clean"):
+                cleaned = clean_text(page_text)
             if not cleaned:
                 continue
+            record_count("clean")
 
-            parents, children = chunk_document_page(cleaned, page_num)
+            with tally("chunk"):
+                parents, children = chunk_document_page(cleaned, page_num)
+            record_count("chunk", len(parents) + len(children))
             parent_db_ids = {}
 
             # INSERT PARENT CHUNKS
             for p in parents:
-                res = db.execute(
-                    text("""
-                        INSERT INTO pdf_chunks
-                        (pdf_metadata_id, page_num, chunk_index, chunk_text,
-                         normalized_text, length_chars, token_count,
-                         chunk_type, parent_chunk_id, lexical_tsv)
-                        VALUES (:pid, :pg, :idx, :txt, :norm, :len, :tokens, 'PARENT', NULL, to_tsvector('english', :txt))
-                        RETURNING id
-                    """),
-                    {
-                        "pid": pdf_id,
-                        "pg": page_num,
-                        "idx": p.index,
-                        "txt": p.text,
-                        "norm": normalize_text(p.text),
-                        "len": p.char_count,
-                        "tokens": p.token_count,
-                    },
-                )
-                parent_db_ids[p.index] = res.fetchone()[0]
+                with tally("db_write"):
+                    res = db.execute(
+                        text("""
+                            INSERT INTO pdf_chunks
+                            (pdf_metadata_id, page_num, chunk_index, chunk_text,
+                             normalized_text, length_chars, token_count,
+                             chunk_type, parent_chunk_id, lexical_tsv)
+                            VALUES (:pid, :pg, :idx, :txt, :norm, :len, :tokens, 'PARENT', NULL, to_tsvector('english', :txt))
+                            RETURNING id
+                        """),
+                        {
+                            "pid": pdf_id,
+                            "pg": page_num,
+                            "idx": p.index,
+                            "txt": p.text,
+                            "norm": normalize_text(p.text),
+                            "len": p.char_count,
+                            "tokens": p.token_count,
+                        },
+                    )
+                    parent_db_ids[p.index] = res.fetchone()[0]
+            record_count("db_write", len(parents))
 
             
             # INSERT CHILD CHUNKS
             for c in children:
                 parent_id = parent_db_ids.get(c.parent_index)
-                res = db.execute(
-                    text("""
-                        INSERT INTO pdf_chunks
-                        (pdf_metadata_id, page_num, chunk_index, chunk_text,
-                         normalized_text, length_chars, token_count,
-                         chunk_type, parent_chunk_id, lexical_tsv)
-                        VALUES (:pid, :pg, :idx, :txt, :norm, :len, :tokens, 'CHILD', :parent, to_tsvector('english', :txt))
-                        RETURNING id
-                    """),
-                    {
-                        "pid": pdf_id,
-                        "pg": page_num,
-                        "idx": c.index,
-                        "txt": c.text,
-                        "norm": normalize_text(c.text),
-                        "len": c.char_count,
-                        "tokens": c.token_count,
-                        "parent": parent_id,
-                    },
-                )
-                child_chunk_id = res.fetchone()[0]
-
-                for subj, pred, obj in extract_triples(c.text):
-                    db.execute(
+                with tally("db_write"):
+                    res = db.execute(
                         text("""
-                            INSERT INTO pdf_triples
-                            (pdf_metadata_id, chunk_id, page_num, chunk_index,
-                             subject, predicate, object, triple_tsv)
-                            VALUES (:pid, :cid, :pg, :idx, :s, :p, :o, 
-                                 to_tsvector(
-                                        'english',
-                                        coalesce(:s, '') || ' ' ||
-                                        coalesce(:p, '') || ' ' ||
-                                        coalesce(:o, '')
-                                )
-                             )
+                            INSERT INTO pdf_chunks
+                            (pdf_metadata_id, page_num, chunk_index, chunk_text,
+                             normalized_text, length_chars, token_count,
+                             chunk_type, parent_chunk_id, lexical_tsv)
+                            VALUES (:pid, :pg, :idx, :txt, :norm, :len, :tokens, 'CHILD', :parent, to_tsvector('english', :txt))
+                            RETURNING id
                         """),
                         {
                             "pid": pdf_id,
-                            "cid": child_chunk_id,
                             "pg": page_num,
                             "idx": c.index,
-                            "s": subj,
-                            "p": pred,
-                            "o": obj,
+                            "txt": c.text,
+                            "norm": normalize_text(c.text),
+                            "len": c.char_count,
+                            "tokens": c.token_count,
+                            "parent": parent_id,
                         },
                     )
+                    child_chunk_id = res.fetchone()[0]
+                indexed.append(IndexedChunk(
+                    chunk_id=str(child_chunk_id),
+                    parent_chunk_id=str(parent_id) if parent_id else None,
+                    page=page_num,
+                    chunk_index=c.index,
+                    text=c.text,
+                ))
+
+                with tally("triples"):
+                    triples = extract_triples(c.text)
+                record_count("triples", len(triples))
+
+                with tally("db_write"):
+                    for subj, pred, obj in triples:
+                        db.execute(
+                            text("""
+                                INSERT INTO pdf_triples
+                                (pdf_metadata_id, chunk_id, page_num, chunk_index,
+                                 subject, predicate, object, triple_tsv)
+                                VALUES (:pid, :cid, :pg, :idx, :s, :p, :o, 
+                                     to_tsvector(
+                                            'english',
+                                            coalesce(:s, '') || ' ' ||
+                                            coalesce(:p, '') || ' ' ||
+                                            coalesce(:o, '')
+                                    )
+                                 )
+                            """),
+                            {
+                                "pid": pdf_id,
+                                "cid": child_chunk_id,
+                                "pg": page_num,
+                                "idx": c.index,
+                                "s": subj,
+                                "p": pred,
+                                "o": obj,
+                            },
+                        )
+                record_count("db_write", 1 + len(triples))
+
+        with timed("commit"):
+            db.execute(
+                text("UPDATE pdf_metadata SET status='COMPLETED', updated_at=now() WHERE id=:id OR source_id=:id"),
+                {"id": pdf_id},
+            )
+            db.commit()
 
-        db.execute(
-            text("UPDATE pdf_metadata SET status='COMPLETED' WHERE id=:id"),
-            {"id": pdf_id},
-        )
-        db.commit()
+        if settings.lexical_backend == "bm25":
+            with timed("bm25"):
+                index_bm25(pdf_id, indexed)
 
         celery_app.send_task("embed_pdf", args=[pdf_id])
         logger.info("PDF processed successfully: %s", pdf_id)
@@ -309,7 +383,8 @@ def process_pdf(pdf_id: str, object_key: str):
         db.rollback()
         db.execute(
             text(
-                "UPDATE pdf_metadata SET status='FAILED', error_message=:msg WHERE id=:id"
+                "UPDATE pdf_metadata SET status='FAILED', error_message=:msg, updated_at=now() "
+                "WHERE id=:id OR source_id=:id"
             ),
             {"id": pdf_id, "msg": str(e)},
         )
@@ -0,0 +1,161 @@
+from typing import Optional
+import uuid
+
+import redis
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from minio.deleteobjects import DeleteObject
+
+from .celery_app import REDIS_URL, celery_app
+from .tasks import minio_client
+from app.config import settings
+from app.services.qdrant.qdrant_client import delete_pdfs_vectors
+from app.services.lexical.bm25_index import tombstone_pdfs
+from app.services.tracing import instrument_engine
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("delete")
+
+
+# SYNC DATABASE (REQUIRED FOR CELERY ON WINDOWS)
+SYNC_DB_URL = settings.database_url.replace("+asyncpg", "")
+engine = create_engine(SYNC_DB_URL, pool_pre_ping=True)
+instrument_engine(engine)
+SessionLocal = sessionmaker(bind=engine)
+
+# Owner of each bulk delete job, recorded at enqueue time so the status
+# endpoint can check it before the task has even started
+JOB_OWNER_KEY = "delete-job:{}:owner"
+job_owners = redis.Redis.from_url(REDIS_URL)
+
+
+def _ids(rows) -> list[str]:
+    return [str(r.id) for r in rows]
+
+
+def remove_objects(object_keys: list[str]) -> int:
+    """Batched MinIO delete; returns the number of failed keys."""
+    if not object_keys:
+        return 0
+    errors = minio_client.remove_objects(
+        settings.minio_bucket,
+        (DeleteObject(k) for k in object_keys),
+    )
+    # remove_objects is lazy: the deletes happen while errors are consumed
+    failed = 0
+    for err in errors:
+        failed += 1
+        logger.warning("MinIO delete failed for %s: %s", err.name, err.message)
+    return failed
+
+
+def start_delete_job(user_id: str) -> str:
+    """Enqueue delete_documents for a user; returns the job id."""
+    job_id = str(uuid.uuid4())
+    # Kept as long as Celery keeps the job's result
+    job_owners.set(JOB_OWNER_KEY.format(job_id), user_id, ex=celery_app.conf.result_expires)
+    delete_documents.apply_async((user_id,), task_id=job_id)
+    return job_id
+
+
+def delete_job_owner(job_id: str) -> Optional[str]:
+    owner = job_owners.get(JOB_OWNER_KEY.format(job_id))
+    return owner.decode() if owner else None
+
+
+# CELERY TASK
+@celery_app.task(name="delete_documents")
+def delete_documents(user_id: str):
+    """
+    Delete every document of a user with set-based statements.
+
+    Reference counting (see app.services.documents.dedup) is applied in
+    SQL: references are dropped, owners still referenced by other users
+    are detached, and only unreferenced owners are purged from Postgres,
+    Qdrant (one MatchAny filter) and MinIO (one remove_objects batch).
+    """
+    db = SessionLocal()
+
+    try:
+        docs = db.execute(
+            text("SELECT id, source_id FROM pdf_metadata WHERE uploaded_by = :uid"),
+            {"uid": user_id},
+        ).fetchall()
+
+        ref_ids = _ids(d for d in docs if d.source_id is not None)
+        owner_ids = _ids(d for d in docs if d.source_id is None)
+        ref_sources = list({str(d.source_id) for d in docs if d.source_id is not None})
+
+        # 1. Drop the user's references
+        db.execute(
+            text("DELETE FROM pdf_metadata WHERE id = ANY(CAST(:ids AS uuid[]))"),
+            {"ids": ref_ids},
+        )
+
+        # 2. Owners still referenced elsewhere are detached, not deleted
+        detached = db.execute(
+            text("""
+                UPDATE pdf_metadata m SET uploaded_by = NULL
+                WHERE m.id = ANY(CAST(:ids AS uuid[]))
+                  AND EXISTS (SELECT 1 FROM pdf_metadata r WHERE r.source_id = m.id)
+                RETURNING m.id
+            """),
+            {"ids": owner_ids},
+        ).fetchall()
+
+        # 3. Purge the user's unreferenced owners, plus detached owners whose
+        #    last reference was just dropped
+        purge = db.execute(
+            text("""
+                SELECT m.id, m.object_key FROM pdf_metadata m
+                WHERE (
+                        m.id = ANY(CAST(:owner_ids AS uuid[]))
+                        OR (m.id = ANY(CAST(:ref_sources AS uuid[])) AND m.uploaded_by IS NULL)
+                      )
+                  AND NOT EXISTS (SELECT 1 FROM pdf_metadata r WHERE r.source_id = m.id)
+            """),
+            {"owner_ids": owner_ids, "ref_sources": ref_sources},
+        ).fetchall()
+
+        purge_ids = _ids(purge)
+        db.execute(
+            text("DELETE FROM pdf_metadata WHERE id = ANY(CAST(:ids AS uuid[]))"),
+            {"ids": purge_ids},
+        )
+        db.commit()
+
+        # Stores are cleaned after the commit: leftovers there are harmless,
+        # rows pointing at missing vectors/objects are not
+        try:
+            delete_pdfs_vectors(purge_ids)
+        except Exception:
+            logger.exception("Qdrant bulk delete failed for user %s", user_id)
+
+        try:
+            tombstone_pdfs(purge_ids)
+        except Exception:
+            logger.exception("BM25 tombstones failed for user %s", user_id)
+
+        failed_objects = remove_objects([p.object_key for p in purge])
+
+        logger.info(
+            "Deleted %d document(s) for user %s (%d purged, %d detached)",
+            len(docs), user_id, len(purge_ids), len(detached),
+        )
+        return {
+            "user_id": user_id,
+            "deleted": len(docs),
+            "purged": len(purge_ids),
+            "detached": len(detached),
+            "failed_objects": failed_objects,
+        }
+
+    except Exception:
+        db.rollback()
+        logger.exception("Bulk delete failed for user %s", user_id)
+        raise
+
+    finally:
+        db.close()
@@ -4,9 +4,20 @@ from sqlalchemy.orm import sessionmaker
 from .celery_app import celery_app
 from app.config import settings
 from app.services.embeddings.embedder import generate_embeddings
-from app.services.qdrant.qdrant_client import ensure_collection, upsert_points
+from app.services.embeddings.sparse import SPARSE_VECTOR_NAME, encode_document
+from app.services.metrics import record_count, timed
+from app.services.tracing import instrument_engine
+from app.services.qdrant.qdrant_client import (
+    ensure_collection,
+    upsert_points,
+    page_key,
+    DOC_COLLECTION_NAME,
+    PAGE_COLLECTION_NAME,
+)
 
 import logging
+import uuid
+import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("embedder")
@@ -15,9 +26,44 @@ logger = logging.getLogger("embedder")
 # SYNC DATABASE (REQUIRED FOR CELERY ON WINDOWS)
 SYNC_DB_URL = settings.database_url.replace("+asyncpg", "")
 engine = create_engine(SYNC_DB_URL, pool_pre_ping=True)
+instrument_engine(engine)
 SessionLocal = sessionmaker(bind=engine)
 
 
+def _pooled(vectors) -> list[float]:
+    """Mean of unit vectors, renormalized (cosine space)."""
+    mean = np.asarray(vectors, dtype=np.float32).mean(axis=0)
+    norm = np.linalg.norm(mean)
+    return (mean / norm if norm else mean).tolist()
+
+
+def summary_points(pdf_id: str, pages: list[int], embeddings) -> tuple[list[dict], list[dict]]:
+    """Document- and page-level routing vectors pooled from child embeddings."""
+    doc_points = [{
+        "id": pdf_id,
+        "vector": _pooled(embeddings),
+        "payload": {"pdf_id": pdf_id, "pages": len(set(pages))},
+    }]
+
+    by_page: dict[int, list] = {}
+    for page, vec in zip(pages, embeddings):
+        by_page.setdefault(page, []).append(vec)
+
+    page_points = [
+        {
+            "id": str(uuid.uuid5(uuid.UUID(pdf_id), str(page))),
+            "vector": _pooled(vecs),
+            "payload": {
+                "pdf_id": pdf_id,
+                "page": page,
+                "page_key": page_key(pdf_id, page),
+            },
+        }
+        for page, vecs in by_page.items()
+    ]
+    return doc_points, page_points
+
+
 # CELERY TASK
 @celery_app.task(name="embed_pdf")
 def embed_pdf(pdf_id: str):
@@ -25,7 +71,7 @@ def embed_pdf(pdf_id: str):
     db = SessionLocal()
 
     try:
-        ensure_collection()
+        sparse_enabled = ensure_collection()
 
         rows = db.execute(
             text("""
@@ -67,9 +113,12 @@ def embed_pdf(pdf_id: str):
                 "parent_text": r.parent_text,
                 "composite_text": composite_text,
                 "parent_chunk_id": str(r.parent_chunk_id) if r.parent_chunk_id else None,
+                "page_key": page_key(pdf_id, r.page_num),
             })
 
-        embeddings = generate_embeddings(texts)
+        with timed("embed"):
+            embeddings = generate_embeddings(texts)
+        record_count("embed", len(texts))
 
         points = [
             {
@@ -80,24 +129,42 @@ def embed_pdf(pdf_id: str):
             for i in range(len(ids))
         ]
 
-        upsert_points(points)
+        if sparse_enabled:
+            # Unnamed dense vector + named BM25 term vector of the child text
+            for point, r in zip(points, rows):
+                point["vector"] = {
+                    "": point["vector"],
+                    SPARSE_VECTOR_NAME: encode_document(r.chunk_text),
+                }
 
-        db.execute(
-            text("""
-                UPDATE pdf_chunks
-                SET embedded = TRUE
-                WHERE pdf_metadata_id = :pid
-            """),
-            {"pid": pdf_id},
-        )
+        with timed("upsert"):
+            upsert_points(points)
 
-        # COMPLETED is set ONLY after embeddings + Qdrant upsert
-        db.execute(
-            text("UPDATE pdf_metadata SET status='COMPLETED' WHERE id=:id"),
-            {"id": pdf_id},
-        )
+            # Routing vectors for coarse-to-fine search
+            doc_points, page_points = summary_points(
+                pdf_id, [r.page_num for r in rows], embeddings
+            )
+            upsert_points(doc_points, DOC_COLLECTION_NAME)
+            upsert_points(page_points, PAGE_COLLECTION_NAME)
+        record_count("upsert", len(points) + len(doc_points) + len(page_points))
+
+        with timed("commit"):
+            db.execute(
+                text("""
+                    UPDATE pdf_chunks
+                    SET embedded = TRUE
+                    WHERE pdf_metadata_id = :pid
+                """),
+                {"pid": pdf_id},
+            )
 
-        db.commit()
+            # COMPLETED is set ONLY after embeddings + Qdrant upsert
+            db.execute(
+                text("UPDATE pdf_metadata SET status='COMPLETED', updated_at=now() WHERE id=:id OR source_id=:id"),
+                {"id": pdf_id},
+            )
+
+            db.commit()
         logger.info("Embedded %d chunks for PDF %s", len(ids), pdf_id)
 
     except Exception:
@@ -105,8 +172,8 @@ def embed_pdf(pdf_id: str):
         db.execute(
             text("""
                 UPDATE pdf_metadata
-                SET status='EMBED_FAILED', error_message='embedding failed'
-                WHERE id=:id
+                SET status='FAILED', error_message='embedding failed', updated_at=now()
+                WHERE id=:id OR source_id=:id
             """),
             {"id": pdf_id},
         )
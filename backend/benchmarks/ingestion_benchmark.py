@@ -0,0 +1,389 @@
+"""
+Ingestion throughput benchmark on synthetic PDFs.
+
+Generates PDFs locally with PyMuPDF (text-heavy, scanned/image-only, huge,
+tiny) and times the ingestion stages in isolation: extract_text_pages,
+clean_text, chunk_document_page, extract_triples and generate_embeddings.
+With --e2e it also runs the real process_pdf / embed_pdf tasks end to end.
+Reports pages/s, chunks/s and peak RSS per stage as JSON; --baseline adds
+the change against an earlier report (e.g. one made on the parent commit).
+
+    cd backend
+    python -m benchmarks.ingestion_benchmark --out ingest.json
+    python -m benchmarks.ingestion_benchmark --baseline ingest.json --out ingest-new.json
+
+--e2e needs a throwaway Postgres in DATABASE_URL (tables are created, the
+benchmark documents are deleted afterwards). The PDFs are opened from the
+local files instead of MinIO, embed_pdf is called directly instead of
+through the broker, and vectors go to a temporary local vector store.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import fitz
+
+from app.config import settings
+from app.services.embeddings.embedder import generate_embeddings
+from app.services.metrics import Timings, use_timings
+# celery_app first: it imports the task modules in dependency order
+from app.worker.celery_app import celery_app
+from app.worker import tasks
+from app.worker.chunking import chunk_document_page
+from app.worker.tasks import clean_text, extract_text_pages, extract_triples
+from benchmarks.lexical_benchmark import peak_rss_mb
+
+# name -> (kind, pages per document, documents)
+PROFILES = {
+    "text": ("text", 20, 5),
+    "scanned": ("scanned", 4, 2),
+    "huge": ("text", 400, 1),
+    "tiny": ("text", 1, 25),
+}
+
+SUBJECTS = ["the model", "the sensor", "this study", "the committee", "the algorithm",
+            "the reactor", "each sample", "the survey", "the network", "the patient group"]
+VERBS = ["measured", "reduced", "improved", "reported", "estimated", "examined",
+         "increased", "compared", "limited", "predicted"]
+OBJECTS = ["the thermal load", "response latency", "the error rate", "annual rainfall",
+           "protein expression", "memory usage", "the failure modes", "crop yield",
+           "the baseline variance", "signal noise"]
+TAILS = ["under controlled conditions", "in the second trial", "across all regions",
+         "after calibration", "with a 95% confidence interval", "despite missing data"]
+
+PAGE_RECT = fitz.Rect(0, 0, 595, 842)  # A4 points
+TEXT_RECT = fitz.Rect(50, 50, 545, 792)
+
+
+def paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(
+        f"{rng.choice(SUBJECTS).capitalize()} {rng.choice(VERBS)} {rng.choice(OBJECTS)} "
+        f"{rng.choice(TAILS)}."
+        for _ in range(sentences)
+    )
+
+
+def page_text(rng: random.Random, kind: str, pages: int) -> str:
+    if pages == 1 and kind == "text":
+        return paragraph(rng, 3)  # tiny
+    return "\n\n".join(paragraph(rng, rng.randint(4, 7)) for _ in range(5))
+
+
+def write_pdf(path: str, kind: str, pages: int, rng: random.Random):
+    doc = fitz.open()
+    for _ in range(pages):
+        text_page = doc.new_page(width=PAGE_RECT.width, height=PAGE_RECT.height)
+        text_page.insert_textbox(TEXT_RECT, page_text(rng, kind, pages), fontsize=9)
+        if kind == "scanned":
+            # Replace the page by a raster of itself: no text layer left
+            pix = text_page.get_pixmap(dpi=150)
+            doc.delete_page(-1)
+            image_page = doc.new_page(width=PAGE_RECT.width, height=PAGE_RECT.height)
+            image_page.insert_image(PAGE_RECT, pixmap=pix)
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+def generate_corpus(workdir: str, profiles: List[str], scale: float, seed: int) -> Dict[str, List[str]]:
+    rng = random.Random(seed)
+    corpus = {}
+    for name in profiles:
+        kind, pages, count = PROFILES[name]
+        pages = pages if pages == 1 else max(int(pages * scale), 1)
+        corpus[name] = []
+        for i in range(count):
+            path = os.path.join(workdir, f"{name}_{i}.pdf")
+            write_pdf(path, kind, pages, rng)
+            corpus[name].append(path)
+    return corpus
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        # No /proc: fall back to the process-wide high-water mark
+        return peak_rss_mb()
+
+
+class StageMeter:
+    """Wall time and RSS high-water mark of a block (RSS sampled every 10 ms)."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.rss_before = 0.0
+        self.peak_rss = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(0.01):
+            self.peak_rss = max(self.peak_rss, current_rss_mb())
+
+    def __enter__(self) -> "StageMeter":
+        self.rss_before = self.peak_rss = current_rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._started
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, current_rss_mb())
+
+
+def rates(seconds: float, pages: int, chunks: int) -> Dict[str, float]:
+    return {
+        "seconds": round(seconds, 6),
+        "pages_per_s": round(pages / seconds, 2) if seconds else None,
+        "chunks_per_s": round(chunks / seconds, 2) if seconds else None,
+    }
+
+
+def run_isolated(paths: List[str], skip_embed: bool) -> Dict:
+    """Each stage over the whole profile, fed by the previous stage's output."""
+    meters: Dict[str, StageMeter] = {}
+
+    def stage(name: str, fn: Callable):
+        meters[name] = StageMeter()
+        with meters[name]:
+            return fn()
+
+    def extract_all():
+        out = []
+        for path in paths:
+            doc = fitz.open(path)
+            try:
+                out.extend(extract_text_pages(doc))
+            finally:
+                doc.close()
+        return out
+
+    pages = stage("extract", extract_all)
+    cleaned = stage("clean", lambda: [(n, clean_text(t)) for n, t in pages])
+
+    def chunk_all():
+        out = []
+        for page_num, page in cleaned:
+            if page:
+                parents, children = chunk_document_page(page, page_num)
+                parent_text = {p.index: p.text for p in parents}
+                out.extend((parent_text.get(c.parent_index, ""), c.text) for c in children)
+        return out
+
+    children = stage("chunk", chunk_all)
+    stage("triples", lambda: [extract_triples(text) for _, text in children])
+    if not skip_embed and children:
+        # Composite parent + child text, one batch per profile like embed_pdf per document
+        stage("embed", lambda: generate_embeddings([f"{p.strip()}\n{c.strip()}" for p, c in children]))
+
+    return {
+        "pages": len(pages),
+        "chunks": len(children),
+        "stages": {
+            name: {
+                **rates(m.seconds, len(pages), len(children)),
+                "peak_rss_mb": round(m.peak_rss, 1),
+                "rss_growth_mb": round(m.peak_rss - m.rss_before, 1),
+            }
+            for name, m in meters.items()
+        },
+    }
+
+
+# ---------- end to end ----------
+
+def prepare_e2e(workdir: str):
+    from app.database import Base
+    from app.models import PDFChunk, PDFMetadata, PDFTriple
+
+    settings.vector_backend = "local"
+    settings.local_vector_dir = os.path.join(workdir, "vectors")
+    Base.metadata.create_all(
+        tasks.engine, tables=[PDFMetadata.__table__, PDFChunk.__table__, PDFTriple.__table__]
+    )
+
+    # Local files instead of MinIO, and no broker round-trip to embed_pdf
+    tasks.open_pdf_from_minio = lambda path: (fitz.open(path), None)
+    celery_app.send_task = lambda *args, **kwargs: None
+
+
+def run_e2e(paths: List[str], skip_embed: bool, keep: bool) -> Dict:
+    from sqlalchemy import text
+    from app.worker.tasks_embedding import embed_pdf
+
+    timings = Timings()
+    ids = []
+    meter = StageMeter()
+    try:
+        with meter, use_timings(timings):
+            for path in paths:
+                pdf_id = str(uuid.uuid4())
+                ids.append(pdf_id)
+                with tasks.engine.begin() as conn:
+                    conn.execute(
+                        text("""
+                            INSERT INTO pdf_metadata (id, filename, object_key, status, created_at, updated_at)
+                            VALUES (:id, :name, :key, 'PENDING', now(), now())
+                        """),
+                        {"id": pdf_id, "name": os.path.basename(path), "key": path},
+                    )
+                tasks.process_pdf(pdf_id, path)
+                if not skip_embed:
+                    embed_pdf(pdf_id)
+
+        with tasks.engine.connect() as conn:
+            pages, chunks = conn.execute(
+                text("""
+                    SELECT (SELECT COALESCE(SUM(page_count), 0) FROM pdf_metadata WHERE id = ANY(CAST(:ids AS uuid[]))),
+                           (SELECT COUNT(*) FROM pdf_chunks
+                            WHERE pdf_metadata_id = ANY(CAST(:ids AS uuid[])) AND chunk_type = 'CHILD')
+                """),
+                {"ids": ids},
+            ).one()
+    finally:
+        if not keep and ids:
+            with tasks.engine.begin() as conn:
+                conn.execute(
+                    text("DELETE FROM pdf_metadata WHERE id = ANY(CAST(:ids AS uuid[]))"),
+                    {"ids": ids},
+                )
+
+    return {
+        "pages": int(pages),
+        "chunks": int(chunks),
+        **rates(meter.seconds, int(pages), int(chunks)),
+        "peak_rss_mb": round(meter.peak_rss, 1),
+        "rss_growth_mb": round(meter.peak_rss - meter.rss_before, 1),
+        # Same stages as the ingestion ledger, summed over the profile's documents
+        "stages_ms": timings.as_ms(),
+        "items": dict(timings.counts),
+    }
+
+
+# ---------- report ----------
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Dict, baseline: Dict) -> Dict:
+    """Relative change of every throughput / RSS number also in the baseline."""
+    delta = defaultdict(dict)
+    for mode in ("isolated", "e2e"):
+        for profile, cur in report.get(mode, {}).items():
+            old = baseline.get(mode, {}).get(profile)
+            if not old:
+                continue
+            pairs = [("total", cur, old)] if mode == "e2e" else [
+                (stage, cur["stages"][stage], old["stages"][stage])
+                for stage in cur["stages"] if stage in old.get("stages", {})
+            ]
+            for stage, c, o in pairs:
+                delta[f"{mode}.{profile}"][stage] = {
+                    key: round((c[key] - o[key]) / o[key] * 100, 1)
+                    for key in ("pages_per_s", "chunks_per_s", "peak_rss_mb")
+                    if c.get(key) and o.get(key)
+                }
+    old_meta, meta = baseline.get("meta", {}), report["meta"]
+    return {
+        "baseline_commit": old_meta.get("commit"),
+        # Throughput is only comparable for the same corpus and optional models
+        "same_settings": all(
+            old_meta.get(key) == meta.get(key)
+            for key in ("scale", "seed", "ocr_available", "spacy_available", "embedding_model")
+        ),
+        "percent_change": delta,
+    }
+
+
+def run(args):
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    unknown = set(profiles) - set(PROFILES)
+    if unknown:
+        raise SystemExit(f"Unknown profiles: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="ingest_bench_")
+    try:
+        corpus = generate_corpus(workdir, profiles, args.scale, args.seed)
+
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "python": sys.version.split()[0],
+                "scale": args.scale,
+                "seed": args.seed,
+                "ocr_available": tasks._OCR_AVAILABLE,
+                "spacy_available": tasks._SPACY_AVAILABLE,
+                "embedding_model": None if args.skip_embed else settings.embedding_model_name,
+                "io_mode": settings.ingest_io_mode,
+            },
+            "corpus": {
+                name: {"documents": len(paths), "bytes": sum(os.path.getsize(p) for p in paths)}
+                for name, paths in corpus.items()
+            },
+            "isolated": {},
+        }
+
+        # Model / tokenizer loads are one-off costs, not throughput
+        chunk_document_page("The model measured the load. " * 5, 1)
+        extract_triples("The model measured the thermal load.")
+        if not args.skip_embed:
+            generate_embeddings(["warmup"])
+        for name, paths in corpus.items():
+            report["isolated"][name] = run_isolated(paths, args.skip_embed)
+
+        if args.e2e:
+            prepare_e2e(workdir)
+            report["e2e"] = {
+                name: run_e2e(paths, args.skip_embed, args.keep) for name, paths in corpus.items()
+            }
+
+        report["meta"]["peak_rss_mb"] = round(peak_rss_mb(), 1)
+        if args.baseline:
+            with open(args.baseline) as f:
+                report["comparison"] = compare(report, json.load(f))
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profiles", default=",".join(PROFILES),
+                        help=f"comma-separated subset of {', '.join(PROFILES)}")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies pages per document")
+    parser.add_argument("--skip-embed", action="store_true", help="skip the embedding stage (no model download)")
+    parser.add_argument("--e2e", action="store_true", help="also run process_pdf / embed_pdf (needs DATABASE_URL)")
+    parser.add_argument("--keep", action="store_true", help="keep the --e2e documents in the database")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--out", help="write the JSON report here")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
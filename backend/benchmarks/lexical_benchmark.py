@@ -0,0 +1,185 @@
+"""
+Lexical backend benchmark: Postgres ts_rank_cd vs the in-process BM25 index.
+
+Builds a throwaway BM25 index from the child chunks already in the database,
+then runs the same queries through both backends (including the chunk text
+fetch) and reports latency percentiles, index size and memory.
+
+    cd backend
+    python -m benchmarks.lexical_benchmark --queries queries.txt --out lexical.json
+
+Without --queries, queries are sampled from chunk text.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import async_session
+from app.services.lexical import bm25_index
+from app.services.lexical.bm25_index import BM25LexicalBackend, IndexedChunk, index_pdf, compact
+from app.services.lexical.postgres import PostgresLexicalBackend
+from app.services.search.utils import tokens
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def dir_size_mb(path: str) -> float:
+    total = 0
+    for base, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(base, f)) for f in files)
+    return total / (1024 * 1024)
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+    }
+
+
+async def load_chunks(db, limit_pdfs: int):
+    rows = (await db.execute(text("""
+        SELECT id, parent_chunk_id, pdf_metadata_id, page_num, chunk_index, chunk_text
+        FROM pdf_chunks
+        WHERE chunk_type = 'CHILD'
+        ORDER BY pdf_metadata_id, page_num, chunk_index
+    """))).fetchall()
+
+    by_pdf: Dict[str, List[IndexedChunk]] = defaultdict(list)
+    for r in rows:
+        pdf_id = str(r.pdf_metadata_id)
+        if pdf_id not in by_pdf and limit_pdfs and len(by_pdf) >= limit_pdfs:
+            continue
+        by_pdf[pdf_id].append(IndexedChunk(
+            chunk_id=str(r.id),
+            parent_chunk_id=str(r.parent_chunk_id) if r.parent_chunk_id else None,
+            page=r.page_num,
+            chunk_index=r.chunk_index,
+            text=r.chunk_text,
+        ))
+    return by_pdf
+
+
+def sample_queries(by_pdf, n: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    chunks = [c for cs in by_pdf.values() for c in cs]
+    queries = []
+    while chunks and len(queries) < n:
+        toks = tokens(rng.choice(chunks).text)
+        if len(toks) >= 2:
+            queries.append(" ".join(rng.sample(toks, min(len(toks), rng.randint(2, 4)))))
+    return queries
+
+
+async def time_backend(backend, db, queries, pdf_ids, k, warmup):
+    for q in queries[:warmup]:
+        await backend.search(db, q, pdf_ids, k)
+
+    latencies, hits = [], []
+    for q in queries:
+        start = time.perf_counter()
+        res = await backend.search(db, q, pdf_ids, k)
+        latencies.append(time.perf_counter() - start)
+        hits.append({h["chunk_id"] for h in res})
+    return latencies, hits
+
+
+async def run(args):
+    workdir = tempfile.mkdtemp(prefix="bm25_bench_")
+    settings.bm25_index_dir = workdir
+    bm25_index._index = None
+
+    try:
+        async with async_session() as db:
+            by_pdf = await load_chunks(db, args.pdfs)
+            if not by_pdf:
+                raise SystemExit("No chunks in the database")
+
+            rss_before = peak_rss_mb()
+            start = time.perf_counter()
+            for pdf_id, chunks in by_pdf.items():
+                index_pdf(pdf_id, chunks, root=workdir)
+            segments = len(by_pdf)
+            if args.compact:
+                compact(workdir)
+                segments = 1
+            build_s = time.perf_counter() - start
+
+            if args.queries:
+                with open(args.queries) as f:
+                    queries = [line.strip() for line in f if line.strip()]
+            else:
+                queries = sample_queries(by_pdf, args.n, args.seed)
+
+            pdf_ids = [UUID(p) for p in by_pdf]
+
+            pg_lat, pg_hits = await time_backend(
+                PostgresLexicalBackend(), db, queries, pdf_ids, args.k, args.warmup
+            )
+            bm_lat, bm_hits = await time_backend(
+                BM25LexicalBackend(), db, queries, pdf_ids, args.k, args.warmup
+            )
+
+        overlap = [
+            len(a & b) / max(len(a | b), 1) for a, b in zip(pg_hits, bm_hits)
+        ]
+        report = {
+            "pdfs": len(by_pdf),
+            "chunks": sum(len(c) for c in by_pdf.values()),
+            "queries": len(queries),
+            "k": args.k,
+            "postgres": percentiles(pg_lat),
+            "bm25": {
+                **percentiles(bm_lat),
+                "segments": segments,
+                "build_s": round(build_s, 3),
+                "index_mb": round(dir_size_mb(workdir), 3),
+            },
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "peak_rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+            "mean_jaccard_vs_postgres": round(float(np.mean(overlap)), 3) if overlap else None,
+        }
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", help="file with one query per line")
+    parser.add_argument("--n", type=int, default=200, help="sampled queries when --queries is not given")
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--pdfs", type=int, default=0, help="limit indexed documents (0 = all)")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--compact", action="store_true", help="merge segments before querying")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Search latency / recall harness over a labeled corpus.
+
+Replays labeled queries through the real search pipeline (semantic_ranked:
+retrieval channels, fusion and rerank, within the search deadline) for
+every combination of knob settings, at the given concurrency, and reports
+p50/p95/p99 latency with recall@k and MRR per configuration. The "best"
+entry is the configuration with the lowest p95 that meets --min-recall.
+
+    cd backend
+    # Synthetic corpus: PDFs with planted facts, ingested into a throwaway
+    # Postgres (DATABASE_URL) and a temporary local vector store
+    python -m benchmarks.search_benchmark --build 20 \\
+        --set search_semantic_k=10,30,50 --set rerank_lexical_weight=0.25,0.35 \\
+        --concurrency 4 --min-recall 0.9 --out search.json
+
+    # Existing corpus: one JSON object per line,
+    # {"query": "...", "relevant": [["<document id>", <page>], ...]}
+    python -m benchmarks.search_benchmark --labels labels.jsonl --set search_lexical_k=20,50
+
+Knobs are Settings fields (search_semantic_k, search_lexical_k,
+search_triple_k, rerank_*_weight, rerank_guard_min_*, semantic_route_*,
+lexical_backend...). Admission control is not involved: the harness calls
+the pipeline directly, --concurrency searches at a time.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select, text
+
+from app.config import settings
+from app.database import async_session
+from app.models import PDFMetadata
+from app.routers.search import search_meta, semantic_ranked
+from app.services.search.deadline import request_deadline
+from benchmarks.ingestion_benchmark import PAGE_RECT, TEXT_RECT, git_commit, paragraph, prepare_e2e
+
+RECALL_KS = (1, 5, 10)
+
+# Planted facts use their own vocabulary, so only their page answers them
+FACT_ADJECTIVES = ["cobalt", "porous", "cryogenic", "ferric", "laminar", "ionic", "graphene",
+                   "ceramic", "tidal", "phased", "magnetic", "saline", "orbital", "ductile"]
+FACT_NOUNS = ["membrane", "turbine", "lattice", "catalyst", "bearing", "coating", "antenna",
+              "filter", "valve", "electrode", "resin", "gasket", "rotor", "capacitor"]
+FACT_VERBS = ["halved", "doubled", "stabilized", "suppressed", "accelerated", "tripled"]
+FACT_EFFECTS = ["hydrogen crossover", "blade fatigue", "thermal drift", "oxide growth",
+                "bearing wear", "signal attenuation", "salt intrusion", "vortex shedding",
+                "charge leakage", "creep deformation", "pore clogging", "phase noise"]
+SYLLABLES = ["qua", "vel", "dor", "rix", "tan", "mor", "zen", "ka", "lu", "pir", "sol", "ved"]
+
+
+def invented_name(rng: random.Random, used: set) -> str:
+    while True:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(3)).capitalize()
+        if name not in used:
+            used.add(name)
+            return name
+
+
+def planted_fact(rng: random.Random, used: set) -> Tuple[str, Dict[str, str]]:
+    """A fact sentence and queries answered only by it, one per style."""
+    name = invented_name(rng, used)
+    thing = f"{rng.choice(FACT_ADJECTIVES)} {rng.choice(FACT_NOUNS)}"
+    verb, effect = rng.choice(FACT_VERBS), rng.choice(FACT_EFFECTS)
+    percent = rng.randint(5, 95)
+    sentence = f"The {name} {thing} {verb} {effect} by {percent} percent in field tests."
+    return sentence, {
+        "keyword": f"{name} {thing} {effect}",
+        "question": f"Which {thing} {verb} {effect}?",
+        # Multi-sentence queries go through the rerank guardrail
+        "long": f"Which {thing} {verb} {effect}. The reduction was about {percent} percent in field tests.",
+    }
+
+
+def write_fact_pdf(path: str, pages: int, facts: Dict[int, str], rng: random.Random):
+    import fitz
+
+    doc = fitz.open()
+    for page_num in range(1, pages + 1):
+        paragraphs = [paragraph(rng, rng.randint(4, 7)) for _ in range(4)]
+        if page_num in facts:
+            paragraphs.insert(rng.randrange(len(paragraphs) + 1), facts[page_num])
+        page = doc.new_page(width=PAGE_RECT.width, height=PAGE_RECT.height)
+        page.insert_textbox(TEXT_RECT, "\n\n".join(paragraphs), fontsize=9)
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+def build_corpus(workdir: str, docs: int, pages: int, facts_per_doc: int, styles: Sequence[str],
+                 seed: int) -> Tuple[List[Dict], List[str]]:
+    """Generate and ingest the synthetic corpus; returns labels and document ids."""
+    from app.worker import tasks
+    from app.worker.tasks_embedding import embed_pdf
+
+    prepare_e2e(workdir)
+    rng = random.Random(seed)
+    used: set = set()
+    labels, ids = [], []
+    for d in range(docs):
+        pdf_id = str(uuid.uuid4())
+        path = os.path.join(workdir, f"corpus_{d}.pdf")
+        facts = {}
+        for page_num in rng.sample(range(1, pages + 1), min(facts_per_doc, pages)):
+            sentence, queries = planted_fact(rng, used)
+            facts[page_num] = sentence
+            labels.extend(
+                {"query": queries[style], "style": style, "relevant": [[pdf_id, page_num]]}
+                for style in styles
+            )
+        write_fact_pdf(path, pages, facts, rng)
+
+        with tasks.engine.begin() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO pdf_metadata (id, filename, object_key, status, created_at, updated_at)
+                    VALUES (:id, :name, :key, 'PENDING', now(), now())
+                """),
+                {"id": pdf_id, "name": os.path.basename(path), "key": path},
+            )
+        ids.append(pdf_id)
+        tasks.process_pdf(pdf_id, path)
+        embed_pdf(pdf_id)
+    return labels, ids
+
+
+def delete_documents(ids: List[str]):
+    from app.worker import tasks
+
+    with tasks.engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM pdf_metadata WHERE id = ANY(CAST(:ids AS uuid[]))"), {"ids": ids}
+        )
+
+
+async def load_scope(doc_ids: Optional[List[str]]) -> Dict[str, PDFMetadata]:
+    """artifact id -> document, as the search endpoint builds it."""
+    query = select(PDFMetadata).where(PDFMetadata.status == "COMPLETED")
+    if doc_ids:
+        query = query.where(PDFMetadata.id.in_([uuid.UUID(i) for i in doc_ids]))
+    async with async_session() as db:
+        docs = (await db.execute(query)).scalars().all()
+    id_map = {}
+    for d in docs:
+        id_map.setdefault(str(d.artifact_id), d)
+    return id_map
+
+
+# ---------- knobs ----------
+
+def parse_grid(assignments: List[str]) -> List[Dict]:
+    """["a=1,2", "b=x"] -> [{"a": 1, "b": "x"}, {"a": 2, "b": "x"}], typed like Settings."""
+    axes = []
+    for item in assignments:
+        key, _, values = item.partition("=")
+        key = key.strip()
+        if not hasattr(settings, key):
+            raise SystemExit(f"Unknown setting: {key}")
+        kind = type(getattr(settings, key))
+        cast = (lambda v: v.lower() in ("1", "true", "yes")) if kind is bool else kind
+        axes.append([(key, cast(v.strip())) for v in values.split(",") if v.strip()])
+    return [dict(combo) for combo in itertools.product(*axes)] if axes else [{}]
+
+
+def apply_knobs(knobs: Dict) -> Dict:
+    previous = {key: getattr(settings, key) for key in knobs}
+    for key, value in knobs.items():
+        setattr(settings, key, value)
+    return previous
+
+
+# ---------- replay ----------
+
+def ranked_pages(search) -> List[Tuple[str, int]]:
+    seen, pages = set(), []
+    for hit in search.hits:
+        key = (hit.document_id, hit.page)
+        if key not in seen:
+            seen.add(key)
+            pages.append(key)
+    return pages
+
+
+def score(pages: List[Tuple[str, int]], relevant: set) -> Dict[str, float]:
+    out = {
+        f"recall@{k}": len(relevant & set(pages[:k])) / len(relevant) for k in RECALL_KS
+    }
+    first = next((rank for rank, p in enumerate(pages, 1) if p in relevant), None)
+    out["rr"] = 1.0 / first if first else 0.0
+    return out
+
+
+async def replay(labels: List[Dict], id_map, concurrency: int, deadline_ms: Optional[int]) -> List[Dict]:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(label: Dict) -> Dict:
+        async with gate:
+            started = time.perf_counter()
+            search, report, rerank_info = await semantic_ranked(
+                label["query"], "benchmark", id_map, request_deadline(deadline_ms)
+            )
+            latency = time.perf_counter() - started
+        relevant = {(str(doc), int(page)) for doc, page in label["relevant"]}
+        return {
+            "latency": latency,
+            "partial": search_meta(report, rerank_info)["partial"],
+            "style": label.get("style"),
+            **score(ranked_pages(search), relevant),
+        }
+
+    return await asyncio.gather(*(one(label) for label in labels))
+
+
+def summarize(results: List[Dict], wall_s: float) -> Dict:
+    lat = np.asarray([r["latency"] for r in results]) * 1000
+    out = {
+        "queries": len(results),
+        "p50_ms": round(float(np.percentile(lat, 50)), 2),
+        "p95_ms": round(float(np.percentile(lat, 95)), 2),
+        "p99_ms": round(float(np.percentile(lat, 99)), 2),
+        "mean_ms": round(float(lat.mean()), 2),
+        "qps": round(len(results) / wall_s, 2) if wall_s else None,
+        "partial": sum(1 for r in results if r["partial"]),
+        "mrr": round(float(np.mean([r["rr"] for r in results])), 4),
+    }
+    for k in RECALL_KS:
+        out[f"recall@{k}"] = round(float(np.mean([r[f"recall@{k}"] for r in results])), 4)
+
+    styles = sorted({r["style"] for r in results if r["style"]})
+    if len(styles) > 1:
+        out["by_style"] = {
+            style: {
+                "mrr": round(float(np.mean([r["rr"] for r in results if r["style"] == style])), 4),
+                **{
+                    f"recall@{k}": round(float(np.mean(
+                        [r[f"recall@{k}"] for r in results if r["style"] == style]
+                    )), 4)
+                    for k in RECALL_KS
+                },
+            }
+            for style in styles
+        }
+    return out
+
+
+async def run_configs(labels, id_map, grid: List[Dict], args) -> List[Dict]:
+    reports = []
+    for knobs in grid:
+        previous = apply_knobs(knobs)
+        try:
+            # Warm caches and lazy model loads outside the measurement
+            await replay(labels[: args.warmup], id_map, 1, args.deadline_ms)
+            started = time.perf_counter()
+            results = await replay(labels, id_map, args.concurrency, args.deadline_ms)
+            wall_s = time.perf_counter() - started
+        finally:
+            apply_knobs(previous)
+        reports.append({"knobs": knobs, **summarize(results, wall_s)})
+        print(json.dumps(reports[-1]))
+    return reports
+
+
+def pick_best(reports: List[Dict], recall_k: int, min_recall: float, min_mrr: float) -> Optional[Dict]:
+    """Fastest (p95) configuration meeting the quality bar."""
+    passing = [
+        r for r in reports
+        if r[f"recall@{recall_k}"] >= min_recall and r["mrr"] >= min_mrr
+    ]
+    return min(passing, key=lambda r: r["p95_ms"]) if passing else None
+
+
+def run(args):
+    if not args.build and not args.labels:
+        raise SystemExit("Pass --build N (synthetic corpus) or --labels FILE (existing corpus)")
+    if args.recall_k not in RECALL_KS:
+        raise SystemExit(f"--recall-k must be one of {RECALL_KS}")
+
+    grid = parse_grid(args.set or [])
+    styles = [s.strip() for s in args.styles.split(",") if s.strip()]
+    workdir = tempfile.mkdtemp(prefix="search_bench_")
+    ids: List[str] = []
+    try:
+        if args.build:
+            labels, ids = build_corpus(
+                workdir, args.build, args.pages, args.facts, styles, args.seed
+            )
+            if args.labels_out:
+                with open(args.labels_out, "w") as f:
+                    f.writelines(json.dumps(label) + "\n" for label in labels)
+        else:
+            with open(args.labels) as f:
+                labels = [json.loads(line) for line in f if line.strip()]
+
+        if args.limit:
+            labels = random.Random(args.seed).sample(labels, min(args.limit, len(labels)))
+
+        id_map = asyncio.run(load_scope(ids or None))
+        if not id_map:
+            raise SystemExit("No COMPLETED documents to search")
+
+        reports = asyncio.run(run_configs(labels, id_map, grid, args))
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "documents": len(id_map),
+                "queries": len(labels),
+                "concurrency": args.concurrency,
+                "deadline_ms": args.deadline_ms if args.deadline_ms is not None else settings.search_deadline_ms,
+                "vector_backend": settings.vector_backend,
+                "lexical_backend": settings.lexical_backend,
+                "seed": args.seed,
+            },
+            "configs": reports,
+            "quality_bar": {
+                f"recall@{args.recall_k}": args.min_recall,
+                "mrr": args.min_mrr,
+            },
+            "best": pick_best(reports, args.recall_k, args.min_recall, args.min_mrr),
+        }
+
+    finally:
+        if ids and not args.keep:
+            delete_documents(ids)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--build", type=int, default=0, help="synthetic corpus of N documents")
+    parser.add_argument("--pages", type=int, default=10, help="pages per synthetic document")
+    parser.add_argument("--facts", type=int, default=3, help="planted facts (labeled pages) per document")
+    parser.add_argument("--styles", default="keyword,question,long", help="query styles per fact")
+    parser.add_argument("--labels", help="JSONL labels for an existing corpus")
+    parser.add_argument("--labels-out", help="write the synthetic corpus labels here")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic documents in the database")
+    parser.add_argument("--set", action="append", metavar="KNOB=V1,V2",
+                        help="setting values to try (repeat; the grid is their product)")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--deadline-ms", type=int, help="search deadline (default: search_deadline_ms)")
+    parser.add_argument("--limit", type=int, default=0, help="sample this many queries (0 = all)")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--recall-k", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=0.0)
+    parser.add_argument("--min-mrr", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+-- Migration: Whole-document deduplication by content hash
+-- Version: 004
+-- Date: 2026-10-18
+-- Description: Adds content_hash/source_id so identical uploads share chunks, triples and vectors
+
+ALTER TABLE pdf_metadata
+ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64),
+ADD COLUMN IF NOT EXISTS source_id UUID;
+
+-- Identical uploads reference the same MinIO object, so object_key is no longer unique
+ALTER TABLE pdf_metadata DROP CONSTRAINT IF EXISTS pdf_metadata_object_key_key;
+
+CREATE INDEX IF NOT EXISTS idx_pdf_metadata_object_key
+    ON pdf_metadata(object_key);
+
+-- Lookup of the artifact owner for a given hash
+CREATE INDEX IF NOT EXISTS idx_pdf_metadata_content_hash
+    ON pdf_metadata(content_hash)
+    WHERE source_id IS NULL;
+
+-- Reference counting: all rows sharing one owner's artifacts
+CREATE INDEX IF NOT EXISTS idx_pdf_metadata_source_id
+    ON pdf_metadata(source_id);
+
+COMMENT ON COLUMN pdf_metadata.content_hash IS 'SHA-256 of the uploaded PDF bytes';
+COMMENT ON COLUMN pdf_metadata.source_id IS 'Owner row whose chunks, triples and vectors this document reuses (NULL = owns its artifacts)';
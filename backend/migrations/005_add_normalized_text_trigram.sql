@@ -0,0 +1,13 @@
+-- Migration: Trigram index for exact phrase / identifier search
+-- Version: 005
+-- Date: 2026-10-18
+-- Description: pg_trgm GIN index on pdf_chunks.normalized_text for LIKE '%...%' lookups
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Exact search only scans parent chunks (children repeat the same text)
+CREATE INDEX IF NOT EXISTS idx_pdf_chunks_normalized_trgm
+    ON pdf_chunks USING GIN (normalized_text gin_trgm_ops)
+    WHERE chunk_type = 'PARENT';
+
+COMMENT ON COLUMN pdf_chunks.normalized_text IS 'Lowercased text without punctuation, single-spaced (search.utils.normalize_text)';
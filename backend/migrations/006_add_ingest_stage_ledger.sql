@@ -0,0 +1,23 @@
+-- Migration: Per-document ingestion stage ledger
+-- Version: 006
+-- Date: 2026-10-18
+-- Description: Stage durations and item counts of process_pdf / embed_pdf per document
+
+CREATE TABLE IF NOT EXISTS ingest_stages (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    pdf_metadata_id UUID NOT NULL REFERENCES pdf_metadata(id) ON DELETE CASCADE,
+    task VARCHAR(64) NOT NULL,
+    stage VARCHAR(64) NOT NULL,
+    duration_ms DOUBLE PRECISION NOT NULL,
+    item_count BIGINT,
+    recorded_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    -- A retried task replaces its rows
+    CONSTRAINT uq_ingest_stages_pdf_task_stage UNIQUE (pdf_metadata_id, task, stage)
+);
+
+-- Slowest documents: task wall times are stored as stage 'total'
+CREATE INDEX IF NOT EXISTS idx_ingest_stages_stage_duration
+    ON ingest_stages(stage, duration_ms DESC);
+
+COMMENT ON TABLE ingest_stages IS 'Per-document ingestion timings (app/worker/ledger.py)';
+COMMENT ON COLUMN ingest_stages.item_count IS 'Items handled by the stage: pages, chunks, rows, tokens, points (bytes for download)';
@@ -0,0 +1,16 @@
+-- Migration: Punctuation as token separator in normalized_text
+-- Version: 007
+-- Date: 2026-10-18
+-- Description: Recompute pdf_chunks.normalized_text with punctuation mapped to spaces
+
+-- Same transform as search.utils.normalize_text: lowercase, ASCII
+-- punctuation -> space, whitespace runs collapsed, trimmed
+UPDATE pdf_chunks
+SET normalized_text = btrim(regexp_replace(
+        translate(lower(chunk_text),
+                  '!"#$%&''()*+,-./:;<=>?@[\]^_`{|}~',
+                  '                                '),
+        '\s+', ' ', 'g'))
+WHERE chunk_text IS NOT NULL;
+
+COMMENT ON COLUMN pdf_chunks.normalized_text IS 'Lowercased text, punctuation replaced by spaces, single-spaced (search.utils.normalize_text)';
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.services.search.admission import AdmissionController, AdmissionRejected
+
+
+def _controller(max_concurrent=1, max_queue=4, max_per_user=3, queue_timeout_ms=1000):
+    return AdmissionController(max_concurrent, max_queue, max_per_user, queue_timeout_ms)
+
+
+def test_release_is_idempotent():
+    async def run():
+        ctl = _controller(max_concurrent=2)
+        slot = await ctl.acquire("a")
+        assert ctl.running == 1
+        slot.release()
+        slot.release()
+        assert ctl.running == 0
+        assert ctl.stats()["admitted"] == 1
+
+    asyncio.run(run())
+
+
+def test_rejects_user_over_limit_and_full_queue():
+    async def run():
+        ctl = _controller(max_queue=1, max_per_user=1)
+        await ctl.acquire("a")
+        with pytest.raises(AdmissionRejected) as e:
+            await ctl.acquire("a")
+        assert e.value.reason == "user_limit"
+        assert e.value.retry_after >= 1
+
+        waiter = asyncio.create_task(ctl.acquire("b"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as e:
+            await ctl.acquire("c")
+        assert e.value.reason == "queue_full"
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert ctl.queued == 0
+        assert ctl.rejected == {"queue_full": 1, "user_limit": 1, "timeout": 0}
+
+    asyncio.run(run())
+
+
+def test_waiters_are_served_round_robin():
+    async def run():
+        ctl = _controller()
+        slot = await ctl.acquire("x")
+        order = []
+
+        async def search(user):
+            async with await ctl.acquire(user):
+                order.append(user)
+
+        tasks = [asyncio.create_task(search(u)) for u in ("a", "a", "a", "b")]
+        await asyncio.sleep(0)
+        assert ctl.queued == 4 and ctl.stats()["waitingUsers"] == 2
+
+        slot.release()
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "a", "a"]
+        assert ctl.running == 0 and ctl.queued == 0
+
+    asyncio.run(run())
+
+
+def test_queue_timeout_rejects_and_unqueues():
+    async def run():
+        ctl = _controller(queue_timeout_ms=20)
+        slot = await ctl.acquire("a")
+        with pytest.raises(AdmissionRejected) as e:
+            await ctl.acquire("b")
+        assert e.value.reason == "timeout"
+        assert ctl.queued == 0 and ctl.stats()["waitingUsers"] == 0
+
+        # The timed-out user holds nothing: a later request is admitted
+        slot.release()
+        (await ctl.acquire("b")).release()
+        assert ctl.running == 0
+
+    asyncio.run(run())
+
+
+def test_slot_granted_to_cancelled_waiter_is_returned():
+    async def run():
+        ctl = _controller()
+        slot = await ctl.acquire("a")
+        waiter = asyncio.create_task(ctl.acquire("b"))
+        await asyncio.sleep(0)
+
+        # Cancelled, then granted before the waiter gets to run
+        waiter.cancel()
+        slot.release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert ctl.running == 0 and ctl.queued == 0
+        (await ctl.acquire("b")).release()
+
+    asyncio.run(run())
@@ -0,0 +1,115 @@
+import os
+import shutil
+
+from app.services.lexical import bm25_index
+from app.services.lexical.bm25_index import BM25Index, IndexedChunk, compact, index_pdf, tombstone_pdfs
+
+
+def _chunks(pdf: str, *texts: str):
+    return [
+        IndexedChunk(chunk_id=f"{pdf}-{i}", parent_chunk_id=None, page=1, chunk_index=i, text=t)
+        for i, t in enumerate(texts)
+    ]
+
+
+def test_search_scores_and_tombstones(tmp_path):
+    root = str(tmp_path)
+    index_pdf("a", _chunks("a", "pump pressure alarm", "cooling water flow"), root=root)
+    index_pdf("b", _chunks("b", "pump bearing wear"), root=root)
+    index = BM25Index(root)
+
+    hits = index.search("pump pressure", ["a", "b"], k=5)
+    assert [h["chunk_id"] for h in hits] == ["a-0", "b-0"]
+    assert [h["chunk_id"] for h in index.search("pump", ["b"], k=5)] == ["b-0"]
+
+    tombstone_pdfs(["a"], root=root)
+    assert [h["chunk_id"] for h in index.search("pump", ["a", "b"], k=5)] == ["b-0"]
+    assert index.live_pdf_ids() == {"b"}
+
+
+def test_compaction_keeps_live_docs(tmp_path):
+    root = str(tmp_path)
+    for pdf in "abc":
+        index_pdf(pdf, _chunks(pdf, f"valve {pdf}x report"), root=root)
+    tombstone_pdfs(["b"], root=root)
+
+    assert compact(root) is not None
+
+    index = BM25Index(root)
+    assert len(index.live_pdf_ids()) == 2
+    assert [h["pdf_id"] for h in index.search("valve", ["a", "b", "c"], k=5)] in (["a", "c"], ["c", "a"])
+
+
+def test_refresh_skips_segment_removed_by_compaction(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    index_pdf("a", _chunks("a", "pump pressure alarm"), root=root)
+    index_pdf("b", _chunks("b", "pump bearing wear"), root=root)
+    listed = sorted(n for n in os.listdir(root) if n.startswith("seg_"))
+
+    # compact() merges and removes the segments right after the first listing
+    real_listdir = os.listdir
+    calls = {"n": 0}
+
+    def racing_listdir(path):
+        names = real_listdir(path)
+        if path == root and calls["n"] == 0:
+            calls["n"] += 1
+            compact(root)
+        return names
+
+    monkeypatch.setattr(bm25_index.os, "listdir", racing_listdir)
+    index = BM25Index(root)
+    hits = index.search("pump", ["a", "b"], k=5)
+
+    assert {h["chunk_id"] for h in hits} == {"a-0", "b-0"}
+    assert not set(index.segments) & set(listed)
+
+
+def test_refresh_gives_up_after_repeated_races(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    index_pdf("a", _chunks("a", "pump pressure alarm"), root=root)
+    index_pdf("b", _chunks("b", "pump bearing wear"), root=root)
+    gone = sorted(n for n in os.listdir(root) if n.startswith("seg_"))[0]
+    shutil.copytree(os.path.join(root, gone), str(tmp_path / "keep"))
+    shutil.rmtree(os.path.join(root, gone))
+
+    real_listdir = os.listdir
+    monkeypatch.setattr(
+        bm25_index.os, "listdir",
+        lambda path: real_listdir(path) + [gone] if path == root else real_listdir(path),
+    )
+    index = BM25Index(root)
+
+    # The missing segment is skipped, not raised, and the next refresh re-lists
+    assert [h["chunk_id"] for h in index.search("pump", ["a", "b"], k=5)]
+    assert index._stamp is None
+
+
+def test_failed_segment_removal_keeps_tombstones(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    for pdf in "ab":
+        index_pdf(pdf, _chunks(pdf, f"valve {pdf}x report"), root=root)
+    tombstone_pdfs(["b"], root=root)
+    index_pdf("c", _chunks("c", "valve cx report"), root=root)
+
+    # The sources stay on disk, as when a mapped file cannot be removed
+    real_rmtree = shutil.rmtree
+
+    def failing_rmtree(path, *args, **kwargs):
+        raise PermissionError(path)
+
+    monkeypatch.setattr(bm25_index.shutil, "rmtree", failing_rmtree)
+    assert compact(root) is not None
+
+    assert len([n for n in os.listdir(root) if n.startswith("seg_")]) == 4
+    assert os.listdir(os.path.join(root, "tombstones")) == ["b"]
+    hits = BM25Index(root).search("valve", ["a", "b", "c"], k=10)
+    assert sorted(h["chunk_id"] for h in hits) == ["a-0", "c-0"]
+
+    # The next compaction retries the cleanup
+    monkeypatch.setattr(bm25_index.shutil, "rmtree", real_rmtree)
+    assert compact(root) is None
+    assert len([n for n in os.listdir(root) if n.startswith("seg_")]) == 1
+    assert os.listdir(os.path.join(root, "tombstones")) == []
+    hits = BM25Index(root).search("valve", ["a", "b", "c"], k=10)
+    assert sorted(h["chunk_id"] for h in hits) == ["a-0", "c-0"]
@@ -0,0 +1,89 @@
+import pytest
+
+from app.services.qdrant import breaker as breaker_module
+from app.services.qdrant import qdrant_client as collection_state
+from app.services.qdrant import qdrant_search
+from app.services.qdrant.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker_module.time, "monotonic", clock)
+    return clock
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout_s=10)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.record_success()  # a success resets the count
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert not breaker.available()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["trips"] == 1
+    assert breaker.stats()["shortCircuited"] == 1
+
+
+def test_half_open_admits_one_probe(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout_s=10)
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.available()
+    breaker.before_call()  # the probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.available()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.available()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout_s=10)
+    for _ in range(5):
+        breaker.record_failure()
+
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.stats()["trips"] == 2
+    clock.now += 9
+    assert not breaker.available()
+    clock.now += 1
+    assert breaker.available()
+
+
+def test_cached_collection_state_bypasses_breaker(clock, monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout_s=10)
+    monkeypatch.setattr(qdrant_search, "vector_breaker", breaker)
+    monkeypatch.setattr(collection_state, "_sparse_enabled", True)
+
+    breaker.record_failure()
+    assert qdrant_search.hybrid_available()
+    assert breaker.failures == 1  # not reset by a cached answer
+
+    breaker.record_failure()
+    clock.now += 10
+    assert qdrant_search.hybrid_available()
+    assert breaker.available()  # the half-open probe is still free
@@ -0,0 +1,49 @@
+import pytest
+
+from app.services.search.exact import find_offsets, snippet_around
+from app.services.search.utils import normalize_text, normalize_with_offsets
+
+
+@pytest.mark.parametrize("raw, normalized", [
+    ("AB-1234", "ab 1234"),
+    ("ab 1234", "ab 1234"),
+    ("AB_1234", "ab 1234"),
+    ("AB1234", "ab1234"),
+    ("v1.2.3", "v1 2 3"),
+    ("  Pump,\tpressure --  alarm! ", "pump pressure alarm"),
+    ("---", ""),
+])
+def test_normalize_text(raw, normalized):
+    assert normalize_text(raw) == normalized
+
+
+@pytest.mark.parametrize("raw", [
+    "AB-1234", "Error: E-17 (see p. 4)", "  lead\n\ntrail  ", "a--b", "ÄÖ-ß", "",
+])
+def test_offsets_agree_with_normalize_text(raw):
+    normalized, positions = normalize_with_offsets(raw)
+    assert normalized == normalize_text(raw)
+    assert len(positions) == len(normalized)
+    assert positions == sorted(positions)
+    for ch, i in zip(normalized, positions):
+        assert ch == " " or ch in raw[i].lower()
+
+
+def test_find_offsets_maps_back_to_original_text():
+    text = "Replace part AB-1234 now; ab 1234 is the same part."
+    spans = find_offsets(text, normalize_text("AB-1234"))
+    assert [text[s:e] for s, e in spans] == ["AB-1234", "ab 1234"]
+
+
+def test_find_offsets_requires_token_boundaries():
+    text = "Use the X500 kit, not X5. The x5 fits; ax5 does not."
+    assert [text[s:e] for s, e in find_offsets(text, "x5")] == ["X5", "x5"]
+    assert find_offsets("ab1234", "ab 1234") == []
+    assert find_offsets("AB-12345", "ab 1234") == []
+
+
+def test_snippet_offsets_are_relative():
+    text = "word " * 40 + "AB-1234 " + "word " * 40
+    snippet, offsets = snippet_around(text, find_offsets(text, "ab 1234"))
+    assert len(snippet) < len(text)
+    assert [snippet[s:e] for s, e in offsets] == ["AB-1234"]
@@ -0,0 +1,84 @@
+import os
+import shutil
+
+import pytest
+from qdrant_client.http import models
+
+from app.config import settings
+from app.services.qdrant import local_store
+from app.services.qdrant.local_store import LocalVectorStore
+
+COLLECTION = "chunks"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Compaction only when a test asks for it
+    monkeypatch.setattr(settings, "local_vector_max_segments", 100)
+    store = LocalVectorStore(str(tmp_path))
+    store.create_collection(
+        COLLECTION, vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE)
+    )
+    return store
+
+
+def _upsert(store, pdf_id: str):
+    store.upsert(COLLECTION, [{"id": pdf_id, "vector": [1.0, 0.5], "payload": {"pdf_id": pdf_id}}])
+
+
+def _delete_pdf(store, pdf_id: str):
+    store.delete(COLLECTION, models.FilterSelector(filter=models.Filter(must=[
+        models.FieldCondition(key="pdf_id", match=models.MatchAny(any=[pdf_id]))
+    ])))
+
+
+def _pdf_ids(store) -> list:
+    result = store.query_points(COLLECTION, query=[1.0, 0.5], limit=10, with_payload=True)
+    return sorted(p.payload["pdf_id"] for p in result.points)
+
+
+def _dirs(root, prefix):
+    return sorted(n for n in os.listdir(os.path.join(root, COLLECTION)) if n.startswith(prefix))
+
+
+def test_compaction_drops_deleted_points(store, tmp_path):
+    for pdf_id in "ab":
+        _upsert(store, pdf_id)
+    _delete_pdf(store, "b")
+    _upsert(store, "c")
+
+    assert store.compact(COLLECTION) is not None
+
+    assert len(_dirs(tmp_path, "seg_")) == 1
+    assert os.listdir(tmp_path / COLLECTION / "deletes") == []
+    assert _pdf_ids(store) == ["a", "c"]
+    assert _pdf_ids(LocalVectorStore(str(tmp_path))) == ["a", "c"]
+
+
+def test_failed_segment_removal_keeps_deletes(store, tmp_path, monkeypatch):
+    for pdf_id in "ab":
+        _upsert(store, pdf_id)
+    _delete_pdf(store, "b")
+    _upsert(store, "c")
+
+    # The sources stay on disk, as when a mapped file cannot be removed
+    real_rmtree = shutil.rmtree
+
+    def failing_rmtree(path, *args, **kwargs):
+        raise PermissionError(path)
+
+    monkeypatch.setattr(local_store.shutil, "rmtree", failing_rmtree)
+    assert store.compact(COLLECTION) is not None
+
+    assert len(_dirs(tmp_path, "seg_")) == 4
+    assert len(os.listdir(tmp_path / COLLECTION / "deletes")) == 1
+    assert _pdf_ids(store) == ["a", "c"]
+    assert _pdf_ids(LocalVectorStore(str(tmp_path))) == ["a", "c"]
+
+    # The next refresh retries the cleanup
+    monkeypatch.setattr(local_store.shutil, "rmtree", real_rmtree)
+    _upsert(store, "d")
+    assert _pdf_ids(store) == ["a", "c", "d"]
+    assert len(_dirs(tmp_path, "seg_")) == 2
+    assert os.listdir(tmp_path / COLLECTION / "deletes") == []
+    assert _pdf_ids(LocalVectorStore(str(tmp_path))) == ["a", "c", "d"]
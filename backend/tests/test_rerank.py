@@ -0,0 +1,197 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.search.rerank import (
+    gather_sentences,
+    lexical_scores,
+    order_by_page,
+    score_candidates,
+    top_k,
+)
+from app.services.search.utils import tokens
+
+WORDS = ["pump", "valve", "pressure", "flow", "sensor", "alarm", "reset", "cooling",
+         "turbine", "filter", "bearing", "limit", "voltage", "motor", "the", "of"]
+
+
+# ---------- reference: the per-hit loop the batched scorer replaced ----------
+
+def _cos(a, b) -> float:
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    na, nb = np.linalg.norm(a), np.linalg.norm(b)
+    return float((a / (na or 1.0)) @ (b / (nb or 1.0)))
+
+
+def _lexical_sentence_score(sentence: str, query: str) -> float:
+    s, q = set(tokens(sentence)), set(tokens(query))
+    if not q:
+        return 0.0
+    overlap = len(s & q) / len(q)
+    if overlap >= 0.9:
+        return 1.0
+    if overlap >= 0.75:
+        return 0.7
+    if overlap >= 0.5:
+        return 0.5
+    return 0.0
+
+
+def _best_sentence(sentences, vectors, query_vec):
+    if not sentences:
+        return -1, 0.0
+    sims = [_cos(query_vec, v) for v in vectors]
+    idx = int(np.argmax(sims))
+    return idx, sims[idx]
+
+
+def reference_scores(hits, cand, sentence_vecs, query_vecs, query_sents):
+    """{hit index: (semantic, lexical, confidence, sentence index)} for kept hits."""
+    def own(i):
+        lo, hi = cand.offsets[i], cand.offsets[i + 1]
+        return list(range(lo, hi))
+
+    out = {}
+    for i, h in enumerate(hits):
+        rows = own(i)
+        best_idx, best_sem, best_lex = -1, 0.0, 0.0
+        for qi, qv in enumerate(query_vecs):
+            j, sem = _best_sentence(rows, [sentence_vecs[r] for r in rows], qv)
+            sent = cand.sentences[rows[j]] if j >= 0 else ""
+            if sem > best_sem:
+                best_sem, best_idx = sem, rows[j]
+            if qi < len(query_sents):
+                best_lex = max(best_lex, _lexical_sentence_score(sent, query_sents[qi]))
+
+        if len(query_sents) >= 2:
+            if best_sem < 0.4 and best_lex < 0.5 and not h.get("has_oie"):
+                continue
+
+        oie = 1.0 if h.get("has_oie") else 0.0
+        confidence = min(1.0, 0.55 * best_sem + 0.35 * best_lex + 0.10 * oie)
+        out[i] = (best_sem, best_lex, int(confidence * 100), best_idx)
+
+    if len(query_sents) >= 2 and not out:
+        for i in range(len(hits)):
+            rows = own(i)
+            j, sem = _best_sentence(rows, [sentence_vecs[r] for r in rows], query_vecs[0])
+            out[i] = (sem, 0.0, int(min(1.0, sem) * 100), rows[j] if j >= 0 else -1)
+    return out
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 9))) + "."
+
+
+def _random_case(rng: random.Random, dim: int = 8):
+    hits = []
+    for _ in range(rng.randint(0, 12)):
+        text = " ".join(_sentence(rng) for _ in range(rng.randint(0, 4)))
+        hits.append({"page": rng.randint(1, 4), "text": text, "has_oie": rng.random() < 0.2})
+    hits = order_by_page(hits)
+    query_sents = [_sentence(rng) for _ in range(rng.randint(1, 3))]
+    cand = gather_sentences(hits)
+    np_rng = np.random.default_rng(rng.randint(0, 2**32 - 1))
+    sentence_vecs = np_rng.normal(size=(len(cand.sentences), dim)).astype(np.float32)
+    query_vecs = np_rng.normal(size=(len(query_sents), dim)).astype(np.float32)
+    return hits, cand, sentence_vecs, query_vecs, query_sents
+
+
+@pytest.fixture
+def default_weights(monkeypatch):
+    # The reference hard-codes the original weights and thresholds
+    for name, value in {
+        "rerank_semantic_weight": 0.55,
+        "rerank_lexical_weight": 0.35,
+        "rerank_oie_weight": 0.10,
+        "rerank_guard_min_semantic": 0.4,
+        "rerank_guard_min_lexical": 0.5,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_per_hit_loop(seed, default_weights):
+    hits, cand, sentence_vecs, query_vecs, query_sents = _random_case(random.Random(seed))
+    expected = reference_scores(hits, cand, sentence_vecs, query_vecs, query_sents)
+
+    scores = score_candidates(hits, cand, sentence_vecs, query_vecs, query_sents)
+
+    assert set(np.flatnonzero(scores.keep)) == set(expected)
+    for i, (sem, lex, confidence, sentence) in expected.items():
+        assert scores.semantic[i] == pytest.approx(sem, abs=1e-6)
+        assert scores.lexical[i] == lex
+        assert scores.confidence[i] == confidence
+        assert scores.best_sentence[i] == sentence
+
+
+def _hit(text, has_oie=False, page=1):
+    return {"page": page, "text": text, "has_oie": has_oie}
+
+
+def test_guardrail_drops_weak_hits_unless_oie(default_weights):
+    hits = [_hit("unrelated words about something else."), _hit("unrelated words about other things.", has_oie=True)]
+    cand = gather_sentences(hits)
+    sentence_vecs = np.array([[0.0, 1.0], [0.0, 1.0]], dtype=np.float32)
+    query_vecs = np.array([[1.0, 0.0], [1.0, 0.0]], dtype=np.float32)
+    query_sents = ["pump pressure alarm.", "valve flow reset."]
+
+    scores = score_candidates(hits, cand, sentence_vecs, query_vecs, query_sents)
+
+    assert scores.keep.tolist() == [False, True]
+    assert scores.confidence[1] == 10
+    assert not scores.fallback
+
+
+def test_long_query_falls_back_to_first_vector(default_weights):
+    hits = [_hit("unrelated words about something else.")]
+    cand = gather_sentences(hits)
+    sentence_vecs = np.array([[0.3, 1.0]], dtype=np.float32)
+    query_vecs = np.array([[1.0, 0.0], [0.0, -1.0]], dtype=np.float32)
+
+    scores = score_candidates(hits, cand, sentence_vecs, query_vecs, ["pump pressure.", "valve flow."])
+
+    assert scores.fallback
+    assert scores.keep.tolist() == [True]
+    assert scores.lexical.tolist() == [0.0]
+    assert scores.best_sentence.tolist() == [0]
+
+
+def test_hit_without_sentences_scores_zero(default_weights):
+    hits = [_hit("short."), _hit("the pump pressure alarm was raised twice.")]
+    cand = gather_sentences(hits)
+    scores = score_candidates(
+        hits, cand, np.array([[1.0, 0.0]], dtype=np.float32),
+        np.array([[1.0, 0.0]], dtype=np.float32), ["pump pressure alarm"],
+    )
+
+    assert scores.best_sentence.tolist() == [-1, 0]
+    assert scores.confidence.tolist() == [0, 90]
+
+
+def test_lexical_scores_pick_best_bucket(default_weights):
+    hits = [
+        _hit("the pump pressure alarm was raised. nothing relevant is here at all."),
+        _hit("a pump was mentioned in passing here."),
+        _hit("tiny."),
+    ]
+    cand = gather_sentences(hits)
+
+    scores = lexical_scores(hits, cand, ["pump pressure alarm"])
+
+    assert scores.lexical.tolist() == [1.0, 0.0, 0.0]
+    assert scores.best_sentence.tolist() == [0, 2, -1]
+    assert scores.confidence.tolist() == [35, 0, 0]
+    assert scores.keep.all()
+
+
+def test_top_k_matches_stable_sort():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        scores = rng.integers(0, 5, size=rng.integers(1, 30))
+        k = int(rng.integers(1, 35))
+        expected = np.argsort(-scores, kind="stable")[:k]
+        assert top_k(scores, k).tolist() == expected.tolist()
@@ -0,0 +1,51 @@
+import base64
+
+import pytest
+
+from app.services.search.result_cache import RankedSearch, ResultCache, decode_cursor, encode_cursor
+
+
+def _raw_cursor(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def _search(created_at=None) -> RankedSearch:
+    search = RankedSearch(user_id="u", query_tokens=set(), fallback=False, hits=[], document_names={})
+    if created_at is not None:
+        search.created_at = created_at
+    return search
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("abc123", 20)) == ("abc123", 20)
+    assert decode_cursor(encode_cursor("abc123", 0)) == ("abc123", 0)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64 at all!",
+    _raw_cursor("abc123"),
+    _raw_cursor("abc123:ten"),
+    _raw_cursor("abc:1:2"),
+    _raw_cursor("abc123:-5"),
+])
+def test_invalid_cursors_are_rejected(cursor):
+    assert decode_cursor(cursor) is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResultCache(ttl_seconds=60, max_entries=2)
+    first, second = cache.put(_search()), cache.put(_search())
+    assert cache.get(first) is not None  # first is now the most recent
+    third = cache.put(_search())
+
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+    assert cache.get(third) is not None
+
+
+def test_cache_expires_entries():
+    cache = ResultCache(ttl_seconds=60, max_entries=10)
+    search_id = cache.put(_search(created_at=0.0))
+
+    assert cache.get(search_id) is None
@@ -0,0 +1,24 @@
+import json
+
+from app.config import settings
+from app.services import tracing
+
+
+def test_spans_are_written_in_batches(tmp_path, monkeypatch):
+    path = tmp_path / "traces" / "spans.jsonl"
+    monkeypatch.setattr(settings, "tracing_exporter", "jsonl")
+    monkeypatch.setattr(settings, "tracing_file", str(path))
+    monkeypatch.setattr(settings, "tracing_sample_rate", 1.0)
+
+    root = tracing.start_root("request")
+    with tracing.activate(root):
+        for i in range(1000):
+            with tracing.span("child", i=i):
+                pass
+    tracing.flush()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 1001
+    assert {r["traceId"] for r in records} == {root.trace_id}
+    assert [r["attributes"]["i"] for r in records[:-1]] == list(range(1000))
+    assert records[-1]["name"] == "request"
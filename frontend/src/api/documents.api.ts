@@ -1,4 +1,5 @@
 import api from "./client"
+import { API_BASE_URL, STORAGE_KEYS } from "@/utils/constants"
 
 export const documentsApi = {
   async getDocuments() {
@@ -26,6 +27,15 @@ export const documentsApi = {
     return res.data
   },
 
+  // pdf.js source: lets the viewer fetch only the byte ranges it renders
+  getDocumentFileSource(documentId: string) {
+    const token = localStorage.getItem(STORAGE_KEYS.ACCESS_TOKEN)
+    return {
+      url: `${API_BASE_URL}/documents/${documentId}/file`,
+      httpHeaders: token ? { Authorization: `Bearer ${token}` } : {},
+    }
+  },
+
   async getDocumentFile(documentId: string): Promise<Blob> {
     const res = await api.get(`/documents/${documentId}/file`, {
       responseType: "arraybuffer",
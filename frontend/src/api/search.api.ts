@@ -5,19 +5,14 @@ interface SearchResponse {
   results: SearchResult[]
   totalResults: number
   searchTime: number
+  searchId?: string
+  nextCursor?: string | null
+  mode?: "semantic" | "exact"
+  // Vector store unavailable: lexical-only ranking
+  degraded?: boolean
 }
 
-export async function searchDocuments(
-  query: string,
-  limit = 10
-): Promise<SearchResponse> {
-  const response = await api.post("/search", {
-    query,
-    limit,
-  })
-
-  const data = response.data?.data
-
+function toSearchResponse(data: any): SearchResponse {
   if (!data) {
     return {
       results: [],
@@ -34,6 +29,12 @@ export async function searchDocuments(
     highlightText: r.highlightText || "",
     rawChunkText: r.rawChunkText || "",
     confidenceScore: r.confidenceScore,
+    // Exact mode: character spans of the match inside the snippet
+    highlights: (r.matchOffsets ?? []).map(([start, end]: [number, number]) => ({
+      text: r.snippet.slice(start, end),
+      startOffset: start,
+      endOffset: end,
+    })),
     scores: r.scores,
   }))
 
@@ -41,5 +42,36 @@ export async function searchDocuments(
     results,
     totalResults: data.totalResults,
     searchTime: data.searchTime,
+    searchId: data.searchId,
+    nextCursor: data.nextCursor ?? null,
+    mode: data.mode,
+    degraded: data.degraded ?? false,
   }
 }
+
+export async function searchDocuments(
+  query: string,
+  limit = 10,
+  mode: "auto" | "semantic" | "exact" = "auto"
+): Promise<SearchResponse> {
+  const response = await api.post("/search", {
+    query,
+    limit,
+    mode,
+  })
+
+  return toSearchResponse(response.data?.data)
+}
+
+// Next page of a previous search (served from the server-side ranked set)
+export async function searchNextPage(
+  cursor: string,
+  limit = 10
+): Promise<SearchResponse> {
+  const response = await api.post("/search/page", {
+    cursor,
+    limit,
+  })
+
+  return toSearchResponse(response.data?.data)
+}
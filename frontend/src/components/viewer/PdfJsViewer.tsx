@@ -49,10 +49,12 @@ export default function PdfJsViewer({
         const meta = await documentsApi.getDocument(documentId)
         if (!cancelled) setDocName(meta.data.filename)
 
-        const blob = await documentsApi.getDocumentFile(documentId)
-        const buffer = await blob.arrayBuffer()
-
-        const pdf = await pdfjsLib.getDocument({ data: buffer }).promise
+        // Range requests: only the pages being rendered are downloaded
+        const pdf = await pdfjsLib.getDocument({
+          ...documentsApi.getDocumentFileSource(documentId),
+          rangeChunkSize: 256 * 1024,
+          disableAutoFetch: true,
+        }).promise
         if (cancelled) return
 
         setPdfDoc(pdf)
@@ -36,6 +36,7 @@ export interface SearchRequest {
   query: string;
   documentIds?: string[];
   limit?: number;
+  mode?: "auto" | "semantic" | "exact";
 }
 
 export interface SearchResponse {